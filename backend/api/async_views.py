@@ -0,0 +1,362 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import (APIException, AuthenticationFailed,
+                                       NotAuthenticated, Throttled)
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.serializers import Serializer
+from rest_framework.settings import api_settings as rest_settings
+from rest_framework.views import exception_handler
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from api.authentication import (aget_user_status, build_lazy_user,
+                                get_token_user_id)
+from api.cache import (count_cache_access, get_cache_digest, get_cache_key,
+                       get_not_modified_response, get_validators,
+                       is_recently_changed)
+from api.fast_serializers import (CategoryFastSerializer, FastSerializer,
+                                  ProductFastSerializer,
+                                  SubcategoryFastSerializer)
+from api.filters import ProductFilterBackend
+from api.idempotency import aidempotent
+from api.pagination import AsyncPageNumberPagination, CatalogCursorPagination
+from api.serializers import (CategoryGetSerializer, ProductGetSerializer,
+                             ShoppingCartDiffSerializer,
+                             ShoppingCartPostSerializer,
+                             ShoppingCartQuantitySerializer,
+                             ShoppingCartSummarySerializer,
+                             SubcategoryGetSerializer, get_item_product_ids)
+from api.throttling import SLIDING_WINDOW_THROTTLES
+from api.timing import time_serializer, timed
+
+from backend.db.router import use_primary
+from backend.settings import (CATALOG_CACHE_ALIAS, CATALOG_FAST_SERIALIZATION,
+                              JWT_STATELESS_AUTH)
+from shop.models import Category, Product, Subcategory
+from shop.carts import CartLockTimeout, cart_storage
+from shop.versions import aget_catalog_versions
+
+
+class CartLocked(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Корзина изменяется другим запросом. Повторите запрос позже.'
+    default_code = 'cart_locked'
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, который загружает пользователя через async ORM."""
+
+    async def aauthenticate(self, request):
+        header: bytes | None = self.get_header(request)
+        if header is None:
+            return None
+        raw_token: bytes | None = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """Асинхронная версия get_user с теми же проверками и сообщениями об ошибках."""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
+
+
+class AsyncStatelessJWTAuthentication(AsyncJWTAuthentication):
+    """Асинхронная версия StatelessJWTAuthentication: пользователь без запроса к БД при попадании в кэш статусов."""
+
+    async def aget_user(self, validated_token):
+        user_id = get_token_user_id(validated_token)
+        return build_lazy_user(user_id, validated_token, await aget_user_status(user_id))
+
+
+class AsyncAPIView(View):
+    """
+    Базовая асинхронная вьюха API. Аутентифицирует запрос по JWT, отдает JSON
+    рендерером DRF и превращает исключения DRF в такие же ответы, как у синхронных вьюсетов.
+    """
+
+    authentication_class: type[AsyncJWTAuthentication] = (
+        AsyncStatelessJWTAuthentication if JWT_STATELESS_AUTH else AsyncJWTAuthentication
+    )
+    authentication_required: bool = False
+    renderer = JSONRenderer()
+    throttle_classes: tuple[type, ...] = ()
+    throttle_scope: str | None = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        """Как и APIView, отключает проверку CSRF: запросы аутентифицируются по JWT."""
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        authenticator = self.authentication_class()
+        try:
+            result = await authenticator.aauthenticate(request)
+            if result is not None:
+                request.user, request.auth = result
+            elif self.authentication_required:
+                raise NotAuthenticated()
+            throttles: list = self.get_throttles(request)
+            if throttles:
+                # Кэш счетчиков может быть сетевым (Redis, Memcached), поэтому проверка идет в потоке.
+                # БД она не использует: поток берется из пула, а не общий для всех запросов поток ORM.
+                await sync_to_async(self.check_throttles, thread_sensitive=False)(request, throttles)
+            return await super().dispatch(request, *args, **kwargs)
+        except CartLockTimeout:
+            return self.handle_exception(CartLocked())
+        except (APIException, Http404) as exc:
+            if isinstance(exc, (AuthenticationFailed, NotAuthenticated)):
+                exc.auth_header = authenticator.authenticate_header(request)
+            return self.handle_exception(exc)
+
+    def get_throttles(self, request) -> list:
+        return [throttle() for throttle in self.throttle_classes]
+
+    def check_throttles(self, request, throttles: list) -> None:
+        """Как APIView.check_throttles: при отказе отвечает 429 с наибольшим Retry-After сработавших ограничителей."""
+        durations: list[int] = [
+            throttle.wait() for throttle in throttles if not throttle.allow_request(request, self)
+        ]
+        if durations:
+            raise Throttled(wait=max(durations))
+
+    def handle_exception(self, exc) -> HttpResponse:
+        response = exception_handler(exc, {'view': self})
+        headers: dict[str, str] = {
+            header: value for header, value in response.items() if header != 'Content-Type'
+        }
+        return self.render(response.data, response.status_code, headers=headers)
+
+    def render(self, data, status_code: int = status.HTTP_200_OK, headers=None) -> HttpResponse:
+        with timed('render'):
+            content: bytes = self.renderer.render(data)
+        return HttpResponse(
+            content,
+            status=status_code,
+            content_type='application/json',
+            headers=headers,
+        )
+
+    def get_drf_request(self, request) -> Request:
+        """Оборачивает запрос в Request DRF для сериализаторов, фильтров и пагинации."""
+        drf_request = Request(request, parsers=[parser() for parser in rest_settings.DEFAULT_PARSER_CLASSES])
+        drf_request.user = getattr(request, 'user', None)
+        return drf_request
+
+
+class AsyncCatalogView(AsyncAPIView):
+    """
+    Асинхронные list и retrieve каталога с тем же кэшем ответов, ETag/Last-Modified и X-Cache,
+    что и у CatalogCacheMixin. С CATALOG_FAST_SERIALIZATION данные собирают быстрые сериализаторы,
+    иначе - сериализаторы DRF, как в синхронных вьюсетах.
+    """
+
+    cache_tags: tuple[str, ...] = ()
+    fast_serializer_class: type[FastSerializer]
+    pagination_class = AsyncPageNumberPagination
+    queryset = None
+    serializer_class: type[Serializer]
+
+    def get_queryset(self, request):
+        return self.queryset
+
+    async def get(self, request, pk=None):
+        versions: dict[str, int] = await aget_catalog_versions(self.cache_tags)
+        digest: str = get_cache_digest(request, self.renderer.format, versions)
+        validators, last_modified = get_validators(digest, versions)
+        not_modified = get_not_modified_response(request, validators, last_modified)
+        if not_modified is not None:
+            return not_modified
+        cache = caches[CATALOG_CACHE_ALIAS]
+        cache_key: str = get_cache_key(digest)
+        data = await cache.aget(cache_key)
+        if data is not None:
+            count_cache_access(hit=True)
+            return self.render(data, headers={**validators, 'X-Cache': 'HIT'})
+        count_cache_access(hit=False)
+        if is_recently_changed(versions):
+            with use_primary():
+                data = await self.get_data(request, pk)
+        else:
+            data = await self.get_data(request, pk)
+        await cache.aset(cache_key, data)
+        return self.render(data, headers={**validators, 'X-Cache': 'MISS'})
+
+    async def get_data(self, request, pk=None):
+        if CATALOG_FAST_SERIALIZATION:
+            return await self.get_fast_data(request, pk)
+        queryset = self.get_queryset(request)
+        context: dict[str, Request] = {'request': self.get_drf_request(request)}
+        if pk is not None:
+            instance = await aget_object_or_404(queryset, pk=pk)
+            with timed('serialize'):
+                return self.serializer_class(instance, context=context).data
+        paginator = self.pagination_class()
+        page: list = await paginator.apaginate_queryset(queryset, request)
+        with timed('serialize'):
+            data: list[dict[str, any]] = self.serializer_class(page, many=True, context=context).data
+        return paginator.get_paginated_response(data).data
+
+    async def get_fast_data(self, request, pk=None):
+        serializer: FastSerializer = self.fast_serializer_class(request)
+        rows = serializer.get_rows(self.get_queryset(request))
+        if pk is not None:
+            row: dict[str, any] = await aget_object_or_404(rows, pk=pk)
+            with timed('serialize'):
+                return serializer.build_row(row)
+        paginator = self.pagination_class()
+        page: list[dict[str, any]] = await paginator.apaginate_queryset(rows, request)
+        with timed('serialize'):
+            data: list[dict[str, any]] = serializer.serialize(page)
+        return paginator.get_paginated_response(data).data
+
+
+class AsyncCategoryView(AsyncCatalogView):
+    """Асинхронная версия CategoryViewSet."""
+
+    cache_tags = ('category',)
+    fast_serializer_class = CategoryFastSerializer
+    queryset = Category.objects.all()
+    serializer_class = CategoryGetSerializer
+
+
+class AsyncSubcategoryView(AsyncCatalogView):
+    """Асинхронная версия SubcategoryViewSet."""
+
+    cache_tags = ('category', 'subcategory',)
+    fast_serializer_class = SubcategoryFastSerializer
+    queryset = Subcategory.objects.all().select_related('category')
+    serializer_class = SubcategoryGetSerializer
+
+
+class AsyncProductView(AsyncCatalogView):
+    """Асинхронная версия ProductViewSet с теми же фильтрами и курсорной пагинацией."""
+
+    cache_tags = ('category', 'product', 'subcategory',)
+    fast_serializer_class = ProductFastSerializer
+    pagination_class = CatalogCursorPagination
+    queryset = Product.objects.all().select_related('subcategory__category')
+    serializer_class = ProductGetSerializer
+
+    def get_queryset(self, request):
+        return ProductFilterBackend().filter_queryset(self.get_drf_request(request), self.queryset, self)
+
+
+class AsyncShoppingCartView(AsyncAPIView):
+    """Асинхронная версия ShoppingCartViewSet: просмотр и замена содержимого корзины."""
+
+    authentication_required = True
+    throttle_classes = SLIDING_WINDOW_THROTTLES
+    throttle_scope = 'cart_write'
+
+    def get_throttles(self, request) -> list:
+        if request.method in SAFE_METHODS:
+            return []
+        return super().get_throttles(request)
+
+    async def get_summary_response(self, request, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+        summary: dict[str, any] = await cart_storage.asummary(request.user)
+        with timed('serialize'):
+            data: dict[str, any] = ShoppingCartSummarySerializer(summary).data
+        return self.render(data, status_code)
+
+    async def aget_products(self, data, field: str) -> dict[int, Product]:
+        """
+        Загружает async ORM товары позиций data[field], чтобы проверка сериализатора шла без запросов к БД
+        прямо в цикле событий, а не в общем для всех запросов потоке ORM.
+        """
+        items = data.get(field) if isinstance(data, dict) else None
+        return await Product.objects.ain_bulk(get_item_product_ids(items))
+
+    async def get(self, request):
+        return await self.get_summary_response(request)
+
+    @aidempotent
+    async def post(self, request):
+        drf_request: Request = self.get_drf_request(request)
+        products: dict[int, Product] = await self.aget_products(drf_request.data, 'products')
+        serializer = time_serializer(ShoppingCartPostSerializer(
+            data=drf_request.data,
+            context={'request': drf_request, 'products': products},
+        ))
+        serializer.is_valid(raise_exception=True)
+        await cart_storage.areplace_items(request.user, serializer.validated_data['products'])
+        return await self.get_summary_response(request, status.HTTP_201_CREATED)
+
+
+class AsyncShoppingCartClearView(AsyncAPIView):
+    """Асинхронная очистка корзины."""
+
+    authentication_required = True
+    throttle_classes = SLIDING_WINDOW_THROTTLES
+    throttle_scope = 'cart_write'
+
+    async def post(self, request):
+        await cart_storage.aclear(request.user)
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncShoppingCartItemView(AsyncShoppingCartView):
+    """Асинхронное изменение количества одного товара в корзине или его удаление."""
+
+    http_method_names = ('put', 'patch', 'delete', 'options',)
+
+    async def put(self, request, product_id):
+        serializer = time_serializer(ShoppingCartQuantitySerializer(data=self.get_drf_request(request).data))
+        serializer.is_valid(raise_exception=True)
+        product: Product = await aget_object_or_404(Product, pk=product_id)
+        await cart_storage.aupsert_items(
+            request.user,
+            [{'product': product, 'quantity': serializer.validated_data['quantity']}],
+        )
+        return await self.get_summary_response(request)
+
+    async def patch(self, request, product_id):
+        return await self.put(request, product_id)
+
+    async def delete(self, request, product_id):
+        await cart_storage.aremove_items(request.user, (product_id,))
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncShoppingCartItemsView(AsyncShoppingCartView):
+    """Асинхронное пакетное изменение корзины."""
+
+    http_method_names = ('post', 'options',)
+
+    async def post(self, request):
+        data = self.get_drf_request(request).data
+        products: dict[int, Product] = await self.aget_products(data, 'upsert')
+        serializer = time_serializer(ShoppingCartDiffSerializer(data=data, context={'products': products}))
+        serializer.is_valid(raise_exception=True)
+        await cart_storage.achange_items(
+            request.user,
+            serializer.validated_data.get('upsert', []),
+            serializer.validated_data.get('remove', []),
+        )
+        return await self.get_summary_response(request)
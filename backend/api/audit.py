@@ -0,0 +1,166 @@
+from contextlib import ExitStack
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import URLResolver, resolve
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.urls import urlpatterns
+from backend.settings import (CART_CACHE_STORAGE, CATALOG_CACHE_ALIAS,
+                              JWT_STATELESS_AUTH)
+from shop.carts import cart_storage
+from shop.models import Product
+
+SAVEPOINT_PREFIXES: tuple[str, ...] = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT',)
+
+
+class AuditRequest:
+    """
+    Запрос, которым команды проверки нагружают эндпоинт API.
+    queries - точный бюджет запросов к БД (с загрузкой пользователя по JWT, без точек сохранения);
+    full_pass - полный проход по таблице или сортировка ожидаемы (COUNT(*), выгрузка всего каталога);
+    status - ожидаемый код ответа, если запрос намеренно завершается ошибкой;
+    authenticated - вьюха аутентифицирует запрос по JWT. При JWT_STATELESS_AUTH пользователь
+    берется из кэша статусов, и его загрузка вычитается из бюджета;
+    cart_cache_queries - бюджет при CART_CACHE_STORAGE, если корзина в кэше меняет число запросов.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        queries: int,
+        data: dict | None = None,
+        full_pass: bool = False,
+        status: int | None = None,
+        authenticated: bool = True,
+        cart_cache_queries: int | None = None,
+    ):
+        if CART_CACHE_STORAGE and cart_cache_queries is not None:
+            queries = cart_cache_queries
+        self.method = method
+        self.path = path
+        self.queries = queries - 1 if JWT_STATELESS_AUTH and authenticated else queries
+        self.data = data
+        self.full_pass = full_pass
+        self.status = status
+
+    def __str__(self):
+        return f'{self.method.upper()} {self.path}'
+
+    @property
+    def url_name(self) -> str | None:
+        return resolve(self.path.partition('?')[0]).url_name
+
+
+def get_audit_requests(client, product: Product, user: User) -> list[AuditRequest]:
+    """
+    Возвращает запросы ко всем эндпоинтам api/urls.py на данных, которые есть в базе.
+    client - тестовый клиент API с токеном пользователя (api/tests/utils.py: get_audit_client).
+    """
+    subcategory = product.subcategory
+    category = subcategory.category
+    word: str = product.name.split()[0]
+    if CART_CACHE_STORAGE:
+        # Корзина загружается в кэш заранее и не пуста: иначе бюджет GET зависел бы от ее состояния.
+        cart_storage.upsert_items(user, [{'product': product, 'quantity': 1}])
+    next_page: str | None = client.get('/api/products/').json().get('next')
+    requests: list[AuditRequest] = [
+        AuditRequest('get', '/api/', 1),
+        AuditRequest('get', '/api/categories/', 3, full_pass=True),
+        AuditRequest('get', f'/api/categories/{category.id}/', 2),
+        AuditRequest('get', '/api/subcategories/', 3, full_pass=True),
+        AuditRequest('get', f'/api/subcategories/{subcategory.id}/', 2),
+        AuditRequest('get', '/api/products/', 2),
+        AuditRequest('get', f'/api/products/{product.id}/', 2),
+        # Товары категории лежат в нескольких подкатегориях, и ни один индекс shop_product
+        # не отдает их в порядке (name, id): без денормализации категории сортировка неизбежна.
+        AuditRequest('get', f'/api/products/?category={category.slug}', 2, full_pass=True),
+        AuditRequest('get', f'/api/products/?subcategory={subcategory.slug}', 2),
+        AuditRequest('get', f'/api/products/?min_price={product.price}&max_price={product.price}', 2),
+        AuditRequest('get', f'/api/products/?slug={product.slug}', 2),
+        # Совпадения полнотекстового поиска сортируются по имени: сортировка охватывает найденные
+        # строки, а не всю таблицу, но по частому слову их может быть сколько угодно много.
+        AuditRequest('get', f'/api/products/?search={word}', 2, full_pass=True),
+        AuditRequest('get', '/api/products/?count=exact', 3, full_pass=True),
+        AuditRequest('get', '/api/products/export/?format=ndjson', 2, full_pass=True),
+        AuditRequest('get', f'/api/products/export/?format=csv&subcategory={subcategory.slug}', 2),
+        AuditRequest('get', '/api/shopping_cart/', 2),
+        AuditRequest('get', f'/api/shopping_cart/{product.id}/', 1, status=405),
+        AuditRequest('post', '/api/shopping_cart/', 6, {'products': [{'product': product.id, 'quantity': 1}]},
+                     cart_cache_queries=3),
+        AuditRequest('put', f'/api/shopping_cart/items/{product.id}/', 4, {'quantity': 2}, cart_cache_queries=3),
+        AuditRequest('post', '/api/shopping_cart/items/', 5, {'upsert': [{'product': product.id, 'quantity': 3}]},
+                     cart_cache_queries=3),
+        AuditRequest('delete', f'/api/shopping_cart/items/{product.id}/', 2, cart_cache_queries=1),
+        AuditRequest('post', '/api/shopping_cart/clear_shopping_cart/', 2, cart_cache_queries=1),
+        AuditRequest('get', '/api/stats/', 1, status=None if user.is_staff else 403),
+        AuditRequest('get', '/api/docs/', 0, authenticated=False),
+        AuditRequest('get', '/api/docs/swagger/', 1),
+        AuditRequest('get', '/api/docs/redoc/', 1),
+        AuditRequest('post', '/api/auth/token/create/', 1, {'username': user.username, 'password': '-'}, status=401,
+                     authenticated=False),
+        AuditRequest('post', '/api/auth/token/refresh/', 0, {'refresh': str(RefreshToken.for_user(user))},
+                     authenticated=False),
+    ]
+    if next_page:
+        requests.append(AuditRequest('get', next_page.removeprefix('http://testserver'), 2))
+    return requests
+
+
+def get_api_url_names() -> set[str]:
+    """Возвращает имена всех маршрутов api/urls.py."""
+    names: set[str] = set()
+    patterns: list = list(urlpatterns)
+    while patterns:
+        pattern = patterns.pop()
+        if isinstance(pattern, URLResolver):
+            patterns.extend(pattern.url_patterns)
+        elif pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def replay(client, audit_request: AuditRequest) -> tuple[any, list[tuple[str, str, any]]]:
+    """
+    Выполняет запрос аудита с пустым кэшем каталога и возвращает ответ и выполненные им запросы к БД:
+    (псевдоним БД, SQL, параметры). Точки сохранения не учитываются - в рабочем режиме их нет.
+    """
+    queries: list[tuple[str, str, any]] = []
+
+    def capture(execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(SAVEPOINT_PREFIXES):
+            queries.append((context['connection'].alias, sql, None if many else params))
+        return execute(sql, params, many, context)
+
+    caches[CATALOG_CACHE_ALIAS].clear()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(capture))
+        response = getattr(client, audit_request.method)(audit_request.path, audit_request.data, format='json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return response, queries
+
+
+class AuditCommand(BaseCommand):
+    """Основа команд, которые проверяют эндпоинты API запросами из get_audit_requests."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='Пользователь, от имени которого выполняются запросы.')
+
+    def get_audit_objects(self, username: str | None) -> tuple[Product, User]:
+        product: Product | None = Product.objects.select_related('subcategory__category').order_by('id').first()
+        if product is None:
+            raise CommandError('Каталог пуст: заполните базу перед проверкой.')
+        if username is None:
+            user: User | None = User.objects.filter(shopping_cart__isnull=False).first() or User.objects.first()
+            if user is None:
+                raise CommandError('Пользователей нет: создайте пользователя для запросов к корзине.')
+            return product, user
+        try:
+            return product, User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {username} не найден.')
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from backend.settings import JWT_USER_CACHE_SIZE, JWT_USER_CACHE_TTL
+
+# Поля пользователя, которые проверяет аутентификация; остальные поля ленивого пользователя отложены.
+USER_STATUS_FIELDS: tuple[str, ...] = ('is_active', 'is_staff', 'is_superuser', 'password',)
+
+# user_id -> (момент истечения по time.monotonic(), значения USER_STATUS_FIELDS с MD5 пароля вместо хэша).
+USER_STATUS_CACHE: dict[int, tuple[float, tuple]] = {}
+USER_STATUS_CACHE_LOCK = threading.Lock()
+USER_STATUS_STATS: Counter = Counter()
+
+
+def get_user_status_stats() -> dict[str, float]:
+    """Возвращает размер и счетчики попаданий кэша статусов пользователей текущего процесса."""
+    with USER_STATUS_CACHE_LOCK:
+        hits, misses, size = USER_STATUS_STATS['hits'], USER_STATUS_STATS['misses'], len(USER_STATUS_CACHE)
+    total = hits + misses
+    return {
+        'size': size,
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def get_cached_status(user_id) -> tuple | None:
+    with USER_STATUS_CACHE_LOCK:
+        entry: tuple[float, tuple] | None = USER_STATUS_CACHE.get(user_id)
+        hit: bool = entry is not None and entry[0] > time.monotonic()
+        USER_STATUS_STATS['hits' if hit else 'misses'] += 1
+        return entry[1] if hit else None
+
+
+def cache_status(user_id, row: tuple) -> tuple:
+    """Кладет статус в кэш; при переполнении вытесняет самую старую запись."""
+    status: tuple = (*row[:-1], get_md5_hash_password(row[-1]))
+    with USER_STATUS_CACHE_LOCK:
+        USER_STATUS_CACHE.pop(user_id, None)
+        while len(USER_STATUS_CACHE) >= JWT_USER_CACHE_SIZE:
+            del USER_STATUS_CACHE[next(iter(USER_STATUS_CACHE))]
+        USER_STATUS_CACHE[user_id] = (time.monotonic() + JWT_USER_CACHE_TTL, status)
+    return status
+
+
+def get_user_status(user_id) -> tuple | None:
+    """Статус пользователя из кэша, а при промахе - одним запросом к БД. None, если пользователя нет."""
+    status: tuple | None = get_cached_status(user_id)
+    if status is None:
+        row: tuple | None = User.objects.filter(pk=user_id).values_list(*USER_STATUS_FIELDS).first()
+        status = cache_status(user_id, row) if row is not None else None
+    return status
+
+
+async def aget_user_status(user_id) -> tuple | None:
+    """Асинхронная версия get_user_status."""
+    status: tuple | None = get_cached_status(user_id)
+    if status is None:
+        row: tuple | None = await User.objects.filter(pk=user_id).values_list(*USER_STATUS_FIELDS).afirst()
+        status = cache_status(user_id, row) if row is not None else None
+    return status
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def discard_user_status(sender, instance, **kwargs):
+    """Изменения через save() и delete() сразу видны этому процессу; остальным - по истечении JWT_USER_CACHE_TTL."""
+    with USER_STATUS_CACHE_LOCK:
+        USER_STATUS_CACHE.pop(instance.pk, None)
+
+
+def get_token_user_id(validated_token):
+    try:
+        return validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_('Token contained no recognizable user identification'))
+
+
+def build_lazy_user(user_id, validated_token, status: tuple | None) -> User:
+    """
+    Проверяет статус пользователя так же, как JWTAuthentication.get_user, и возвращает экземпляр User,
+    в котором загружены только id и флаги статуса. Остальные поля отложены, как после only():
+    обращение к ним загружает поле из БД, поэтому пользователь годится для фильтров и внешних ключей без запроса.
+    """
+    if status is None:
+        raise AuthenticationFailed(_('User not found'), code='user_not_found')
+    is_active, is_staff, is_superuser, password_hash = status
+    if not is_active:
+        raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+    if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+        raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+    known: dict[str, any] = {'id': user_id, 'is_active': is_active, 'is_staff': is_staff, 'is_superuser': is_superuser}
+    field_names: list[str] = [field.attname for field in User._meta.concrete_fields if field.attname in known]
+    return User.from_db(DEFAULT_DB_ALIAS, field_names, [known[name] for name in field_names])
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без запроса пользователя на каждый запрос: подписанным утверждениям токена
+    доверяют на время его жизни, а is_active и отзыв по смене пароля (CHECK_REVOKE_TOKEN)
+    проверяются по кэшу статусов процесса со временем жизни JWT_USER_CACHE_TTL.
+    USER_ID_FIELD должен быть первичным ключом пользователя.
+    """
+
+    def get_user(self, validated_token) -> User:
+        user_id = get_token_user_id(validated_token)
+        return build_lazy_user(user_id, validated_token, get_user_status(user_id))
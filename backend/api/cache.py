@@ -0,0 +1,116 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from backend.db.router import use_primary
+from backend.settings import (CATALOG_CACHE_ALIAS, CATALOG_CACHE_KEY_PREFIX,
+                              DB_REPLICA_LAG_SECONDS)
+from shop.versions import get_catalog_versions
+
+CACHE_STATS: Counter = Counter()
+CACHE_STATS_LOCK = threading.Lock()
+
+
+def get_cache_stats() -> dict[str, float]:
+    """Возвращает счетчики попаданий и промахов кэша каталога текущего процесса."""
+    with CACHE_STATS_LOCK:
+        hits, misses = CACHE_STATS['hits'], CACHE_STATS['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def count_cache_access(hit: bool) -> None:
+    with CACHE_STATS_LOCK:
+        CACHE_STATS['hits' if hit else 'misses'] += 1
+
+
+def get_cache_digest(request, renderer_format: str, versions: dict[str, int]) -> str:
+    """Ключ ответа: полный URL запроса, формат ответа и версии тегов."""
+    raw_key: str = '|'.join((
+        request.build_absolute_uri(),
+        renderer_format,
+        *(f'{tag}={version}' for tag, version in sorted(versions.items())),
+    ))
+    return hashlib.md5(raw_key.encode()).hexdigest()
+
+
+def get_cache_key(digest: str) -> str:
+    return f'{CATALOG_CACHE_KEY_PREFIX}:response:{digest}'
+
+
+def get_validators(digest: str, versions: dict[str, int]) -> tuple[dict[str, str], int]:
+    """Возвращает заголовки ETag и Last-Modified ответа и время изменения в секундах."""
+    last_modified: int = max(versions.values()) // 10 ** 9
+    return {'ETag': f'"{digest}"', 'Last-Modified': http_date(last_modified)}, last_modified
+
+
+def get_not_modified_response(request, validators: dict[str, str], last_modified: int):
+    """Ответ 304 на условный GET, если клиент уже получил эту версию ответа, иначе None."""
+    not_modified = get_conditional_response(request, etag=validators['ETag'], last_modified=last_modified)
+    if not_modified is not None:
+        for header, value in validators.items():
+            not_modified[header] = value
+    return not_modified
+
+
+def is_recently_changed(versions: dict[str, int]) -> bool:
+    """Каталог изменился недавно: реплика может отставать, а ответ попадет в кэш надолго."""
+    return time.time_ns() - max(versions.values()) < DB_REPLICA_LAG_SECONDS * 10 ** 9
+
+
+class CatalogCacheMixin:
+    """
+    Кэширует ответы list и retrieve вьюсетов каталога и отвечает на условные GET-запросы.
+    Ключ и ETag строятся из полного URL запроса, формата ответа и версий тегов из cache_tags,
+    поэтому изменение модели делает недействительными только зависящие от нее записи.
+    Асинхронные вьюхи каталога (AsyncCatalogView) используют тот же кэш и те же ключи.
+    """
+
+    cache_tags: tuple[str, ...] = ()
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        versions: dict[str, int] = get_catalog_versions(self.cache_tags)
+        digest: str = get_cache_digest(request, request.accepted_renderer.format, versions)
+        validators, last_modified = get_validators(digest, versions)
+        not_modified = get_not_modified_response(request, validators, last_modified)
+        if not_modified is not None:
+            return not_modified
+        cache = caches[CATALOG_CACHE_ALIAS]
+        cache_key: str = get_cache_key(digest)
+        data = cache.get(cache_key)
+        if data is not None:
+            count_cache_access(hit=True)
+            return Response(
+                data=data,
+                status=status.HTTP_200_OK,
+                headers={**validators, 'X-Cache': 'HIT'},
+            )
+        count_cache_access(hit=False)
+        if is_recently_changed(versions):
+            with use_primary():
+                response = handler(request, *args, **kwargs)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data)
+            for header, value in validators.items():
+                response[header] = value
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
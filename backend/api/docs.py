@@ -0,0 +1,55 @@
+import hashlib
+from functools import cache
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.module_loading import import_string
+from django.views import View
+
+from backend.settings import OPENAPI_SCHEMA_PATH
+
+OPENAPI_MEDIA_TYPE: str = 'application/vnd.oai.openapi+json'
+
+
+@cache
+def get_schema() -> tuple[bytes, str]:
+    """
+    Возвращает схему OpenAPI в JSON и ее ETag. Схема читается из файла, собранного при сборке образа
+    командой spectacular. Если файла нет, схема один раз генерируется в процессе.
+    """
+    if OPENAPI_SCHEMA_PATH.exists():
+        content: bytes = OPENAPI_SCHEMA_PATH.read_bytes()
+    else:
+        from drf_spectacular.generators import SchemaGenerator
+        from drf_spectacular.renderers import OpenApiJsonRenderer
+        content = OpenApiJsonRenderer().render(SchemaGenerator().get_schema(request=None, public=True))
+    return content, f'"{hashlib.md5(content).hexdigest()}"'
+
+
+class OpenAPISchemaView(View):
+    """Отдает заранее собранную схему OpenAPI готовыми байтами с ETag вместо генерации на каждый запрос."""
+
+    http_method_names = ('get', 'head', 'options',)
+
+    def get(self, request):
+        content, etag = get_schema()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type=OPENAPI_MEDIA_TYPE)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+def lazy_view(view_path: str, **initkwargs):
+    """
+    Возвращает вьюху, которая импортирует класс view_path только при первом запросе.
+    Так документация не тянет drf-spectacular в каждый воркер при запуске.
+    """
+    @cache
+    def get_view():
+        return import_string(view_path).as_view(**initkwargs)
+
+    def view(request, *args, **kwargs):
+        return get_view()(request, *args, **kwargs)
+    return view
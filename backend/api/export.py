@@ -0,0 +1,191 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import DateTimeField, DecimalField
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from api.fast_serializers import compile_image_url
+from backend.settings import EXPORT_CHUNK_SIZE
+from shop.models import Product
+
+EXPORT_FIELDS: dict[str, str] = {
+    'id': 'id',
+    'name': 'name',
+    'slug': 'slug',
+    'price': 'price',
+    'subcategory_id': 'subcategory__id',
+    'subcategory_name': 'subcategory__name',
+    'subcategory_slug': 'subcategory__slug',
+    'category_id': 'subcategory__category__id',
+    'category_name': 'subcategory__category__name',
+    'category_slug': 'subcategory__category__slug',
+    'image_large': 'image_large',
+    'image_medium': 'image_medium',
+    'image_small': 'image_small',
+    'updated_at': 'updated_at',
+}
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Базовый рендерер выгрузки каталога. Сама выгрузка отдается потоком, а render используется
+    только для ответов с ошибками: они отдаются как JSON с Content-Type application/json,
+    а не как JSON под видом CSV или NDJSON.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = f'{JSONRenderer.media_type}; charset={self.charset}'
+        return json.dumps(data, ensure_ascii=False).encode()
+
+
+class NDJSONRenderer(ExportRenderer):
+    """Рендерер выгрузки каталога в формате NDJSON: один JSON-объект на строку."""
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(ExportRenderer):
+    """Рендерер выгрузки каталога в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает записанную строку вместо хранения."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def get_export_fields(request) -> list[str]:
+    """Возвращает выбранные в ?fields= поля выгрузки или все поля."""
+    raw_fields: str = request.query_params.get('fields', '')
+    fields: list[str] = [field for field in raw_fields.split(',') if field]
+    if not fields:
+        return list(EXPORT_FIELDS)
+    unknown: list[str] = [field for field in fields if field not in EXPORT_FIELDS]
+    if unknown:
+        raise ValidationError({'fields': [f'Неизвестные поля: {", ".join(unknown)}.']})
+    return fields
+
+
+def get_since(request):
+    """Разбирает ?since= как дату или дату и время в формате ISO 8601."""
+    raw_since: str = request.query_params.get('since', '')
+    if not raw_since:
+        return None
+    try:
+        since = parse_datetime(raw_since)
+        if since is None and parse_date(raw_since) is not None:
+            since = parse_datetime(f'{raw_since}T00:00:00')
+    except ValueError:
+        since = None
+    if since is None:
+        raise ValidationError({'since': ['Неправильный формат даты. Используйте ISO 8601.']})
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def get_converters(fields: list[str], request) -> list:
+    """Подбирает для каждого поля функцию приведения значения к виду ответа API."""
+    converters: dict[str, any] = {
+        'price': DecimalField(max_digits=10, decimal_places=2).to_representation,
+        'updated_at': DateTimeField().to_representation,
+        'image_large': compile_image_url(Product, 'image_large', request),
+        'image_medium': compile_image_url(Product, 'image_medium', request),
+        'image_small': compile_image_url(Product, 'image_small', request),
+    }
+    return [converters.get(field) for field in fields]
+
+
+def get_rows(queryset, fields: list[str]):
+    return queryset.values_list(*(EXPORT_FIELDS[field] for field in fields)).order_by('id')
+
+
+def convert_row(row: tuple, converters: list) -> list:
+    return [
+        value if convert is None or value is None else convert(value)
+        for value, convert in zip(row, converters)
+    ]
+
+
+def iter_rows(queryset, fields: list[str], request):
+    """Читает товары серверным курсором порциями по EXPORT_CHUNK_SIZE строк."""
+    converters: list = get_converters(fields, request)
+    for row in get_rows(queryset, fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield convert_row(row, converters)
+
+
+async def aiter_rows(queryset, fields: list[str], request):
+    """
+    Асинхронная версия iter_rows для ASGI-сервера.
+    QuerySet.aiterator() для values_list выполняет запрос прямо в event loop,
+    поэтому порции серверного курсора читаются через sync_to_async.
+    """
+    converters: list = get_converters(fields, request)
+    rows = get_rows(queryset, fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    while chunk := await sync_to_async(list)(islice(rows, EXPORT_CHUNK_SIZE)):
+        for row in chunk:
+            yield convert_row(row, converters)
+
+
+def iter_ndjson(queryset, fields: list[str], request):
+    for row in iter_rows(queryset, fields, request):
+        yield json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n'
+
+
+def iter_csv(queryset, fields: list[str], request):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in iter_rows(queryset, fields, request):
+        yield writer.writerow(row)
+
+
+async def aiter_ndjson(queryset, fields: list[str], request):
+    async for row in aiter_rows(queryset, fields, request):
+        yield json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n'
+
+
+async def aiter_csv(queryset, fields: list[str], request):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    async for row in aiter_rows(queryset, fields, request):
+        yield writer.writerow(row)
+
+
+def is_wsgi_request(request) -> bool:
+    """Запрос пришел от WSGI-сервера: его окружение по PEP 3333 всегда содержит wsgi.version, а ASGI-запрос - нет."""
+    return 'wsgi.version' in request.META
+
+
+def export_catalog(queryset, request) -> StreamingHttpResponse:
+    """Отдает товары потоком в формате, выбранном согласованием контента (?format=ndjson или ?format=csv)."""
+    fields: list[str] = get_export_fields(request)
+    since = get_since(request)
+    if since is not None:
+        queryset = queryset.filter(updated_at__gte=since)
+    renderer = request.accepted_renderer
+    if is_wsgi_request(request):
+        stream = iter_csv if renderer.format == CSVRenderer.format else iter_ndjson
+    else:
+        # ASGI-сервер читает синхронный итератор целиком в память, поэтому отдаем ему асинхронный.
+        stream = aiter_csv if renderer.format == CSVRenderer.format else aiter_ndjson
+    response = StreamingHttpResponse(
+        stream(queryset, fields, request),
+        content_type=f'{renderer.media_type}; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="products.{renderer.format}"'
+    return response
@@ -0,0 +1,150 @@
+from abc import ABC, abstractmethod
+
+from rest_framework.response import Response
+
+from api.serializers import ProductGetSerializer
+from api.timing import timed
+
+from backend.settings import CATALOG_FAST_SERIALIZATION
+from shop.models import Category, Product, Subcategory
+
+
+def compile_image_url(model, field_name: str, request):
+    """
+    Возвращает функцию, которая строит URL изображения из имени файла так же,
+    как ImageField сериализатора DRF: абсолютный URL или None для пустого поля.
+    """
+    storage = model._meta.get_field(field_name).storage
+    build_absolute_uri = request.build_absolute_uri if request is not None else None
+
+    def image_url(name: str | None) -> str | None:
+        if not name:
+            return None
+        url: str = storage.url(name)
+        return build_absolute_uri(url) if build_absolute_uri else url
+    return image_url
+
+
+class FastSerializer(ABC):
+    """
+    Базовый быстрый сериализатор для GET-эндпоинтов.
+    Получает из БД только нужные столбцы через values() и собирает ответ той же формы,
+    что и обычный сериализатор, без создания моделей, полей DRF и OrderedDict.
+    """
+
+    columns: tuple[str, ...] = ()
+
+    def __init__(self, request=None):
+        self.request = request
+        self.build_row = self.compile()
+
+    @abstractmethod
+    def compile(self):
+        """Возвращает функцию, которая строит элемент ответа из строки values()."""
+
+    def get_rows(self, queryset):
+        return queryset.values(*self.columns)
+
+    def serialize(self, rows) -> list[dict[str, any]]:
+        return [self.build_row(row) for row in rows]
+
+
+class CategoryFastSerializer(FastSerializer):
+    """Быстрый аналог CategoryGetSerializer."""
+
+    columns = ('id', 'name', 'slug', 'image',)
+
+    def compile(self):
+        image_url = compile_image_url(Category, 'image', self.request)
+
+        def build_row(row: dict[str, any]) -> dict[str, any]:
+            return {
+                'id': row['id'],
+                'name': row['name'],
+                'slug': row['slug'],
+                'image': image_url(row['image']),
+            }
+        return build_row
+
+
+class SubcategoryFastSerializer(FastSerializer):
+    """Быстрый аналог SubcategoryGetSerializer."""
+
+    columns = (
+        'id', 'name', 'slug', 'image',
+        'category__id', 'category__name', 'category__slug', 'category__image',
+    )
+
+    def compile(self):
+        image_url = compile_image_url(Subcategory, 'image', self.request)
+        category_image_url = compile_image_url(Category, 'image', self.request)
+
+        def build_row(row: dict[str, any]) -> dict[str, any]:
+            return {
+                'id': row['id'],
+                'name': row['name'],
+                'slug': row['slug'],
+                'category': {
+                    'id': row['category__id'],
+                    'name': row['category__name'],
+                    'slug': row['category__slug'],
+                    'image': category_image_url(row['category__image']),
+                },
+                'image': image_url(row['image']),
+            }
+        return build_row
+
+
+class ProductFastSerializer(FastSerializer):
+    """Быстрый аналог ProductGetSerializer."""
+
+    columns = (
+        'id', 'name', 'slug', 'price',
+        'subcategory__id', 'subcategory__name', 'subcategory__slug', 'subcategory__category__name',
+        'image_large', 'image_medium', 'image_small',
+    )
+
+    def compile(self):
+        price = ProductGetSerializer().fields['price'].to_representation
+        image_large_url = compile_image_url(Product, 'image_large', self.request)
+        image_medium_url = compile_image_url(Product, 'image_medium', self.request)
+        image_small_url = compile_image_url(Product, 'image_small', self.request)
+
+        def build_row(row: dict[str, any]) -> dict[str, any]:
+            return {
+                'id': row['id'],
+                'name': row['name'],
+                'slug': row['slug'],
+                'price': price(row['price']),
+                'subcategory': {
+                    'id': row['subcategory__id'],
+                    'name': row['subcategory__name'],
+                    'slug': row['subcategory__slug'],
+                    'parent_category': row['subcategory__category__name'],
+                },
+                'image_large': image_large_url(row['image_large']),
+                'image_medium': image_medium_url(row['image_medium']),
+                'image_small': image_small_url(row['image_small']),
+            }
+        return build_row
+
+
+class FastSerializationMixin:
+    """
+    Включает быструю сериализацию для list, если у вьюсета задан fast_serializer_class
+    и в настройках включен CATALOG_FAST_SERIALIZATION.
+    """
+
+    fast_serializer_class: type[FastSerializer] | None = None
+
+    def list(self, request, *args, **kwargs):
+        if self.fast_serializer_class is None or not CATALOG_FAST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+        serializer: FastSerializer = self.fast_serializer_class(request)
+        rows = serializer.get_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        with timed('serialize'):
+            data: list[dict[str, any]] = serializer.serialize(rows if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
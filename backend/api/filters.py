@@ -0,0 +1,90 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class ProductFilterBackend(BaseFilterBackend):
+    """
+    Фильтрует товары по категории, подкатегории, диапазону цен и списку slug,
+    а также ищет по названию. Каждое условие опирается на индекс таблицы shop_product.
+    """
+
+    category_param: str = 'category'
+    subcategory_param: str = 'subcategory'
+    min_price_param: str = 'min_price'
+    max_price_param: str = 'max_price'
+    slug_param: str = 'slug'
+    search_param: str = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        if params.get(self.category_param):
+            queryset = queryset.filter(subcategory__category__slug=params[self.category_param])
+        if params.get(self.subcategory_param):
+            queryset = queryset.filter(subcategory__slug=params[self.subcategory_param])
+        if params.get(self.min_price_param):
+            queryset = queryset.filter(price__gte=self.get_price(params, self.min_price_param))
+        if params.get(self.max_price_param):
+            queryset = queryset.filter(price__lte=self.get_price(params, self.max_price_param))
+        if params.get(self.slug_param):
+            slugs: list[str] = [slug for slug in params[self.slug_param].split(',') if slug]
+            queryset = queryset.filter(slug__in=slugs)
+        if params.get(self.search_param, '').strip():
+            queryset = queryset.search(params[self.search_param].strip())
+        return queryset
+
+    def get_price(self, params, param: str) -> Decimal:
+        try:
+            price = Decimal(params[param])
+        except InvalidOperation:
+            raise ValidationError({param: ['Требуется численное значение.']})
+        if not price.is_finite():
+            raise ValidationError({param: ['Требуется численное значение.']})
+        return price
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.category_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Slug категории товара.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.subcategory_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Slug подкатегории товара.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.min_price_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Минимальная цена товара.',
+                'schema': {'type': 'number'},
+            },
+            {
+                'name': self.max_price_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Максимальная цена товара.',
+                'schema': {'type': 'number'},
+            },
+            {
+                'name': self.slug_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Список slug товаров через запятую.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.search_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Поиск по названию товара.',
+                'schema': {'type': 'string'},
+            },
+        ]
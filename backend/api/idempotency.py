@@ -0,0 +1,152 @@
+import hashlib
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template.response import SimpleTemplateResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from backend.settings import (IDEMPOTENCY_CACHE_ALIAS, IDEMPOTENCY_KEY_MAX_LEN,
+                              IDEMPOTENCY_KEY_PREFIX, IDEMPOTENCY_KEY_TTL,
+                              IDEMPOTENCY_LOCK_TIMEOUT)
+
+IDEMPOTENCY_HEADER: str = 'Idempotency-Key'
+IDEMPOTENCY_REPLAYED_HEADER: str = 'Idempotent-Replayed'
+
+# Состояния записи ключа в кэше: (IN_PROGRESS, отпечаток) или (DONE, отпечаток, статус, Content-Type, тело).
+IN_PROGRESS: str = 'in_progress'
+DONE: str = 'done'
+
+
+class IdempotencyKeyInUse(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Запрос с этим ключом идемпотентности еще выполняется. Повторите его позже.'
+    default_code = 'idempotency_key_in_use'
+
+
+class IdempotencyKeyMismatch(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'Ключ идемпотентности уже использован для запроса с другим телом.'
+    default_code = 'idempotency_key_mismatch'
+
+
+def get_idempotency_cache_key(request) -> str | None:
+    """Ключ записи в кэше для заголовка Idempotency-Key; ключи разных пользователей не пересекаются."""
+    key: str | None = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LEN:
+        raise ValidationError({IDEMPOTENCY_HEADER: [
+            f'Ключ должен быть непустой строкой не длиннее {IDEMPOTENCY_KEY_MAX_LEN} символов.'
+        ]})
+    digest: str = hashlib.md5(key.encode()).hexdigest()
+    return f'{IDEMPOTENCY_KEY_PREFIX}:{request.user.pk}:{digest}'
+
+
+def get_request_fingerprint(request) -> str:
+    """Отпечаток тела запроса: повтор с тем же ключом должен совпадать с исходным запросом байт в байт."""
+    return hashlib.md5(request.body).hexdigest()
+
+
+def claim_idempotency_key(cache_key: str, fingerprint: str) -> HttpResponse | None:
+    """
+    Занимает ключ для выполнения запроса и возвращает None. Если запрос с этим ключом уже выполнен,
+    возвращает сохраненный ответ; если выполняется - отвечает 409, если тело другое - 422.
+    """
+    cache = caches[IDEMPOTENCY_CACHE_ALIAS]
+    # Запись могла истечь между add и get: тогда ключ занимается повторно.
+    for _attempt in range(2):
+        if cache.add(cache_key, (IN_PROGRESS, fingerprint), IDEMPOTENCY_LOCK_TIMEOUT):
+            return None
+        record: tuple | None = cache.get(cache_key)
+        if record is not None:
+            break
+    else:
+        raise IdempotencyKeyInUse()
+    state, stored_fingerprint, *response = record
+    if stored_fingerprint != fingerprint:
+        raise IdempotencyKeyMismatch()
+    if state == IN_PROGRESS:
+        raise IdempotencyKeyInUse()
+    status_code, content_type, content = response
+    return HttpResponse(
+        content,
+        status=status_code,
+        content_type=content_type,
+        headers={IDEMPOTENCY_REPLAYED_HEADER: 'true'},
+    )
+
+
+def save_idempotent_response(cache_key: str, fingerprint: str, response: HttpResponse) -> None:
+    """Сохраняет готовый ответ для повторов. Ответ с ошибкой сервера освобождает ключ: запрос можно повторить."""
+    cache = caches[IDEMPOTENCY_CACHE_ALIAS]
+    if response.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+        cache.delete(cache_key)
+        return
+    cache.set(
+        cache_key,
+        (DONE, fingerprint, response.status_code, response['Content-Type'], response.content),
+        IDEMPOTENCY_KEY_TTL,
+    )
+
+
+def release_idempotency_key(cache_key: str) -> None:
+    caches[IDEMPOTENCY_CACHE_ALIAS].delete(cache_key)
+
+
+def finish_idempotent_response(cache_key: str, fingerprint: str, response: HttpResponse) -> HttpResponse:
+    if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+        # Response DRF рендерится после выхода из обработчика: ответ сохраняется, когда готово тело.
+        response.add_post_render_callback(partial(save_idempotent_response, cache_key, fingerprint))
+    else:
+        save_idempotent_response(cache_key, fingerprint, response)
+    return response
+
+
+def idempotent(handler):
+    """
+    Декоратор метода вьюхи: запрос с заголовком Idempotency-Key выполняется один раз, а повторы
+    с тем же ключом и телом получают сохраненный ответ без обращения к БД. Ответы хранятся
+    IDEMPOTENCY_KEY_TTL секунд в кэше IDEMPOTENCY_CACHE_ALIAS, который должен быть общим для всех воркеров.
+    Ключ освобождается, если обработчик завершился исключением (в том числе ошибкой валидации).
+    """
+
+    @wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        cache_key: str | None = get_idempotency_cache_key(request)
+        if cache_key is None:
+            return handler(view, request, *args, **kwargs)
+        fingerprint: str = get_request_fingerprint(request)
+        replay: HttpResponse | None = claim_idempotency_key(cache_key, fingerprint)
+        if replay is not None:
+            return replay
+        try:
+            response = handler(view, request, *args, **kwargs)
+        except BaseException:
+            release_idempotency_key(cache_key)
+            raise
+        return finish_idempotent_response(cache_key, fingerprint, response)
+    return wrapper
+
+
+def aidempotent(handler):
+    """Асинхронная версия idempotent для методов AsyncAPIView; кэш может быть сетевым, поэтому он вызывается в потоке."""
+
+    @wraps(handler)
+    async def wrapper(view, request, *args, **kwargs):
+        cache_key: str | None = get_idempotency_cache_key(request)
+        if cache_key is None:
+            return await handler(view, request, *args, **kwargs)
+        fingerprint: str = get_request_fingerprint(request)
+        replay: HttpResponse | None = await sync_to_async(claim_idempotency_key)(cache_key, fingerprint)
+        if replay is not None:
+            return replay
+        try:
+            response = await handler(view, request, *args, **kwargs)
+        except BaseException:
+            await sync_to_async(release_idempotency_key)(cache_key)
+            raise
+        return await sync_to_async(finish_idempotent_response)(cache_key, fingerprint, response)
+    return wrapper
@@ -0,0 +1,144 @@
+import asyncio
+import ssl
+import time
+from urllib.parse import urlsplit
+
+
+class LoadResult:
+    """Результат нагрузки на один URL: число ответов, ошибок и задержки в секундах."""
+
+    def __init__(self, url: str, duration: float, latencies: list[float], errors: int, statuses: dict[int, int]):
+        self.url = url
+        self.duration = duration
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.statuses = statuses
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        index: int = min(len(self.latencies) - 1, int(len(self.latencies) * percent / 100))
+        return self.latencies[index]
+
+    def as_dict(self) -> dict[str, any]:
+        return {
+            'url': self.url,
+            'requests': self.requests,
+            'errors': self.errors,
+            'statuses': self.statuses,
+            'duration': round(self.duration, 3),
+            'rps': round(self.rps, 1),
+            'p50_ms': round(self.percentile(50) * 1000, 2),
+            'p90_ms': round(self.percentile(90) * 1000, 2),
+            'p95_ms': round(self.percentile(95) * 1000, 2),
+            'p99_ms': round(self.percentile(99) * 1000, 2),
+            'max_ms': round(self.latencies[-1] * 1000, 2) if self.latencies else 0.0,
+        }
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, bool]:
+    """Читает ответ HTTP/1.1 целиком и возвращает статус и признак keep-alive."""
+    status_line: bytes = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Сервер закрыл соединение.')
+    status: int = int(status_line.split()[1])
+    headers: dict[str, str] = {}
+    while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    if headers.get('transfer-encoding') == 'chunked':
+        while size := int((await reader.readline()).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif status not in (204, 304):
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+async def worker(
+    url: str,
+    headers: dict[str, str],
+    deadline: float,
+    latencies: list[float],
+    statuses: dict[int, int],
+    method: str = 'GET',
+    body: bytes = b'',
+) -> int:
+    """Отправляет запросы по одному keep-alive соединению до наступления deadline."""
+    parts = urlsplit(url)
+    secure: bool = parts.scheme == 'https'
+    port: int = parts.port or (443 if secure else 80)
+    target: str = parts.path or '/'
+    if parts.query:
+        target = f'{target}?{parts.query}'
+    request: bytes = ''.join((
+        f'{method} {target} HTTP/1.1\r\n',
+        f'Host: {parts.netloc}\r\n',
+        *(f'{name}: {value}\r\n' for name, value in headers.items()),
+        f'Content-Length: {len(body)}\r\n' if body or method not in ('GET', 'HEAD',) else '',
+        '\r\n',
+    )).encode() + body
+    errors: int = 0
+    writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(
+                    parts.hostname, port, ssl=ssl.create_default_context() if secure else None,
+                )
+            started_at: float = time.monotonic()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+            latencies.append(time.monotonic() - started_at)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status >= 500:
+                errors += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            errors += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+    return errors
+
+
+async def run_load(
+    url: str,
+    concurrency: int,
+    duration: float,
+    headers: dict[str, str] | list[dict[str, str]] | None = None,
+    method: str = 'GET',
+    body: bytes = b'',
+) -> LoadResult:
+    """
+    Нагружает URL заданным числом параллельных соединений в течение duration секунд.
+    headers может быть списком: соединение i отправляет заголовки headers[i % len(headers)],
+    например токен своего пользователя, чтобы записи в корзину не конкурировали за одни строки.
+    """
+    per_connection: list[dict[str, str]] = headers if isinstance(headers, list) else [headers or {}]
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    started_at: float = time.monotonic()
+    deadline: float = started_at + duration
+    errors: list[int] = await asyncio.gather(*(
+        worker(url, per_connection[index % len(per_connection)], deadline, latencies, statuses, method, body)
+        for index in range(concurrency)
+    ))
+    return LoadResult(url, time.monotonic() - started_at, latencies, sum(errors), statuses)
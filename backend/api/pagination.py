@@ -0,0 +1,80 @@
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from shop.models import estimate_count
+
+COUNT_EXACT: str = 'exact'
+COUNT_ESTIMATE: str = 'estimate'
+
+
+class CatalogCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация по (name, id) без COUNT(*) и OFFSET.
+    Количество объектов считается только по запросу: ?count=exact или ?count=estimate.
+    """
+
+    ordering = ('name', 'id',)
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = self.get_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request) -> list:
+        """
+        Асинхронная версия paginate_queryset для асинхронных вьюх.
+        Курсорная пагинация DRF строит запрос и читает страницу за один вызов, поэтому он выполняется
+        через sync_to_async - так же, как асинхронные методы ORM Django.
+        """
+        return await sync_to_async(self.paginate_queryset)(queryset, Request(request))
+
+    def get_count(self, queryset, request) -> int | None:
+        count_mode: str | None = request.query_params.get(self.count_query_param)
+        if count_mode == COUNT_EXACT:
+            return queryset.count()
+        if count_mode == COUNT_ESTIMATE:
+            return estimate_count(queryset)
+        return None
+
+    def get_paginated_response(self, data):
+        response_data: dict[str, any] = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            response_data = {'count': self.count, **response_data}
+        return Response(response_data)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'] = {
+            'count': {
+                'type': 'integer',
+                'example': 123,
+            },
+            **response_schema['properties'],
+        }
+        return response_schema
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """Постраничная пагинация для асинхронных вьюх: COUNT(*) и страница читаются через async ORM."""
+
+    async def apaginate_queryset(self, queryset, request) -> list:
+        paginator = self.django_paginator_class(queryset, self.page_size)
+        paginator.count = await queryset.acount()
+        page_number: str = request.GET.get(self.page_query_param) or 1
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        self.request = request
+        return list(self.page)
@@ -0,0 +1,105 @@
+import json
+import re
+
+from django.db import connections
+
+from api.audit import AuditRequest
+
+SQLITE_SCAN_PATTERN = re.compile(r'^SCAN (\w+)$')
+SQLITE_LIMIT_PATTERN = re.compile(r'\s+LIMIT\s+\d+(?:\s+OFFSET\s+\d+)?\s*$', re.IGNORECASE)
+SQLITE_SORT_PREFIX: str = 'USE TEMP B-TREE FOR'
+POSTGRES_SORT_NODES: tuple[str, ...] = ('Sort', 'Incremental Sort',)
+
+
+def walk_plan(node: dict[str, any]):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from walk_plan(child)
+
+
+def is_select(sql: str) -> bool:
+    return sql.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+class PlanAudit:
+    """
+    Проверяет через EXPLAIN планы запросов, выполненных запросом аудита: последовательное
+    сканирование или сортировка таблицы не меньше min_rows строк считается проблемой.
+    Используется командой check_query_plans и тестами shop/tests/test_query_plans.py.
+    """
+
+    def __init__(self, min_rows: int, write_plan=None):
+        self.min_rows = min_rows
+        self.write_plan = write_plan
+        self.table_rows: dict[tuple[str, str], float] = {}
+
+    def get_issues(self, audit_request: AuditRequest, queries: list[tuple[str, str, any]]) -> list[str]:
+        """Проблемы планов SELECT-запросов из queries (псевдоним БД, SQL, параметры)."""
+        issues: list[str] = []
+        for alias, sql, params in queries:
+            if not is_select(sql):
+                continue
+            for kind, table, rows in self.explain(alias, sql, params):
+                if rows < self.min_rows or audit_request.full_pass:
+                    continue
+                action: str = 'последовательное сканирование' if kind == 'scan' else 'сортировка'
+                issues.append(f'  {audit_request}: {action} {table or ""} (~{rows:.0f} строк)\n    {sql}')
+        return issues
+
+    def explain(self, alias: str, sql: str, params) -> list[tuple[str, str | None, float]]:
+        """Возвращает узлы плана, которые проверяет аудит: ('scan' | 'sort', таблица, оценка числа строк)."""
+        connection = connections[alias]
+        if connection.vendor == 'postgresql':
+            return self.explain_postgresql(alias, sql, params)
+        if connection.vendor == 'sqlite':
+            return self.explain_sqlite(alias, sql, params)
+        raise ValueError(f'Проверка планов не поддерживает СУБД {connection.vendor}.')
+
+    def explain_postgresql(self, alias: str, sql: str, params) -> list[tuple[str, str | None, float]]:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        if self.write_plan:
+            self.write_plan(f'{sql}\n{json.dumps(plan, indent=2)}')
+        nodes: list[tuple[str, str | None, float]] = []
+        for node in walk_plan(plan[0]['Plan']):
+            if node['Node Type'] == 'Seq Scan':
+                nodes.append(('scan', node['Relation Name'], self.get_table_rows(alias, node['Relation Name'])))
+            elif node['Node Type'] in POSTGRES_SORT_NODES:
+                nodes.append(('sort', None, node['Plan Rows']))
+        return nodes
+
+    def explain_sqlite(self, alias: str, sql: str, params) -> list[tuple[str, str | None, float]]:
+        """SQLite не оценивает число строк в плане, поэтому размер сортировки считается по выборке без LIMIT."""
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            details: list[str] = [row[3] for row in cursor.fetchall()]
+        if self.write_plan:
+            self.write_plan(f'{sql}\n' + '\n'.join(f'  {detail}' for detail in details))
+        nodes: list[tuple[str, str | None, float]] = []
+        for detail in details:
+            match = SQLITE_SCAN_PATTERN.match(detail)
+            if match:
+                nodes.append(('scan', match[1], self.get_table_rows(alias, match[1])))
+            elif detail.startswith(SQLITE_SORT_PREFIX):
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(f'SELECT COUNT(*) FROM ({SQLITE_LIMIT_PATTERN.sub("", sql)})', params)
+                    nodes.append(('sort', None, float(cursor.fetchone()[0])))
+        return nodes
+
+    def get_table_rows(self, alias: str, table: str) -> float:
+        if (alias, table) not in self.table_rows:
+            connection = connections[alias]
+            with connection.cursor() as cursor:
+                if table not in connection.introspection.table_names(cursor):
+                    # Псевдоним подзапроса, а не таблица.
+                    row = None
+                elif connection.vendor == 'postgresql':
+                    cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', (table,))
+                else:
+                    cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                row = cursor.fetchone()
+            self.table_rows[(alias, table)] = float(row[0]) if row else 0.0
+        return self.table_rows[(alias, table)]
@@ -1,19 +1,67 @@
-from drf_spectacular.utils import extend_schema, inline_serializer
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (OpenApiParameter, OpenApiResponse,
+                                   extend_schema, extend_schema_view,
+                                   inline_serializer)
 from rest_framework import serializers, status
 from rest_framework_simplejwt.serializers import (TokenObtainPairSerializer,
                                                   TokenRefreshSerializer)
 
-from api.serializers import ShoppingCartGetSerializer
+from api.idempotency import IdempotencyKeyInUse, IdempotencyKeyMismatch
+from api.serializers import (ShoppingCartDiffSerializer,
+                             ShoppingCartGetSerializer,
+                             ShoppingCartQuantitySerializer,
+                             ShoppingCartSummarySerializer)
+from api.views import (CategoryViewSet, CustomTokenObtainPairView,
+                       CustomTokenRefreshView, ProductViewSet,
+                       ShoppingCartViewSet, StatsView, SubcategoryViewSet)
 
 DEFAULT_400_REQUIRED: str = 'Обязательное поле.'
 DEFAULT_401: str = 'Учетные данные не были предоставлены.'
 DEFAULT_404: str = 'Страница не найдена.'
+DEFAULT_429: str = 'Запрос был проигнорирован. Expected available in 30 seconds.'
+
+CURSOR_COUNT_PARAMETER = OpenApiParameter(
+    name='count',
+    type=OpenApiTypes.STR,
+    enum=('exact', 'estimate',),
+    required=False,
+    description=(
+        'Добавляет в ответ количество товаров: exact - точное значение (COUNT), '
+        'estimate - оценка по плану запроса. По умолчанию количество не считается.'
+    ),
+)
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    name='Idempotency-Key',
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    required=False,
+    description=(
+        'Ключ идемпотентности: повтор запроса с тем же ключом и телом в течение суток получает '
+        'сохраненный ответ с заголовком Idempotent-Replayed, не изменяя корзину повторно.'
+    ),
+)
+
+THROTTLED_RESPONSE = OpenApiResponse(
+    response=inline_serializer(
+        name='throttled_error_429',
+        fields={'detail': serializers.CharField(default=DEFAULT_429)},
+    ),
+    description='Превышен лимит частоты запросов; повторить можно через число секунд из заголовка Retry-After.',
+)
+
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    """Описывает StatelessJWTAuthentication в схеме той же схемой безопасности jwtAuth, что и JWTAuthentication."""
+
+    target_class = 'api.authentication.StatelessJWTAuthentication'
 
 
 class ShoppingCartListSerializer(serializers.Serializer):
 
     total_products = serializers.IntegerField()
-    total_price = serializers.IntegerField()
+    total_price = serializers.DecimalField(max_digits=20, decimal_places=2, coerce_to_string=False)
     products = ShoppingCartGetSerializer
 
     class Meta:
@@ -31,9 +79,42 @@ CATEGORIES_VIEW_SCHEMA: dict = {
 }
 
 PRODUCT_VIEW_SCHEMA: dict = {
+    'export': extend_schema(
+        description=(
+            'Потоковая выгрузка всего каталога товаров в формате NDJSON (по умолчанию) или CSV (?format=csv). '
+            'Поддерживает фильтры списка товаров, выбор полей через ?fields= и выгрузку изменений через ?since=.'
+        ),
+        summary='Выгрузить каталог товаров.',
+        parameters=[
+            OpenApiParameter(
+                name='fields',
+                type=OpenApiTypes.STR,
+                required=False,
+                description='Список полей через запятую, например id,name,price.',
+            ),
+            OpenApiParameter(
+                name='since',
+                type=OpenApiTypes.DATETIME,
+                required=False,
+                description='Выгрузить только товары, измененные начиная с указанного момента (ISO 8601).',
+            ),
+        ],
+        responses={
+            (status.HTTP_200_OK, 'application/x-ndjson'): OpenApiTypes.STR,
+            (status.HTTP_200_OK, 'text/csv'): OpenApiTypes.STR,
+            status.HTTP_401_UNAUTHORIZED: inline_serializer(
+                name='products_export_error_401',
+                fields={'detail': serializers.CharField(default=DEFAULT_401)},
+            ),
+        },
+    ),
     'list': extend_schema(
-        description='Получение списка товаров.',
+        description=(
+            'Получение списка товаров с курсорной пагинацией по названию. '
+            'Ссылки next и previous содержат непрозрачный курсор следующей и предыдущей страницы.'
+        ),
         summary='Получить список товаров.',
+        parameters=[CURSOR_COUNT_PARAMETER],
     ),
     'retrieve': extend_schema(
         description='Получение товара по slug.',
@@ -50,7 +131,7 @@ SHOPPING_CART_SCHEMA = {
                 name='shopping_cart_get_200',
                 fields={
                     'total_products': serializers.IntegerField(),
-                    'total_price': serializers.IntegerField(),
+                    'total_price': serializers.DecimalField(max_digits=20, decimal_places=2, coerce_to_string=False),
                     'products': ShoppingCartGetSerializer()},
             ),
             status.HTTP_401_UNAUTHORIZED: inline_serializer(
@@ -62,6 +143,7 @@ SHOPPING_CART_SCHEMA = {
     'create': extend_schema(
         description='Обновление списка товаров в корзине.',
         summary='Обновить список товаров в корзине.',
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
         request=inline_serializer(
             name='shopping_cart_create_201',
             fields={
@@ -73,7 +155,7 @@ SHOPPING_CART_SCHEMA = {
                 name='shopping_cart_created_201',
                 fields={
                     'total_products': serializers.IntegerField(),
-                    'total_price': serializers.IntegerField(),
+                    'total_price': serializers.DecimalField(max_digits=20, decimal_places=2, coerce_to_string=False),
                     'products': ShoppingCartGetSerializer(), },
             ),
             status.HTTP_401_UNAUTHORIZED: inline_serializer(
@@ -82,8 +164,61 @@ SHOPPING_CART_SCHEMA = {
                     'detail': serializers.CharField(default=DEFAULT_401),
                 },
             ),
+            status.HTTP_409_CONFLICT: inline_serializer(
+                name='shopping_cart_create_error_409',
+                fields={'detail': serializers.CharField(default=IdempotencyKeyInUse.default_detail)},
+            ),
+            status.HTTP_422_UNPROCESSABLE_ENTITY: inline_serializer(
+                name='shopping_cart_create_error_422',
+                fields={'detail': serializers.CharField(default=IdempotencyKeyMismatch.default_detail)},
+            ),
+            status.HTTP_429_TOO_MANY_REQUESTS: THROTTLED_RESPONSE,
+        },
+    ),
+    'item': extend_schema(
+        description=(
+            'Устанавливает количество товара в корзине (PUT, PATCH) или удаляет товар из корзины (DELETE). '
+            'Остальные товары корзины не изменяются.'
+        ),
+        summary='Изменить или удалить товар в корзине.',
+        parameters=[
+            OpenApiParameter(name='product_id', type=OpenApiTypes.INT, location=OpenApiParameter.PATH),
+        ],
+        request=ShoppingCartQuantitySerializer,
+        responses={
+            status.HTTP_200_OK: ShoppingCartSummarySerializer,
+            status.HTTP_204_NO_CONTENT: None,
+            status.HTTP_401_UNAUTHORIZED: inline_serializer(
+                name='shopping_cart_item_error_401',
+                fields={'detail': serializers.CharField(default=DEFAULT_401)},
+            ),
+            status.HTTP_404_NOT_FOUND: inline_serializer(
+                name='shopping_cart_item_error_404',
+                fields={'detail': serializers.CharField(default=DEFAULT_404)},
+            ),
+            status.HTTP_429_TOO_MANY_REQUESTS: THROTTLED_RESPONSE,
+        },
+    ),
+    'items': extend_schema(
+        description=(
+            'Применяет пакет изменений к корзине: upsert добавляет товары или меняет их количество, '
+            'remove удаляет товары по id. Остальные товары корзины не изменяются.'
+        ),
+        summary='Пакетно изменить товары в корзине.',
+        request=ShoppingCartDiffSerializer,
+        responses={
+            status.HTTP_200_OK: ShoppingCartSummarySerializer,
+            status.HTTP_401_UNAUTHORIZED: inline_serializer(
+                name='shopping_cart_items_error_401',
+                fields={'detail': serializers.CharField(default=DEFAULT_401)},
+            ),
+            status.HTTP_429_TOO_MANY_REQUESTS: THROTTLED_RESPONSE,
         },
     ),
+    'retrieve': extend_schema(exclude=True),
+    'update': extend_schema(exclude=True),
+    'partial_update': extend_schema(exclude=True),
+    'destroy': extend_schema(exclude=True),
     'clear_shopping_cart': extend_schema(
         description='Очищает список товаров в корзине.',
         summary='Очистить список товаров в корзине.',
@@ -99,6 +234,7 @@ SHOPPING_CART_SCHEMA = {
                     'detail': serializers.CharField(default=DEFAULT_401),
                 },
             ),
+            status.HTTP_429_TOO_MANY_REQUESTS: THROTTLED_RESPONSE,
         },
     ),
 }
@@ -125,6 +261,7 @@ TOKEN_JWT_OBTAIN_SCHEMA: dict = {
                 'detail': serializers.CharField(default='No account found with the given credentials',),
             },
         ),
+        status.HTTP_429_TOO_MANY_REQUESTS: THROTTLED_RESPONSE,
     }
 }
 
@@ -140,5 +277,53 @@ TOKEN_JWT_REFRESH_SCHEMA: dict = {
                 'code': serializers.CharField(default='token_not_valid')
             },
         ),
+        status.HTTP_429_TOO_MANY_REQUESTS: THROTTLED_RESPONSE,
     },
 }
+
+STATS_SCHEMA: dict = {
+    'description': (
+        'Возвращает метрики процесса, обработавшего запрос: попадания в кэш каталога, '
+        'в кэш статусов пользователей JWT (при JWT_STATELESS_AUTH), '
+        'счетчики ограничителей частоты (throttle), хранилище корзин (carts: при CART_CACHE_STORAGE - попадания в кэш '
+        'и число изменений, еще не записанных в БД) и пулы соединений с БД (ожидание соединения, занятые и свободные '
+        'соединения). '
+        'Доступно только персоналу.'
+    ),
+    'summary': 'Метрики процесса.',
+    'responses': {
+        status.HTTP_200_OK: OpenApiTypes.OBJECT,
+        status.HTTP_401_UNAUTHORIZED: inline_serializer(
+            name='stats_error_401',
+            fields={'detail': serializers.CharField(default=DEFAULT_401)},
+        ),
+        status.HTTP_403_FORBIDDEN: inline_serializer(
+            name='stats_error_403',
+            fields={'detail': serializers.CharField(default='У вас недостаточно прав для выполнения данного действия.')},
+        ),
+    },
+}
+
+VIEW_SCHEMAS: dict[type, any] = {
+    CategoryViewSet: extend_schema_view(**CATEGORIES_VIEW_SCHEMA),
+    CustomTokenObtainPairView: extend_schema(**TOKEN_JWT_OBTAIN_SCHEMA),
+    CustomTokenRefreshView: extend_schema(**TOKEN_JWT_REFRESH_SCHEMA),
+    ProductViewSet: extend_schema_view(**PRODUCT_VIEW_SCHEMA),
+    ShoppingCartViewSet: extend_schema_view(**SHOPPING_CART_SCHEMA),
+    StatsView: extend_schema(**STATS_SCHEMA),
+    SubcategoryViewSet: extend_schema_view(**SUBCATEGORIES_VIEW_SCHEMA),
+}
+
+SCHEMA_APPLIED_VIEWS: set[type] = set()
+
+
+def apply_view_schemas(endpoints: list) -> list:
+    """
+    Хук PREPROCESSING_HOOKS drf-spectacular: применяет описания из VIEW_SCHEMAS к вьюхам
+    только при генерации схемы, чтобы вьюхи не импортировали drf-spectacular при запуске.
+    """
+    for view, decorator in VIEW_SCHEMAS.items():
+        if view not in SCHEMA_APPLIED_VIEWS:
+            decorator(view)
+            SCHEMA_APPLIED_VIEWS.add(view)
+    return endpoints
@@ -1,6 +1,11 @@
-from rest_framework.serializers import (CharField, IntegerField,
-                                        ModelSerializer, ValidationError)
-
+from rest_framework.fields import CurrentUserDefault
+from rest_framework.serializers import (CharField, DecimalField, HiddenField,
+                                        IntegerField, ListField,
+                                        ListSerializer, ModelSerializer,
+                                        PrimaryKeyRelatedField, Serializer,
+                                        ValidationError)
+
+from shop.carts import cart_storage
 from shop.models import Category, Product, ShoppingCart, Subcategory
 
 
@@ -55,24 +60,101 @@ class ShoppingCartGetSerializer(ModelSerializer):
     """GET-Сериализатор модели Корзины."""
 
     product = CharField(source='product.name')
-    price = IntegerField(source='product.price')
+    price = DecimalField(source='product.price', max_digits=10, decimal_places=2, coerce_to_string=False)
 
     class Meta:
         model = ShoppingCart
         fields = ('product', 'price', 'quantity',)
 
 
+class ShoppingCartSummarySerializer(Serializer):
+    """Сериализатор содержимого корзины с итогами, посчитанными в БД."""
+
+    total_products = IntegerField()
+    total_price = DecimalField(max_digits=20, decimal_places=2, coerce_to_string=False)
+    products = ShoppingCartGetSerializer(many=True)
+
+
+class ProductIdField(PrimaryKeyRelatedField):
+    """
+    Поле id товара, которое проверяет только формат id. Товары загружает ShoppingCartItemListSerializer.
+    Принимается целое число или строка из цифр: 1.9, True и '1e3' не превращаются в другой товар.
+    """
+
+    def to_internal_value(self, data):
+        product_id: int | None = self.parse(data)
+        if product_id is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        return product_id
+
+    @staticmethod
+    def parse(data) -> int | None:
+        if isinstance(data, str) and data.isascii() and data.isdigit():
+            return int(data)
+        if not isinstance(data, int) or isinstance(data, bool):
+            return None
+        return data
+
+
+def get_item_product_ids(items) -> set[int]:
+    """
+    Возвращает id товаров из еще не проверенных позиций корзины. Некорректные позиции пропускаются:
+    их отклонит сериализатор. Асинхронные вьюхи загружают по этим id товары async ORM
+    и передают их сериализатору в context['products'].
+    """
+    if not isinstance(items, list):
+        return set()
+    product_ids: set[int] = set()
+    for item in items:
+        product_id: int | None = ProductIdField.parse(item.get('product')) if isinstance(item, dict) else None
+        if product_id is not None:
+            product_ids.add(product_id)
+    return product_ids
+
+
+class ShoppingCartItemListSerializer(ListSerializer):
+    """
+    Загружает товары всех позиций корзины одним запросом IN вместо запроса на каждую позицию.
+    Товары, уже загруженные вьюхой, берутся из context['products'] без запроса.
+    """
+
+    def to_internal_value(self, data):
+        items: list[dict[str, any]] = super().to_internal_value(data)
+        products: dict[int, Product] | None = self.context.get('products')
+        if products is None:
+            products = Product.objects.in_bulk({item['product'] for item in items})
+        errors: list[dict[str, list[str]]] = []
+        for item in items:
+            product: Product | None = products.get(item['product'])
+            if product is None:
+                errors.append({
+                    'product': [
+                        self.child.fields['product'].error_messages['does_not_exist'].format(pk_value=item['product'])
+                    ],
+                })
+                continue
+            item['product'] = product
+            errors.append({})
+        if any(errors):
+            raise ValidationError(errors)
+        return items
+
+
 class ShoppingCartSimpleGetSerializer(ModelSerializer):
     """GET-Сериализатор модели Корзины, сокращенный. Используется в POST-Сериализаторе модели Корзины."""
 
+    product = ProductIdField(queryset=Product.objects.all())
+
     class Meta:
         model = ShoppingCart
         fields = ('product', 'quantity',)
+        list_serializer_class = ShoppingCartItemListSerializer
 
 
 class ShoppingCartPostSerializer(ModelSerializer):
     """POST-Сериализатор модели Корзины."""
 
+    user = HiddenField(default=CurrentUserDefault())
     products = ShoppingCartSimpleGetSerializer(many=True)
 
     class Meta:
@@ -115,45 +197,36 @@ class ShoppingCartPostSerializer(ModelSerializer):
         return super().validate(attrs)
 
     def create(self, validated_data):
-        """
-        cart_items: list[ShoppingCart] = []
-        for item in validated_data['products']:
-            cart_items.append(
-                ShoppingCart(
-                    user=validated_data['user'],
-                    product=item['product'],
-                    quantity=item['quantity'],
-                )
-            )
-        """
-        cart_items = [
-            ShoppingCart(
-                user=validated_data['user'],
-                product=item['product'],
-                quantity=item['quantity']
-            )
-            for item in validated_data['products']
-        ]
-        objects: list[ShoppingCart] = ShoppingCart.objects.bulk_create(cart_items)
-        self.context['objects'] = objects
-        return objects
+        cart_storage.replace_items(validated_data['user'], validated_data['products'])
+        return validated_data
 
     def to_representation(self, instance):
-        objects: list[ShoppingCart] = self.context['objects']
-        total_products = len(objects)
-        total_price = sum(object.product.price * object.quantity for object in objects)
-        products: list[dict[str, any]] = []
-        for object in objects:
-            products.append(
-                {
-                    'product': object.product.name,
-                    'price': object.product.price,
-                    'quantity': object.quantity,
-                }
-            )
-        data = {
-            'total_products': total_products,
-            'total_price': total_price,
-            'products': products,
-        }
-        return data
+        summary: dict[str, any] = cart_storage.summary(self.context['request'].user)
+        return ShoppingCartSummarySerializer(summary).data
+
+
+class ShoppingCartQuantitySerializer(ModelSerializer):
+    """Сериализатор количества одного товара в корзине."""
+
+    class Meta:
+        model = ShoppingCart
+        fields = ('quantity',)
+
+
+class ShoppingCartDiffSerializer(Serializer):
+    """Сериализатор пакетного изменения корзины: добавляемые/изменяемые и удаляемые товары."""
+
+    upsert = ShoppingCartSimpleGetSerializer(many=True, required=False)
+    remove = ListField(child=IntegerField(min_value=1), required=False)
+
+    def validate(self, attrs):
+        upsert: list[dict[str, any]] = attrs.get('upsert', [])
+        remove: list[int] = attrs.get('remove', [])
+        if not upsert and not remove:
+            raise ValidationError('Передайте товары в upsert или remove.')
+        upsert_ids: list[int] = [item['product'].id for item in upsert]
+        if len(upsert_ids) != len(set(upsert_ids)):
+            raise ValidationError({'upsert': ['Товар указан несколько раз.']})
+        if set(upsert_ids) & set(remove):
+            raise ValidationError({'remove': ['Товар нельзя одновременно изменить и удалить.']})
+        return attrs
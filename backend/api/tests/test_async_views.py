@@ -0,0 +1,125 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.cache import get_cache_stats
+from shop.carts import CacheCartStorage, get_lock_key, paused_background_flush
+from shop.models import Product
+from shop.tests.utils import (LocalCacheTestCase, clear_caches, create_catalog,
+                              get_client)
+
+ASYNC_URLCONF: str = 'api.tests.urls_async'
+
+
+class AsyncCatalogViewTests(LocalCacheTestCase):
+    """Асинхронные вьюхи каталога отвечают так же, как вьюсеты, и используют тот же кэш."""
+
+    def setUp(self):
+        super().setUp()
+        self.category, self.subcategory, self.products = create_catalog()
+        self.paths: list[str] = [
+            '/api/categories/', f'/api/categories/{self.category.pk}/',
+            '/api/subcategories/', f'/api/subcategories/{self.subcategory.pk}/',
+            '/api/products/', f'/api/products/{self.products[0].pk}/',
+            f'/api/products/?subcategory={self.subcategory.slug}&max_price=3',
+            '/api/products/?count=exact',
+        ]
+
+    def get_async(self, path: str, **headers):
+        """Запрос через ASGI-обработчик; ORM выполняется в потоке теста, поэтому assertNumQueries видит запросы."""
+        with override_settings(ROOT_URLCONF=ASYNC_URLCONF):
+            return async_to_sync(self.async_client.get)(path, headers=headers)
+
+    def test_same_bytes_as_viewsets_in_both_serialization_modes(self):
+        for fast in (True, False):
+            for path in self.paths:
+                with (
+                    self.subTest(path, fast=fast),
+                    mock.patch('api.async_views.CATALOG_FAST_SERIALIZATION', fast),
+                    mock.patch('api.fast_serializers.CATALOG_FAST_SERIALIZATION', fast),
+                ):
+                    clear_caches()
+                    expected = self.client.get(path)
+                    clear_caches()
+                    response = self.get_async(path)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response['X-Cache'], 'MISS')
+                    self.assertEqual(response.content, expected.content)
+
+    def test_repeated_get_is_served_from_cache(self):
+        hits: int = get_cache_stats()['hits']
+        with self.assertNumQueries(1):
+            first = self.get_async('/api/products/')
+        with self.assertNumQueries(0):
+            second = self.get_async('/api/products/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(get_cache_stats()['hits'], hits + 1)
+
+    def test_shares_cache_entries_with_viewsets(self):
+        self.client.get('/api/categories/')
+        response = self.get_async('/api/categories/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_conditional_get(self):
+        first = self.get_async('/api/products/')
+        for headers in ({'If-None-Match': first['ETag']}, {'If-Modified-Since': first['Last-Modified']}):
+            with self.subTest(headers):
+                response = self.get_async('/api/products/', **headers)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], first['ETag'])
+
+    def test_change_invalidates_dependent_entries(self):
+        self.get_async('/api/products/')
+        self.get_async('/api/categories/')
+        Product.objects.get(pk=self.products[0].pk).save()
+        response = self.get_async('/api/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.get_async('/api/categories/')['X-Cache'], 'HIT')
+
+
+class AsyncShoppingCartViewTests(LocalCacheTestCase):
+    """Асинхронные вьюхи корзины проверяют товары без потока ORM и отвечают 409 на занятую корзину."""
+
+    def setUp(self):
+        super().setUp()
+        _, _, self.products = create_catalog()
+        self.user = User.objects.create_user('buyer')
+        self.headers: dict[str, str] = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def post_async(self, path: str, data):
+        with override_settings(ROOT_URLCONF=ASYNC_URLCONF):
+            return async_to_sync(self.async_client.post)(
+                path, data, content_type='application/json', headers=self.headers,
+            )
+
+    def test_validation_matches_viewsets(self):
+        requests: tuple[tuple[str, dict], ...] = (
+            ('/api/shopping_cart/', {'products': [{'product': self.products[0].pk, 'quantity': 2}]}),
+            ('/api/shopping_cart/', {'products': [{'product': 999, 'quantity': 2}, {'product': 'x'}]}),
+            ('/api/shopping_cart/', {'products': 'x'}),
+            ('/api/shopping_cart/items/', {'upsert': [{'product': str(self.products[1].pk), 'quantity': 1}]}),
+            ('/api/shopping_cart/items/', {'upsert': [{'product': 999, 'quantity': 1}]}),
+        )
+        client = get_client(self.user)
+        for path, data in requests:
+            with self.subTest(path=path, data=data):
+                expected = client.post(path, data, format='json')
+                response = self.post_async(path, data)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_locked_cart_is_a_conflict(self):
+        storage = CacheCartStorage()
+        storage.cache.add(get_lock_key(self.user.pk), 'other', 5)
+        with (
+            mock.patch('api.async_views.cart_storage', storage),
+            mock.patch('shop.carts.CART_LOCK_TIMEOUT', 0.05),
+            paused_background_flush(),
+        ):
+            response = self.post_async('/api/shopping_cart/items/', {'remove': [self.products[0].pk]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['detail'], 'Корзина изменяется другим запросом. Повторите запрос позже.')
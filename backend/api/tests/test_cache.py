@@ -0,0 +1,45 @@
+from api.cache import get_cache_stats
+from shop.models import Category, Product
+from shop.tests.utils import LocalCacheTestCase, create_catalog, get_client
+
+
+class CatalogCacheTests(LocalCacheTestCase):
+    """Кэш ответов каталога и его сброс по тегам моделей."""
+
+    def setUp(self):
+        super().setUp()
+        self.category, self.subcategory, self.products = create_catalog()
+        self.client = get_client()
+
+    def test_repeated_get_is_served_from_cache(self):
+        hits: int = get_cache_stats()['hits']
+        first = self.client.get('/api/products/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/products/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(get_cache_stats()['hits'], hits + 1)
+
+    def test_key_includes_path_and_query_string(self):
+        self.client.get('/api/products/')
+        self.assertEqual(self.client.get(f'/api/products/?slug={self.products[0].slug}')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(f'/api/products/{self.products[0].id}/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(f'/api/products/{self.products[0].id}/')['X-Cache'], 'HIT')
+
+    def test_product_change_invalidates_only_dependent_entries(self):
+        self.client.get('/api/products/')
+        self.client.get('/api/categories/')
+        Product.objects.filter(pk=self.products[0].pk).get().save()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/categories/')['X-Cache'], 'HIT')
+
+    def test_category_change_invalidates_products(self):
+        self.client.get('/api/products/')
+        Category.objects.filter(pk=self.category.pk).update(name='Овощи')
+        self.category.refresh_from_db()
+        self.category.save()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['subcategory']['parent_category'], 'Овощи')
@@ -0,0 +1,102 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from api.authentication import StatelessJWTAuthentication
+from api.views import ShoppingCartViewSet
+from shop.models import ShoppingCart
+from shop.tests.utils import (LOCAL_CACHES, LocalCacheTestCase, clear_caches,
+                              create_catalog, get_client)
+
+WRITERS: int = 8
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ConcurrentCartWriteTests(TransactionTestCase):
+    """
+    Параллельные замены корзины одного пользователя: без ошибок сервера и IntegrityError,
+    а итоговая корзина совпадает с одной из отправленных, а не смешивает их.
+    """
+
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+        _, _, self.products = create_catalog(products=WRITERS + 2)
+        self.user = User.objects.create_user('buyer')
+
+    def get_cart(self, writer: int) -> dict[int, int]:
+        """Состав корзины писателя writer: пересекается с соседними, чтобы замены задевали одни строки."""
+        return {self.products[writer + offset].pk: writer + offset + 1 for offset in range(3)}
+
+    def test_concurrent_replacements(self):
+        barrier = threading.Barrier(WRITERS)
+        statuses: list[int] = []
+        errors: list[BaseException] = []
+
+        def write(writer: int):
+            client = get_client(self.user)
+            data = {'products': [
+                {'product': product, 'quantity': quantity} for product, quantity in self.get_cart(writer).items()
+            ]}
+            try:
+                barrier.wait()
+                for _ in range(3):
+                    statuses.append(client.post('/api/shopping_cart/', data, format='json').status_code)
+            except BaseException as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        writers = [threading.Thread(target=write, args=(writer,)) for writer in range(WRITERS)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(statuses, [201] * WRITERS * 3)
+        cart: dict[int, int] = dict(
+            ShoppingCart.objects.filter(user=self.user).values_list('product_id', 'quantity')
+        )
+        self.assertIn(cart, [self.get_cart(writer) for writer in range(WRITERS)])
+
+
+class IdempotentReplayTests(LocalCacheTestCase):
+    """Повтор запроса с тем же Idempotency-Key получает сохраненный ответ без запросов к БД."""
+
+    def setUp(self):
+        super().setUp()
+        _, _, self.products = create_catalog()
+        self.user = User.objects.create_user('buyer')
+        self.data = {'products': [{'product': self.products[0].pk, 'quantity': 2}]}
+
+    def post(self, client, key: str, data=None):
+        return client.post('/api/shopping_cart/', data or self.data, format='json', headers={'Idempotency-Key': key})
+
+    def test_replay_makes_no_queries(self):
+        # Без загрузки пользователя по JWT: статус пользователя берется из кэша.
+        with mock.patch.object(ShoppingCartViewSet, 'authentication_classes', (StatelessJWTAuthentication,)):
+            client = get_client(self.user)
+            first = self.post(client, 'order-1')
+            with self.assertNumQueries(0):
+                replay = self.post(client, 'order-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay.content, first.content)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(ShoppingCart.objects.get(user=self.user).quantity, 2)
+
+    def test_replay_with_jwt_user_lookup_only_loads_user(self):
+        client = get_client(self.user)
+        self.post(client, 'order-1')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.post(client, 'order-1')['Idempotent-Replayed'], 'true')
+
+    def test_other_body_with_same_key_is_rejected(self):
+        client = get_client(self.user)
+        self.post(client, 'order-1')
+        other = {'products': [{'product': self.products[1].pk, 'quantity': 1}]}
+        self.assertEqual(self.post(client, 'order-1', other).status_code, 422)
+        self.assertEqual(self.post(client, 'order-2', other).status_code, 201)
@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import AccessToken
+
+from shop.tests.utils import LocalCacheTestCase, create_catalog, get_client
+
+
+class ExportTests(LocalCacheTestCase):
+    """Потоковая выгрузка каталога под WSGI и ASGI и ответы с ошибками."""
+
+    def setUp(self):
+        super().setUp()
+        _, _, self.products = create_catalog()
+        self.user = User.objects.create_user('exporter')
+
+    def test_wsgi_request_gets_sync_stream(self):
+        response = get_client(self.user).get('/api/products/export/?format=csv&fields=id,slug')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            b''.join(response.streaming_content).decode().splitlines(),
+            ['id,slug'] + [f'{product.pk},{product.slug}' for product in self.products],
+        )
+
+    async def test_asgi_request_gets_async_stream(self):
+        response = await self.async_client.get(
+            '/api/products/export/',
+            {'format': 'ndjson', 'fields': 'id'},
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        lines: list[bytes] = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(lines, [f'{{"id": {product.pk}}}'.encode() for product in self.products])
+
+    def test_errors_are_json_in_every_format(self):
+        client = get_client(self.user)
+        for export_format in ('csv', 'ndjson'):
+            with self.subTest(export_format):
+                response = client.get(f'/api/products/export/?format={export_format}&fields=id,unknown')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response['Content-Type'], 'application/json; charset=utf-8')
+                self.assertEqual(response.json(), {'fields': ['Неизвестные поля: unknown.']})
+        response = get_client().get('/api/products/export/?format=csv')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['Content-Type'], 'application/json; charset=utf-8')
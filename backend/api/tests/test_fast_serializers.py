@@ -0,0 +1,98 @@
+from decimal import Decimal
+from unittest import mock
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fast_serializers import (CategoryFastSerializer, FastSerializer,
+                                  ProductFastSerializer,
+                                  SubcategoryFastSerializer)
+from api.serializers import (CategoryGetSerializer, ProductGetSerializer,
+                             SubcategoryGetSerializer)
+from shop.models import Category, Product, Subcategory
+from shop.tests.utils import (LocalCacheTestCase, clear_caches, create_catalog,
+                              get_client)
+
+
+class FastSerializerParityTests(LocalCacheTestCase):
+    """Быстрые сериализаторы отдают те же байты, что и сериализаторы DRF."""
+
+    def setUp(self):
+        super().setUp()
+        self.category, self.subcategory, self.products = create_catalog()
+        Category.objects.create(name='Без картинки', slug='no-image')
+        # update, а не save: сигналы изображений не должны обрабатывать несуществующие файлы.
+        Category.objects.filter(pk=self.category.pk).update(image='categories/фрукты 1.png')
+        Subcategory.objects.filter(pk=self.subcategory.pk).update(image='subcategories/apples.jpg')
+        Product.objects.filter(pk=self.products[0].pk).update(
+            price=Decimal('10.50'),
+            image_large='products/p0 large.webp',
+            image_medium='products/p0_medium.webp',
+            image_small='products/p0_small.webp',
+        )
+        self.request = Request(APIRequestFactory().get('/api/products/', HTTP_HOST='shop.example'))
+
+    def render(self, data) -> bytes:
+        return JSONRenderer().render(data)
+
+    def assert_same_bytes(self, queryset, serializer_class, fast_serializer_class: type[FastSerializer]):
+        fast_serializer: FastSerializer = fast_serializer_class(self.request)
+        context: dict[str, Request] = {'request': self.request}
+        with self.subTest('list'):
+            self.assertEqual(
+                self.render(fast_serializer.serialize(fast_serializer.get_rows(queryset))),
+                self.render(serializer_class(queryset, many=True, context=context).data),
+            )
+        for instance in queryset:
+            with self.subTest('retrieve', pk=instance.pk):
+                self.assertEqual(
+                    self.render(fast_serializer.serialize(fast_serializer.get_rows(queryset.filter(pk=instance.pk)))[0]),
+                    self.render(serializer_class(instance, context=context).data),
+                )
+
+    def test_category(self):
+        self.assert_same_bytes(Category.objects.order_by('id'), CategoryGetSerializer, CategoryFastSerializer)
+
+    def test_subcategory(self):
+        self.assert_same_bytes(
+            Subcategory.objects.select_related('category').order_by('id'),
+            SubcategoryGetSerializer,
+            SubcategoryFastSerializer,
+        )
+
+    def test_product(self):
+        self.assert_same_bytes(
+            Product.objects.select_related('subcategory__category').order_by('id'),
+            ProductGetSerializer,
+            ProductFastSerializer,
+        )
+        fast_serializer = ProductFastSerializer(self.request)
+        row: dict[str, any] = fast_serializer.serialize(fast_serializer.get_rows(Product.objects.filter(
+            pk=self.products[0].pk,
+        )))[0]
+        self.assertEqual(row['image_large'], 'http://shop.example/media/products/p0%20large.webp')
+        self.assertEqual(row['price'], '10.50')
+
+    def test_views_respond_with_same_bytes_in_both_modes(self):
+        client = get_client()
+        paths: list[str] = [
+            '/api/categories/', f'/api/categories/{self.category.pk}/',
+            '/api/subcategories/', f'/api/subcategories/{self.subcategory.pk}/',
+            '/api/products/', f'/api/products/{self.products[0].pk}/',
+            f'/api/products/?subcategory={self.subcategory.slug}',
+        ]
+        for path in paths:
+            with self.subTest(path):
+                clear_caches()
+                with mock.patch('api.fast_serializers.CATALOG_FAST_SERIALIZATION', True):
+                    fast = client.get(path)
+                clear_caches()
+                with mock.patch('api.fast_serializers.CATALOG_FAST_SERIALIZATION', False):
+                    regular = client.get(path)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.content, regular.content)
+
+    def test_base_serializer_is_abstract(self):
+        with self.assertRaisesMessage(TypeError, 'compile'):
+            FastSerializer()
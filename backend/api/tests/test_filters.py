@@ -0,0 +1,90 @@
+import json
+import re
+from contextlib import contextmanager
+from typing import Any
+
+from django.db import connections
+
+from shop.models import Product
+from shop.seed import seed_catalog
+from shop.tests.utils import LocalCacheTestCase, get_client
+
+SQLITE_FULL_SCAN_PATTERN = re.compile(r'^SCAN (\w+)(?: USING (?!INTEGER PRIMARY KEY)|$)')
+
+
+def get_full_scans(alias: str, sql: str, params) -> list[str]:
+    """Таблицы, которые план запроса читает целиком: Seq Scan в PostgreSQL, SCAN в SQLite."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            nodes: list[dict] = [json.loads(plan)[0]['Plan'] if isinstance(plan, str) else plan[0]['Plan']]
+            tables: list[str] = []
+            while nodes:
+                node = nodes.pop()
+                nodes.extend(node.get('Plans', ()))
+                if node['Node Type'] == 'Seq Scan':
+                    tables.append(node['Relation Name'])
+            return tables
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [match[1] for row in cursor.fetchall() if (match := SQLITE_FULL_SCAN_PATTERN.match(row[3]))]
+
+
+@contextmanager
+def capture_selects():
+    """Собирает SELECT-запросы всех БД: (псевдоним, SQL, параметры)."""
+    queries: list[tuple[str, str, Any]] = []
+
+    def capture(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            queries.append((context['connection'].alias, sql, params))
+        return execute(sql, params, many, context)
+
+    wrappers = [connections[alias].execute_wrapper(capture) for alias in connections]
+    for wrapper in wrappers:
+        wrapper.__enter__()
+    try:
+        yield queries
+    finally:
+        for wrapper in reversed(wrappers):
+            wrapper.__exit__(None, None, None)
+
+
+class ProductFilterPlanTests(LocalCacheTestCase):
+    """Каждый фильтр и их сочетания опираются на индексы, а не на полное чтение shop_product."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(seed=1, categories=4, subcategories=5, products=50)
+        # Планировщику нужна статистика, как на рабочей базе после autovacuum.
+        with connections['default'].cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.product = Product.objects.select_related('subcategory__category').order_by('id').first()
+        cls.max_price = Product.objects.order_by('-price').values_list('price', flat=True).first()
+
+    def get_filters(self) -> dict[str, str]:
+        product = self.product
+        return {
+            'category': f'category={product.subcategory.category.slug}',
+            'subcategory': f'subcategory={product.subcategory.slug}',
+            'price range': f'min_price={product.price}&max_price={product.price}',
+            'min price': f'min_price={self.max_price}',
+            'slug list': f'slug={product.slug},{product.slug}-missing',
+            'search': f'search={product.name.split()[0]}',
+            'subcategory and price': f'subcategory={product.subcategory.slug}&min_price=1&max_price=100',
+            'category and search': f'category={product.subcategory.category.slug}&search={product.name.split()[1]}',
+            'slug and price': f'slug={product.slug}&max_price={product.price}',
+        }
+
+    def test_filters_do_not_scan_product_table(self):
+        client = get_client()
+        for name, query in self.get_filters().items():
+            with self.subTest(name), capture_selects() as queries:
+                response = client.get(f'/api/products/?{query}')
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.json()['results'])
+                product_queries = [query for query in queries if 'shop_product' in query[1]]
+                self.assertTrue(product_queries)
+                for alias, sql, params in product_queries:
+                    self.assertNotIn('shop_product', get_full_scans(alias, sql, params), sql)
@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import resolve
+
+from api.audit import get_api_url_names, get_audit_requests
+from api.tests.utils import QueryBudgetMixin, get_audit_client, isolated_caches
+from shop.models import ShoppingCart
+from shop.tests.utils import LocalCacheTestCase, create_catalog
+
+ASYNC_URLCONF: str = 'api.tests.urls_async'
+
+
+class QueryBudgetTests(QueryBudgetMixin, LocalCacheTestCase):
+    """Каждый маршрут api/urls.py выполняет ровно столько запросов к БД, сколько задано в api/audit.py."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Товаров больше размера страницы, чтобы проверить и переход по курсору.
+        _, _, products = create_catalog(products=12)
+        cls.product = products[0]
+        cls.user = User.objects.create_user('buyer')
+        ShoppingCart.objects.create(user=cls.user, product=cls.product, quantity=1)
+
+    def check_budgets(self) -> set[str]:
+        """Проверяет бюджеты всех запросов аудита и возвращает имена проверенных маршрутов."""
+        client = get_audit_client(self.user)
+        covered: set[str] = set()
+        with isolated_caches():
+            for audit_request in get_audit_requests(client, self.product, self.user):
+                with self.subTest(str(audit_request)):
+                    self.assert_query_budget(client, audit_request)
+                covered.add(audit_request.url_name)
+        return covered
+
+    def test_sync_views(self):
+        self.assertEqual(get_api_url_names() - self.check_budgets(), set())
+
+    @override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+    def test_async_views(self):
+        for path in ('/api/products/', '/api/shopping_cart/items/'):
+            self.assertTrue(resolve(path).func.view_class.view_is_async, path)
+        self.assertEqual(get_api_url_names() - self.check_budgets(), set())
+
+    def test_budget_mismatch_lists_queries(self):
+        client = get_audit_client(self.user)
+        audit_request = next(
+            audit_request for audit_request in get_audit_requests(client, self.product, self.user)
+            if audit_request.path == '/api/shopping_cart/'
+        )
+        audit_request.queries -= 1
+        with isolated_caches(), self.assertRaisesMessage(AssertionError, '2 запросов вместо 1'):
+            self.assert_query_budget(client, audit_request)
@@ -0,0 +1,139 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from backend.db.router import PRIMARY_STATE, ReplicaRouter, get_request_state
+from shop.models import Category, Product
+from shop.tests.utils import (LOCAL_CACHES, clear_caches, create_catalog,
+                              get_client)
+
+REPLICA: str = 'replica_tests'
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Чтения каталога идут в реплику, корзина и записи - в основную БД, а после записи клиент
+    читает из основной БД. Реплика - файл SQLite, скопированный командой sync_sqlite_replicas.
+    TransactionTestCase: внутри транзакции TestCase роутер отправил бы в основную БД все чтения.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Реплика подключается после проверок тестового класса: тестовая база для нее
+        # не создается, ее содержимое целиком заменяет sync_sqlite_replicas.
+        super().setUpClass()
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        connections.settings[REPLICA] = {
+            **connections[DEFAULT_DB_ALIAS].settings_dict,
+            'NAME': str(Path(directory.name) / 'replica.sqlite3'),
+        }
+        cls.addClassCleanup(connections.settings.pop, REPLICA)
+        cls.addClassCleanup(connections.__delitem__, REPLICA)
+        cls.addClassCleanup(lambda: connections[REPLICA].close())
+        for patcher in (
+            mock.patch('backend.db.router.DB_REPLICAS', (REPLICA,)),
+            mock.patch('shop.management.commands.sync_sqlite_replicas.DB_REPLICAS', (REPLICA,)),
+            # Каталог только что создан, и без этого ответы с промахом кэша читались бы из основной БД.
+            mock.patch('api.cache.DB_REPLICA_LAG_SECONDS', 0),
+        ):
+            patcher.start()
+            cls.addClassCleanup(patcher.stop)
+
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+        _, _, self.products = create_catalog()
+        self.client = get_client(User.objects.create_user('buyer'))
+        call_command('sync_sqlite_replicas', stdout=StringIO())
+        # Запись после копирования видна только в основной БД.
+        Category.objects.create(name='Овощи', slug='vegetables')
+
+    def request(self, method: str, path: str, data=None):
+        """Выполняет запрос и возвращает ответ и SQL, выполненный в основной БД и в реплике."""
+        with (
+            CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary,
+            CaptureQueriesContext(connections[REPLICA]) as replica,
+        ):
+            response = getattr(self.client, method)(path, data, format='json')
+        return response, [query['sql'] for query in primary], [query['sql'] for query in replica]
+
+    def test_catalog_reads_go_to_replica(self):
+        response, primary, replica = self.request('get', '/api/categories/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([category['slug'] for category in response.json()['results']], ['fruits'])
+        # Из основной БД читается только пользователь по JWT (DB_PRIMARY_APPS).
+        self.assertTrue(all('"auth_user"' in sql for sql in primary))
+        self.assertTrue(any('shop_category' in sql for sql in replica))
+        self.assertNotIn('db_primary', response.cookies)
+
+    def test_cart_reads_and_writes_go_to_primary(self):
+        response, primary, replica = self.request('get', '/api/shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('shop_shoppingcart' in sql for sql in primary))
+        self.assertFalse(any('shop_shoppingcart' in sql for sql in replica))
+        response, primary, replica = self.request(
+            'post', '/api/shopping_cart/items/', {'upsert': [{'product': self.products[0].pk, 'quantity': 2}]},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any(sql.startswith('INSERT INTO "shop_shoppingcart"') for sql in primary))
+        self.assertFalse(any('shop_shoppingcart' in sql for sql in replica))
+        self.assertEqual(response.json()['products'][0]['quantity'], 2)
+
+    def test_reads_after_write_stick_to_primary(self):
+        response, _, _ = self.request(
+            'post', '/api/shopping_cart/items/', {'upsert': [{'product': self.products[0].pk, 'quantity': 1}]},
+        )
+        self.assertIn('db_primary', response.cookies)
+        response, primary, replica = self.request('get', '/api/categories/')
+        self.assertEqual(replica, [])
+        self.assertTrue(any('shop_category' in sql for sql in primary))
+        self.assertEqual(
+            sorted(category['slug'] for category in response.json()['results']), ['fruits', 'vegetables'],
+        )
+
+    def test_request_reads_from_single_replica(self):
+        replicas: tuple[str, ...] = tuple(f'replica_{number}' for number in range(1, 9))
+        router = ReplicaRouter()
+        with mock.patch('backend.db.router.DB_REPLICAS', replicas):
+            chosen: set[str] = set()
+            for _ in range(20):
+                token = PRIMARY_STATE.set(get_request_state())
+                try:
+                    aliases: set[str] = {router.db_for_read(model) for model in (Category, Product) * 5}
+                finally:
+                    PRIMARY_STATE.reset(token)
+                self.assertEqual(len(aliases), 1)
+                chosen |= aliases
+        self.assertLessEqual(chosen, set(replicas))
+        self.assertGreater(len(chosen), 1)
+
+    def test_auth_reads_go_to_primary(self):
+        router = ReplicaRouter()
+        token = PRIMARY_STATE.set(get_request_state())
+        try:
+            for model in (User, Permission, ContentType):
+                self.assertEqual(router.db_for_read(model), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_read(Category), REPLICA)
+        finally:
+            PRIMARY_STATE.reset(token)
+        _, _, replica = self.request('get', '/api/shopping_cart/')
+        self.assertFalse(any('auth_user' in sql for sql in replica))
+
+    def test_no_sticky_cookie_without_replicas(self):
+        with mock.patch('backend.db.router.DB_REPLICAS', ()):
+            response, _, replica = self.request(
+                'post', '/api/shopping_cart/items/', {'upsert': [{'product': self.products[0].pk, 'quantity': 1}]},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, [])
+        self.assertNotIn('db_primary', response.cookies)
@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+
+from api.serializers import ShoppingCartDiffSerializer
+from shop.tests.utils import LocalCacheTestCase, create_catalog, get_client
+
+
+class ProductIdFieldTests(LocalCacheTestCase):
+    """id товара в корзине принимается только целым числом или строкой из цифр."""
+
+    def setUp(self):
+        super().setUp()
+        _, _, self.products = create_catalog()
+
+    def validate(self, product_id) -> ShoppingCartDiffSerializer:
+        serializer = ShoppingCartDiffSerializer(data={'upsert': [{'product': product_id, 'quantity': 1}]})
+        serializer.is_valid()
+        return serializer
+
+    def test_accepts_int_and_digit_string(self):
+        product = self.products[1]
+        for product_id in (product.pk, str(product.pk)):
+            with self.subTest(product_id=product_id):
+                serializer = self.validate(product_id)
+                self.assertEqual(serializer.errors, {})
+                self.assertEqual(serializer.validated_data['upsert'][0]['product'], product)
+
+    def test_rejects_other_values_with_incorrect_type(self):
+        product_id: int = self.products[1].pk
+        for value in (product_id + 0.9, float(product_id), True, f'{product_id}.0', f' {product_id}', '1e3',
+                      f'-{product_id}', '١', [product_id], {'id': product_id}):
+            with self.subTest(value=value):
+                errors = self.validate(value).errors
+                self.assertEqual(errors['upsert'][0]['product'][0].code, 'incorrect_type')
+
+
+class ShoppingCartFormatTests(LocalCacheTestCase):
+    """Цены и итог корзины отдаются числами JSON, как до перехода на DecimalField, а не строками."""
+
+    def setUp(self):
+        super().setUp()
+        _, _, self.products = create_catalog()
+        self.client = get_client(User.objects.create_user('buyer'))
+
+    def test_prices_are_json_numbers(self):
+        data = {'products': [
+            {'product': self.products[0].pk, 'quantity': 2},
+            {'product': self.products[1].pk, 'quantity': 1},
+        ]}
+        responses = {
+            'post': self.client.post('/api/shopping_cart/', data, format='json'),
+            'get': self.client.get('/api/shopping_cart/'),
+        }
+        for method, response in responses.items():
+            with self.subTest(method=method):
+                cart = response.json()
+                self.assertEqual(cart['total_price'], 5)
+                self.assertNotIsInstance(cart['total_price'], str)
+                self.assertEqual(sorted(item['price'] for item in cart['products']), [1.25, 2.5])
+                self.assertFalse(any(isinstance(item['price'], str) for item in cart['products']))
@@ -0,0 +1,148 @@
+import sys
+import threading
+from collections.abc import MutableMapping
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+
+from api import throttling
+from api.throttling import EndpointSlidingWindowThrottle, SlidingWindowThrottle
+from shop.tests.utils import LocalCacheTestCase, create_catalog, get_client
+
+# Момент сразу после начала окна: предыдущего окна нет, и оценка равна счетчику текущего.
+WINDOW_START: float = 3600.0 * 1000 + 1
+LIMIT: int = 50
+
+
+def reset_throttles() -> None:
+    """Сбрасывает счетчики и блокировки ограничителей: иначе они переходят в следующие тесты."""
+    throttling.LOCAL_WINDOWS.clear()
+    throttling.LOCAL_BLOCKS.clear()
+    EndpointSlidingWindowThrottle.cache.clear()
+
+
+class WorkerLocalDict(MutableMapping):
+    """Словарь, у каждого потока свой: потоки теста ведут себя как отдельные воркеры с общим кэшем."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    @property
+    def data(self) -> dict:
+        if not hasattr(self.local, 'data'):
+            self.local.data = {}
+        return self.local.data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+
+    def __delitem__(self, key):
+        del self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class SlidingWindowThrottleTests(LocalCacheTestCase):
+    """Лимит под конкурентной нагрузкой из нескольких потоков на locmem-кэше."""
+
+    def setUp(self):
+        super().setUp()
+        reset_throttles()
+        self.addCleanup(reset_throttles)
+        # Частое переключение потоков, чтобы гонки между incr и чтением счетчика проявлялись.
+        switch_interval: float = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+        for patcher in (
+            mock.patch.object(SlidingWindowThrottle, 'THROTTLE_RATES', {'tests_endpoint': f'{LIMIT}/h'}),
+            mock.patch.object(SlidingWindowThrottle, 'timer', lambda throttle: WINDOW_START),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def count_allowed(self, threads: int, batch: int, separate_workers: bool, requests: int = 40) -> int:
+        """Запускает потоки с requests запросами каждый и возвращает число пропущенных."""
+        reset_throttles()
+        view = SimpleNamespace(throttle_scope='tests')
+        barrier = threading.Barrier(threads)
+        allowed: list[int] = []
+
+        def send():
+            barrier.wait()
+            allowed.append(sum(
+                EndpointSlidingWindowThrottle().allow_request(SimpleNamespace(), view) for _ in range(requests)
+            ))
+
+        local_state = (
+            (WorkerLocalDict(), WorkerLocalDict()) if separate_workers
+            else (throttling.LOCAL_WINDOWS, throttling.LOCAL_BLOCKS)
+        )
+        with (
+            mock.patch.object(throttling, 'THROTTLE_LOCAL_BATCH', batch),
+            mock.patch.object(throttling, 'LOCAL_WINDOWS', local_state[0]),
+            mock.patch.object(throttling, 'LOCAL_BLOCKS', local_state[1]),
+        ):
+            workers = [threading.Thread(target=send) for _ in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        return sum(allowed)
+
+    def test_limit_is_exact_with_batch_of_one(self):
+        for separate_workers in (False, True):
+            for attempt in range(10):
+                with self.subTest(separate_workers=separate_workers, attempt=attempt):
+                    self.assertEqual(self.count_allowed(8, 1, separate_workers), LIMIT)
+
+    def test_overshoot_is_bounded_by_workers_and_batch(self):
+        workers, batch = 8, 5
+        for attempt in range(10):
+            with self.subTest(attempt=attempt):
+                allowed: int = self.count_allowed(workers, batch, separate_workers=True)
+                self.assertGreaterEqual(allowed, LIMIT)
+                self.assertLessEqual(allowed, LIMIT + workers * (batch - 1))
+
+    def test_threads_of_one_worker_do_not_overshoot(self):
+        for attempt in range(10):
+            with self.subTest(attempt=attempt):
+                self.assertLessEqual(self.count_allowed(8, 5, separate_workers=False), LIMIT)
+
+
+class SlidingWindowThrottleBaseTests(LocalCacheTestCase):
+    """Ограничитель без способа определить клиента не создается."""
+
+    def test_base_throttle_is_abstract(self):
+        with self.assertRaisesMessage(TypeError, 'get_ident_value'):
+            SlidingWindowThrottle()
+
+
+class ThrottleResponseTests(LocalCacheTestCase):
+    """Отказ ограничителя - ответ 429 с Retry-After."""
+
+    def setUp(self):
+        super().setUp()
+        reset_throttles()
+        self.addCleanup(reset_throttles)
+
+    def test_rejected_request_has_retry_after(self):
+        _, _, products = create_catalog(products=1)
+        client = get_client(User.objects.create_user('buyer'))
+        data = {'upsert': [{'product': products[0].pk, 'quantity': 1}]}
+        with mock.patch.object(SlidingWindowThrottle, 'THROTTLE_RATES', {'cart_write_user': '2/m'}):
+            statuses: list[int] = [
+                client.post('/api/shopping_cart/items/', data, format='json').status_code for _ in range(2)
+            ]
+            response = client.post('/api/shopping_cart/items/', data, format='json')
+        self.assertEqual(statuses, [200, 200])
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertLessEqual(int(response['Retry-After']), 120)
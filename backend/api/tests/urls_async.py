@@ -0,0 +1,8 @@
+from django.urls import include, path
+
+from api.urls import urlpatterns, urlpatterns_async
+
+# Маршруты ASGI-развертывания (ASYNC_VIEWS): асинхронные вьюхи перекрывают вьюсеты с теми же путями.
+urlpatterns = [
+    path('api/', include(urlpatterns_async + urlpatterns)),
+]
@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.audit import AuditRequest, replay
+from api.authentication import get_user_status
+from backend.settings import (CART_CACHE_ALIAS, CATALOG_CACHE_ALIAS,
+                              JWT_STATELESS_AUTH)
+from shop.carts import paused_background_flush
+
+
+def get_audit_client(user: User) -> APIClient:
+    """Тестовый клиент API с токеном доступа пользователя для запросов аудита."""
+    if JWT_STATELESS_AUTH:
+        # Статус пользователя кэшируется заранее, чтобы бюджеты не зависели от порядка запросов.
+        get_user_status(user.pk)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+@contextmanager
+def isolated_caches():
+    """
+    Подменяет кэш каталога пустым, чтобы ответы строились запросами к БД, а не брались из кэша.
+    Кэш корзин тоже подменяется, а фоновый сброс корзин останавливается: изменения корзины
+    не выходят за откатываемую транзакцию проверки.
+    """
+    with override_settings(CACHES={
+        **settings.CACHES,
+        CATALOG_CACHE_ALIAS: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'audit',
+        },
+        CART_CACHE_ALIAS: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'audit-carts',
+        },
+    }), paused_background_flush():
+        yield
+
+
+class QueryBudgetMixin:
+    """Проверка точного бюджета запросов к БД эндпоинта, как assertNumQueries, но по AuditRequest."""
+
+    def assert_query_budget(self, client, audit_request: AuditRequest):
+        response, queries = replay(client, audit_request)
+        if audit_request.status is None:
+            self.assertLess(response.status_code, 400, str(audit_request))
+        else:
+            self.assertEqual(response.status_code, audit_request.status, str(audit_request))
+        self.assertEqual(
+            len(queries),
+            audit_request.queries,
+            f'{audit_request}: {len(queries)} запросов вместо {audit_request.queries}:\n'
+            + '\n'.join(f'{number}. {sql}' for number, (_, sql, _) in enumerate(queries, 1)),
+        )
+        return response
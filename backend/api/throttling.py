@@ -0,0 +1,234 @@
+import hashlib
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+from backend.settings import (THROTTLE_CACHE_ALIAS, THROTTLE_KEY_PREFIX,
+                              THROTTLE_LOCAL_BATCH, THROTTLE_LOCAL_SIZE,
+                              THROTTLE_RATES)
+
+# Окна счетчиков в текущем процессе: ключ счетчика -> LocalWindow.
+LOCAL_WINDOWS: dict[str, 'LocalWindow'] = {}
+# Ключ счетчика -> момент (по timer()), до которого запросы отклоняются без обращения к кэшу.
+LOCAL_BLOCKS: dict[str, float] = {}
+THROTTLE_LOCK = threading.Lock()
+THROTTLE_STATS: Counter = Counter()
+
+
+def get_throttle_stats() -> dict[str, float]:
+    """Возвращает счетчики ограничителей частоты текущего процесса и долю отказов без обращения к кэшу."""
+    with THROTTLE_LOCK:
+        stats: dict[str, int] = {
+            name: THROTTLE_STATS[name] for name in ('allowed', 'rejected', 'local_rejected', 'cache_writes',)
+        }
+        stats['windows'], stats['blocks'] = len(LOCAL_WINDOWS), len(LOCAL_BLOCKS)
+    rejected: int = stats['rejected'] + stats['local_rejected']
+    return {
+        **stats,
+        'local_reject_ratio': stats['local_rejected'] / rejected if rejected else 0.0,
+    }
+
+
+def evict_oldest(entries: dict) -> None:
+    """Освобождает место под новую запись; вызывается под THROTTLE_LOCK."""
+    while len(entries) >= THROTTLE_LOCAL_SIZE:
+        del entries[next(iter(entries))]
+
+
+def incr_shared(cache, key: str, delta: int, timeout: int) -> int:
+    """Атомарно прибавляет delta к счетчику окна в общем кэше и возвращает новое значение."""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout):
+            return delta
+        # Счетчик создал другой процесс между incr и add.
+        return cache.incr(key, delta)
+
+
+class LocalWindow:
+    """
+    Окно счетчика в процессе: последнее известное значение общего счетчика окна, запросы процесса,
+    еще не добавленные к нему, запросы пакетов, которые добавляются к нему прямо сейчас,
+    и итог предыдущего окна, который уже не изменяется.
+    """
+
+    __slots__ = ('index', 'shared', 'pending', 'flushing', 'previous',)
+
+    def __init__(self, index: int):
+        self.index = index
+        self.shared = 0
+        self.pending = 0
+        self.flushing = 0
+        self.previous: int | None = None
+
+
+class SlidingWindowThrottle(SimpleRateThrottle, ABC):
+    """
+    Ограничитель частоты со скользящим окном. Запросы считаются в общем кэше THROTTLE_CACHE_ALIAS
+    атомарным incr() по фиксированным окнам длиной в период лимита, а оценка числа запросов за последний
+    период - это счетчик текущего окна плюс счетчик предыдущего с весом не прошедшей доли текущего.
+
+    Лимит берется из THROTTLE_RATES по ключу '<throttle_scope вьюхи>_<kind>'; без throttle_scope
+    или лимита запрос не ограничивается. Чтобы сам ограничитель не стал узким местом, процесс:
+    - отклоняет запросы клиента, уже превысившего лимит, по локальному списку до истечения Retry-After;
+    - добавляет запросы к общему счетчику пакетами по THROTTLE_LOCAL_BATCH;
+    - читает итог предыдущего окна из кэша один раз за окно.
+    """
+
+    cache = caches[THROTTLE_CACHE_ALIAS]
+    cache_format = f'{THROTTLE_KEY_PREFIX}:%(scope)s:%(ident)s'
+    THROTTLE_RATES = THROTTLE_RATES
+    kind: str = ''
+
+    def __init__(self):
+        # Лимит зависит от вьюхи и определяется в allow_request, как в ScopedRateThrottle.
+        pass
+
+    @abstractmethod
+    def get_ident_value(self, request, view) -> str | None:
+        """Возвращает идентификатор клиента, по которому считаются запросы, или None, чтобы не ограничивать запрос."""
+
+    def get_cache_key(self, request, view) -> str | None:
+        ident: str | None = self.get_ident_value(request, view)
+        if ident is None:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view) -> bool:
+        scope: str | None = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        self.scope = f'{scope}_{self.kind}'
+        self.rate = self.THROTTLE_RATES.get(self.scope)
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.now = self.timer()
+        with THROTTLE_LOCK:
+            blocked_until: float = LOCAL_BLOCKS.get(self.key, 0)
+            if blocked_until > self.now:
+                THROTTLE_STATS['local_rejected'] += 1
+                self.retry_after = blocked_until - self.now
+                return False
+        previous, current = self.count_request()
+        offset: float = self.now % self.duration
+        if previous * (1 - offset / self.duration) + current <= self.num_requests:
+            with THROTTLE_LOCK:
+                THROTTLE_STATS['allowed'] += 1
+            return True
+        self.retry_after = self.get_retry_after(previous, current, offset)
+        with THROTTLE_LOCK:
+            THROTTLE_STATS['rejected'] += 1
+            LOCAL_BLOCKS.pop(self.key, None)
+            evict_oldest(LOCAL_BLOCKS)
+            LOCAL_BLOCKS[self.key] = self.now + self.retry_after
+        return False
+
+    def get_window_key(self, index: int) -> str:
+        return f'{self.key}:{index}'
+
+    def count_request(self) -> tuple[int, int]:
+        """Учитывает запрос и возвращает итог предыдущего окна и число запросов в текущем, включая этот."""
+        index: int = int(self.now // self.duration)
+        flushes: list[tuple[int, int]] = []
+        with THROTTLE_LOCK:
+            window: LocalWindow | None = LOCAL_WINDOWS.pop(self.key, None)
+            if window is None or window.index < index:
+                if window is not None and window.pending:
+                    flushes.append((window.index, window.pending))
+                # Итог окна, которое только что закончилось, еще может вырасти в других процессах.
+                window = LocalWindow(index)
+            evict_oldest(LOCAL_WINDOWS)
+            LOCAL_WINDOWS[self.key] = window
+            window.pending += 1
+            if window.pending >= THROTTLE_LOCAL_BATCH:
+                flushes.append((index, window.pending))
+                window.flushing += window.pending
+                window.pending = 0
+            previous: int | None = window.previous
+        timeout: int = self.duration * 2 + 1
+        counted: int | None = None
+        for flush_index, delta in flushes:
+            shared: int = incr_shared(self.cache, self.get_window_key(flush_index), delta, timeout)
+            if flush_index == index:
+                counted = shared
+                with THROTTLE_LOCK:
+                    window.flushing -= delta
+                    window.shared = max(window.shared, shared)
+        if previous is None:
+            previous = self.cache.get(self.get_window_key(index - 1), 0)
+        with THROTTLE_LOCK:
+            THROTTLE_STATS['cache_writes'] += len(flushes)
+            window.previous = previous
+            if counted is not None:
+                # Счетчик сразу после пакета этого запроса: window.shared мог уже вырасти
+                # за счет более поздних запросов других потоков.
+                return previous, counted
+            # Пакеты других потоков, которые еще добавляются к общему счетчику, тоже учитываются:
+            # оценка может ненадолго превысить точное значение, но не занижает его.
+            return previous, window.shared + window.flushing + window.pending
+
+    def get_retry_after(self, previous: int, current: int, offset: float) -> float:
+        """Время в секундах, через которое оценка с учетом следующего запроса снова уложится в лимит."""
+        allowed: int = self.num_requests - 1
+        if current <= allowed:
+            # Достаточно, чтобы вес предыдущего окна упал до (allowed - current) / previous.
+            return max(self.duration * (1 - (allowed - current) / previous) - offset, 0)
+        # Текущее окно станет предыдущим, и его вес должен упасть до allowed / current.
+        return self.duration - offset + self.duration * (1 - allowed / current)
+
+    def wait(self) -> int:
+        return math.ceil(self.retry_after)
+
+
+class IPSlidingWindowThrottle(SlidingWindowThrottle):
+    """Ограничивает запросы с одного IP-адреса (с учетом NUM_PROXIES)."""
+
+    kind = 'ip'
+
+    def get_ident_value(self, request, view) -> str:
+        return self.get_ident(request)
+
+
+class UserSlidingWindowThrottle(SlidingWindowThrottle):
+    """
+    Ограничивает запросы одного пользователя. Для анонимных запросов пользователем считается
+    значение поля throttle_user_field тела запроса, если вьюха его задает (имя при получении токена).
+    """
+
+    kind = 'user'
+
+    def get_ident_value(self, request, view) -> str | None:
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return str(user.pk)
+        field: str | None = getattr(view, 'throttle_user_field', None)
+        value = request.data.get(field) if field else None
+        if not value or not isinstance(value, str):
+            return None
+        # Значение задает клиент: хэш дает допустимый для любого кэша ключ.
+        return hashlib.md5(value.encode()).hexdigest()
+
+
+class EndpointSlidingWindowThrottle(SlidingWindowThrottle):
+    """Ограничивает все запросы к эндпоинту вместе, чтобы всплеск не занял все воркеры."""
+
+    kind = 'endpoint'
+
+    def get_ident_value(self, request, view) -> str:
+        return 'all'
+
+
+SLIDING_WINDOW_THROTTLES: tuple[type[SlidingWindowThrottle], ...] = (
+    IPSlidingWindowThrottle,
+    UserSlidingWindowThrottle,
+    EndpointSlidingWindowThrottle,
+)
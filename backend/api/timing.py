@@ -0,0 +1,154 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from backend.settings import SERVER_TIMING
+
+logger = logging.getLogger(__name__)
+
+# Счетчики текущего запроса: число запросов к БД и время в секундах по метрикам.
+# Словарь изменяется на месте, чтобы запросы из потока sync_to_async попадали в счетчики запроса.
+REQUEST_TIMINGS: ContextVar[dict[str, float] | None] = ContextVar('request_timings', default=None)
+
+TIMING_METRICS: tuple[str, ...] = ('db', 'serialize', 'render',)
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка execute_wrapper: считает запросы к БД и время их выполнения в текущем запросе."""
+    timings: dict[str, float] | None = REQUEST_TIMINGS.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started_at: float = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings['queries'] += 1
+        timings['db'] += time.perf_counter() - started_at
+
+
+def add_query_recorder(connection) -> None:
+    if record_query not in connection.execute_wrappers:
+        # В начало списка: execute_wrapper() Django снимает со стека последнюю обертку.
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """Соединения принадлежат потокам, поэтому запросы из потоков sync_to_async учитываются через этот сигнал."""
+    add_query_recorder(connection)
+
+
+@contextmanager
+def timed(metric: str):
+    """Добавляет к метрике текущего запроса время блока без времени запросов к БД внутри него."""
+    timings: dict[str, float] | None = REQUEST_TIMINGS.get()
+    if timings is None:
+        yield
+        return
+    started_at: float = time.perf_counter()
+    db_before: float = timings['db']
+    try:
+        yield
+    finally:
+        timings[metric] += time.perf_counter() - started_at - (timings['db'] - db_before)
+
+
+def time_serializer(serializer):
+    """Засекает валидацию и представление данных сериализатором DRF как метрику serialize."""
+    if REQUEST_TIMINGS.get() is None:
+        return serializer
+    for method in ('run_validation', 'to_representation',):
+        original = getattr(serializer, method)
+
+        def wrapper(*args, original=original, **kwargs):
+            with timed('serialize'):
+                return original(*args, **kwargs)
+        setattr(serializer, method, wrapper)
+    return serializer
+
+
+class ServerTimingMixin:
+    """Включает время работы сериализаторов вьюсета в метрику serialize заголовка Server-Timing."""
+
+    def get_serializer(self, *args, **kwargs):
+        return time_serializer(super().get_serializer(*args, **kwargs))
+
+
+class ServerTimingMiddleware:
+    """
+    Считает для каждого запроса число запросов к БД, время БД, сериализации, рендеринга и общее время.
+    Отдает их в заголовке Server-Timing и пишет строкой JSON в лог api.timing.
+    Включается настройкой SERVER_TIMING.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not SERVER_TIMING:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings: dict[str, float] = self.start()
+        token = REQUEST_TIMINGS.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            REQUEST_TIMINGS.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings: dict[str, float] = self.start()
+        token = REQUEST_TIMINGS.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            REQUEST_TIMINGS.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_template_response(self, request, response):
+        """Вызывается перед рендерингом ответа DRF; время рендеринга засекает post-render callback."""
+        timings: dict[str, float] | None = REQUEST_TIMINGS.get()
+        if timings is not None:
+            started_at: float = time.perf_counter()
+
+            def stop(response):
+                timings['render'] += time.perf_counter() - started_at
+            response.add_post_render_callback(stop)
+        return response
+
+    def start(self) -> dict[str, float]:
+        for connection in connections.all(initialized_only=True):
+            add_query_recorder(connection)
+        return {'started_at': time.perf_counter(), 'queries': 0, **{metric: 0.0 for metric in TIMING_METRICS}}
+
+    def finish(self, request, response, timings: dict[str, float]):
+        total: float = time.perf_counter() - timings['started_at']
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timings["db"] * 1000:.2f};desc="{timings["queries"]} queries"',
+            f'serialize;dur={timings["serialize"] * 1000:.2f}',
+            f'render;dur={timings["render"] * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timings['queries'],
+            **{f'{metric}_ms': round(timings[metric] * 1000, 2) for metric in TIMING_METRICS},
+            'total_ms': round(total * 1000, 2),
+        }))
+        return response
@@ -1,12 +1,18 @@
 from django.urls import include, path
-from drf_spectacular.views import (SpectacularAPIView, SpectacularRedocView,
-                                   SpectacularSwaggerView)
 from rest_framework.routers import DefaultRouter
 from rest_framework.viewsets import ModelViewSet
 
+from api.async_views import (AsyncCategoryView, AsyncProductView,
+                             AsyncShoppingCartClearView,
+                             AsyncShoppingCartItemsView,
+                             AsyncShoppingCartItemView, AsyncShoppingCartView,
+                             AsyncSubcategoryView)
+from api.docs import OpenAPISchemaView, lazy_view
 from api.views import (CategoryViewSet, CustomTokenObtainPairView,
                        CustomTokenRefreshView, ProductViewSet,
-                       ShoppingCartViewSet, SubcategoryViewSet)
+                       ShoppingCartViewSet, StatsView, SubcategoryViewSet)
+
+from backend.settings import ASYNC_VIEWS
 
 router = DefaultRouter()
 
@@ -25,9 +31,9 @@ for route in ROUTER_DATA:
     )
 
 urlpatterns_docs = [
-    path('', SpectacularAPIView.as_view(), name='schema'),
-    path('swagger/', SpectacularSwaggerView.as_view(), name='swagger-ui'),
-    path('redoc/', SpectacularRedocView.as_view(), name='redoc'),
+    path('', OpenAPISchemaView.as_view(), name='schema'),
+    path('swagger/', lazy_view('drf_spectacular.views.SpectacularSwaggerView'), name='swagger-ui'),
+    path('redoc/', lazy_view('drf_spectacular.views.SpectacularRedocView'), name='redoc'),
 ]
 
 urlpatterns_token = [
@@ -35,8 +41,32 @@ urlpatterns_token = [
     path('refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
 ]
 
+# Имена совпадают с именами маршрутов роутера, которые эти вьюхи перекрывают.
+urlpatterns_async = [
+    path('categories/', AsyncCategoryView.as_view(), name='categories-list'),
+    path('categories/<int:pk>/', AsyncCategoryView.as_view(), name='categories-detail'),
+    path('products/', AsyncProductView.as_view(), name='products-list'),
+    path('products/<int:pk>/', AsyncProductView.as_view(), name='products-detail'),
+    path('shopping_cart/', AsyncShoppingCartView.as_view(), name='shopping_cart-list'),
+    path(
+        'shopping_cart/clear_shopping_cart/',
+        AsyncShoppingCartClearView.as_view(),
+        name='shopping_cart-clear-shopping-cart',
+    ),
+    path('shopping_cart/items/', AsyncShoppingCartItemsView.as_view(), name='shopping_cart-items'),
+    path('shopping_cart/items/<int:product_id>/', AsyncShoppingCartItemView.as_view(), name='shopping_cart-item'),
+    path('subcategories/', AsyncSubcategoryView.as_view(), name='subcategories-list'),
+    path('subcategories/<int:pk>/', AsyncSubcategoryView.as_view(), name='subcategories-detail'),
+]
+
 urlpatterns = [
     path('', include(router.urls)),
     path('docs/', include(urlpatterns_docs)),
     path('auth/token/', include(urlpatterns_token)),
+    path('stats/', StatsView.as_view(), name='stats'),
 ]
+
+if ASYNC_VIEWS:
+    # Асинхронные вьюхи стоят раньше роутера и перекрывают те же пути;
+    # выгрузка, документация и токены остаются синхронными.
+    urlpatterns = urlpatterns_async + urlpatterns
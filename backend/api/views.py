@@ -1,93 +1,142 @@
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from django.contrib.auth.models import User
+from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import (SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
 
-from api.schemas import (CATEGORIES_VIEW_SCHEMA, PRODUCT_VIEW_SCHEMA,
-                         SHOPPING_CART_SCHEMA, SUBCATEGORIES_VIEW_SCHEMA,
-                         TOKEN_JWT_OBTAIN_SCHEMA, TOKEN_JWT_REFRESH_SCHEMA)
+from api.authentication import get_user_status_stats
+from api.cache import CatalogCacheMixin, get_cache_stats
+from api.export import CSVRenderer, NDJSONRenderer, export_catalog
+from api.fast_serializers import (CategoryFastSerializer,
+                                  FastSerializationMixin,
+                                  ProductFastSerializer,
+                                  SubcategoryFastSerializer)
+from api.filters import ProductFilterBackend
+from api.idempotency import idempotent
+from api.pagination import CatalogCursorPagination
 from api.serializers import (CategoryGetSerializer, ProductGetSerializer,
+                             ShoppingCartDiffSerializer,
                              ShoppingCartGetSerializer,
                              ShoppingCartPostSerializer,
+                             ShoppingCartQuantitySerializer,
+                             ShoppingCartSummarySerializer,
                              SubcategoryGetSerializer)
+from api.throttling import SLIDING_WINDOW_THROTTLES, get_throttle_stats
+from api.timing import ServerTimingMixin, time_serializer
+
+from backend.db.pool import get_pool_stats
 from shop.models import Category, Product, ShoppingCart, Subcategory
+from shop.carts import cart_storage, get_cart_stats
 
 
-@extend_schema(**TOKEN_JWT_OBTAIN_SCHEMA)
 class CustomTokenObtainPairView(TokenObtainPairView):
-    """Используется для обновления документации swagger к эндпоинту получения токенов."""
-    pass
+    """
+    Используется для обновления документации swagger к эндпоинту получения токенов.
+    Ограничивает частоту попыток входа: каждая проверяет пароль медленным хэшированием.
+    """
+
+    throttle_classes = SLIDING_WINDOW_THROTTLES
+    throttle_scope = 'token'
+    throttle_user_field = User.USERNAME_FIELD
 
 
-@extend_schema(**TOKEN_JWT_REFRESH_SCHEMA)
 class CustomTokenRefreshView(TokenRefreshView):
     """Используется для обновления документации swagger к эндпоинту обновления токена доступа."""
-    pass
 
+    throttle_classes = SLIDING_WINDOW_THROTTLES
+    throttle_scope = 'token_refresh'
 
-@extend_schema_view(**CATEGORIES_VIEW_SCHEMA)
-class CategoryViewSet(ModelViewSet):
+
+class CategoryViewSet(CatalogCacheMixin, FastSerializationMixin, ServerTimingMixin, ModelViewSet):
     """Вьюсет для работы с моделью категории."""
 
+    cache_tags = ('category',)
+    fast_serializer_class = CategoryFastSerializer
     http_method_names = ('get',)
     serializer_class = CategoryGetSerializer
     queryset = Category.objects.all()
 
 
-@extend_schema_view(**PRODUCT_VIEW_SCHEMA)
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(CatalogCacheMixin, FastSerializationMixin, ServerTimingMixin, ModelViewSet):
     """Вьюсет для работы с моделью товара."""
 
+    cache_tags = ('category', 'product', 'subcategory',)
+    fast_serializer_class = ProductFastSerializer
+    filter_backends = (ProductFilterBackend,)
     http_method_names = ('get',)
+    pagination_class = CatalogCursorPagination
     serializer_class = ProductGetSerializer
-    queryset = Product.objects.all().select_related('subcategory')
+    queryset = Product.objects.all().select_related('subcategory__category')
+
+    @action(
+        methods=('get',),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(NDJSONRenderer, CSVRenderer,),
+    )
+    def export(self, request):
+        """Выгружает весь каталог товаров потоком в формате NDJSON или CSV."""
+        return export_catalog(self.filter_queryset(Product.objects.all()), request)
 
 
-@extend_schema_view(**SHOPPING_CART_SCHEMA)
-class ShoppingCartViewSet(ModelViewSet):
+class ShoppingCartViewSet(ServerTimingMixin, ModelViewSet):
     """Вьюсет для работы с моделью корзины."""
 
-    http_method_names = ('get', 'post',)
+    http_method_names = ('get', 'post', 'put', 'patch', 'delete',)
     permission_classes = (IsAuthenticated,)
     pagination_class = None
+    throttle_classes = SLIDING_WINDOW_THROTTLES
+    throttle_scope = 'cart_write'
+    serializer_classes: dict[str, type] = {
+        'create': ShoppingCartPostSerializer,
+        'item': ShoppingCartQuantitySerializer,
+        'items': ShoppingCartDiffSerializer,
+    }
 
     def get_queryset(self):
-        return ShoppingCart.objects.filter(user=self.request.user).select_related('user', 'product')
+        return ShoppingCart.objects.filter(user=self.request.user).select_related('product')
 
     def get_serializer_class(self):
-        if self.request.method == 'GET':
-            return ShoppingCartGetSerializer
-        return ShoppingCartPostSerializer
+        return self.serializer_classes.get(self.action, ShoppingCartGetSerializer)
 
-    @extend_schema(exclude=True)
-    def retrieve(self, request, *args, **kwargs):
-        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    def get_throttles(self):
+        """Ограничивается только запись в корзину."""
+        if self.request.method in SAFE_METHODS:
+            return []
+        return super().get_throttles()
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        data: dict[str, any] = serializer.data
-        total_products: int = len(data)
-        total_price: int = sum(item.get('price', 0) * item.get('quantity', 0) for item in data)
+    def get_summary_response(self) -> Response:
+        summary: dict[str, any] = cart_storage.summary(self.request.user)
         return Response(
-            data={
-                'total_products': total_products,
-                'total_price': total_price,
-                'products': data,
-            },
+            data=time_serializer(ShoppingCartSummarySerializer(summary)).data,
             status=status.HTTP_200_OK
         )
 
+    def retrieve(self, request, *args, **kwargs):
+        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def update(self, request, *args, **kwargs):
+        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def partial_update(self, request, *args, **kwargs):
+        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def destroy(self, request, *args, **kwargs):
+        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_summary_response()
+
+    @idempotent
     def create(self, request, *args, **kwargs):
-        data: dict[str, any] = request.data
-        data['user'] = self.request.user.id
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        ShoppingCart.objects.filter(user=self.request.user).delete()
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
         return Response(
@@ -99,14 +148,62 @@ class ShoppingCartViewSet(ModelViewSet):
     @action(methods=('post',), detail=False, url_name='clear-shopping-cart',)
     def clear_shopping_cart(self, request):
         """Очищает корзину товаров пользователя."""
-        ShoppingCart.objects.filter(user=request.user).delete()
+        cart_storage.clear(request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(methods=('put', 'patch', 'delete',), detail=False, url_path=r'items/(?P<product_id>\d+)', url_name='item',)
+    def item(self, request, product_id):
+        """Изменяет количество одного товара в корзине или удаляет его."""
+        if request.method == 'DELETE':
+            cart_storage.remove_items(request.user, (product_id,))
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart_storage.upsert_items(
+            request.user,
+            [{
+                'product': get_object_or_404(Product, pk=product_id),
+                'quantity': serializer.validated_data['quantity'],
+            }],
+        )
+        return self.get_summary_response()
 
-@extend_schema_view(**SUBCATEGORIES_VIEW_SCHEMA)
-class SubcategoryViewSet(ModelViewSet):
+    @action(methods=('post',), detail=False, url_path='items', url_name='items',)
+    def items(self, request):
+        """Применяет к корзине пакет изменений: добавляет/изменяет и удаляет только переданные товары."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart_storage.change_items(
+            request.user,
+            serializer.validated_data.get('upsert', []),
+            serializer.validated_data.get('remove', []),
+        )
+        return self.get_summary_response()
+
+
+class SubcategoryViewSet(CatalogCacheMixin, FastSerializationMixin, ServerTimingMixin, ModelViewSet):
     """Вьюсет для работы с моделью подкатегории."""
 
+    cache_tags = ('category', 'subcategory',)
+    fast_serializer_class = SubcategoryFastSerializer
     http_method_names = ('get',)
     serializer_class = SubcategoryGetSerializer
     queryset = Subcategory.objects.all().select_related('category')
+
+
+class StatsView(APIView):
+    """
+    Метрики текущего процесса для персонала: кэш каталога, кэш статусов пользователей JWT,
+    ограничители частоты, кэш корзин и пулы соединений с БД.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({
+            'catalog_cache': get_cache_stats(),
+            'auth_cache': get_user_status_stats(),
+            'throttle': get_throttle_stats(),
+            'carts': get_cart_stats(),
+            'db': get_pool_stats(),
+        })
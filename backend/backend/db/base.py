@@ -0,0 +1,27 @@
+from django.db.backends.postgresql import base
+
+from backend.db.pool import ConnectionPool, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Бэкенд PostgreSQL, который берет соединения из пула процесса вместо открытия нового на каждый запрос.
+    Django закрывает соединение в конце запроса (CONN_MAX_AGE = 0), а пул забирает его обратно.
+    Настройки пула задаются ключом POOL в DATABASES.
+    """
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(self.alias, self.settings_dict, super().get_new_connection)
+
+    def get_new_connection(self, conn_params):
+        return self.pool.acquire(conn_params)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Соединение, закрытое внутри atomic или после ошибок, в пул не возвращается:
+        # Django может продолжить им пользоваться или оно может быть сломано.
+        discard: bool = self.in_atomic_block or self.errors_occurred
+        with self.wrap_database_errors:
+            self.pool.release(self.connection, discard=discard)
@@ -0,0 +1,54 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from backend.db.router import PRIMARY_STATE, get_request_state
+from backend.settings import DB_REPLICA_LAG_SECONDS, DB_REPLICA_STICKY_COOKIE
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Закрепляет за основной БД запрос, в котором была запись, и запросы того же клиента
+    в течение DB_REPLICA_LAG_SECONDS после нее, чтобы клиент не прочитал устаревшие данные реплики.
+    Закрепление передается в cookie DB_REPLICA_STICKY_COOKIE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state: dict = self.get_state(request)
+        token = PRIMARY_STATE.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            PRIMARY_STATE.reset(token)
+        return self.process_response(response, state)
+
+    async def __acall__(self, request):
+        state: dict = self.get_state(request)
+        token = PRIMARY_STATE.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            PRIMARY_STATE.reset(token)
+        return self.process_response(response, state)
+
+    def get_state(self, request) -> dict:
+        return get_request_state(pinned=DB_REPLICA_STICKY_COOKIE in request.COOKIES)
+
+    def process_response(self, response, state: dict):
+        if state['written']:
+            response.set_cookie(
+                DB_REPLICA_STICKY_COOKIE,
+                '1',
+                max_age=DB_REPLICA_LAG_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+
+# Значения conn.info.transaction_status, одинаковые в psycopg2 и psycopg 3.
+TRANSACTION_STATUS_IDLE: int = 0
+TRANSACTION_STATUS_UNKNOWN: int = 4
+
+POOLS: dict[str, 'ConnectionPool'] = {}
+POOLS_LOCK = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    Пул соединений с БД одного процесса.
+    Ограничивает число одновременно занятых соединений max_size, держит до max_idle свободных
+    и перед выдачей проверяет соединения, которые простаивали дольше check_after секунд.
+    Соединения старше max_lifetime секунд закрываются при возврате.
+    """
+
+    def __init__(
+        self,
+        connect,
+        max_size: int,
+        max_idle: int,
+        timeout: float,
+        max_lifetime: float,
+        check_after: float,
+    ):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.idle: deque[tuple[any, float, float]] = deque()
+        self.created_at: dict[int, float] = {}
+        self.in_use: int = 0
+        self.stats: dict[str, float] = {
+            'acquired': 0,
+            'created': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+        }
+
+    def acquire(self, conn_params: dict[str, any]):
+        """Выдает свободное соединение или создает новое, ожидая освобождения не дольше timeout."""
+        started_at: float = time.monotonic()
+        if not self.slots.acquire(timeout=self.timeout):
+            with self.lock:
+                self.stats['timeouts'] += 1
+            raise OperationalError(
+                f'Нет свободных соединений с БД: все {self.max_size} заняты дольше {self.timeout} с.'
+            )
+        try:
+            connection = self.get_idle() or self.create(conn_params)
+        except BaseException:
+            self.slots.release()
+            raise
+        wait: float = time.monotonic() - started_at
+        with self.lock:
+            self.in_use += 1
+            self.stats['acquired'] += 1
+            self.stats['wait_total'] += wait
+            self.stats['wait_max'] = max(self.stats['wait_max'], wait)
+        return connection
+
+    def release(self, connection, discard: bool = False) -> None:
+        """Возвращает соединение в пул или закрывает его, если оно сломано, устарело или лишнее."""
+        try:
+            if not discard:
+                discard = not self.reset(connection)
+            created_at: float = self.created_at.get(id(connection), 0.0)
+            if time.monotonic() - created_at > self.max_lifetime:
+                discard = True
+            with self.lock:
+                self.in_use -= 1
+                if not discard and len(self.idle) < self.max_idle:
+                    self.idle.append((connection, created_at, time.monotonic()))
+                    return
+            self.discard(connection)
+        finally:
+            self.slots.release()
+
+    def get_idle(self):
+        """Берет последнее возвращенное соединение и проверяет его, если оно долго простаивало."""
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                connection, _, released_at = self.idle.pop()
+            if time.monotonic() - released_at < self.check_after or self.is_usable(connection):
+                return connection
+            self.discard(connection)
+
+    def create(self, conn_params: dict[str, any]):
+        connection = self.connect(conn_params)
+        with self.lock:
+            self.created_at[id(connection)] = time.monotonic()
+            self.stats['created'] += 1
+        return connection
+
+    def discard(self, connection) -> None:
+        with self.lock:
+            self.created_at.pop(id(connection), None)
+            self.stats['discarded'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def reset(self, connection) -> bool:
+        """Откатывает незавершенную транзакцию. Возвращает False, если соединение нельзя переиспользовать."""
+        if connection.closed:
+            return False
+        try:
+            status: int = connection.info.transaction_status
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                return False
+            if status != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def is_usable(self, connection) -> bool:
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def get_stats(self) -> dict[str, any]:
+        with self.lock:
+            acquired = self.stats['acquired']
+            return {
+                'max_size': self.max_size,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'acquired': acquired,
+                'created': self.stats['created'],
+                'discarded': self.stats['discarded'],
+                'timeouts': self.stats['timeouts'],
+                'wait_avg_ms': round(self.stats['wait_total'] / acquired * 1000, 3) if acquired else 0.0,
+                'wait_max_ms': round(self.stats['wait_max'] * 1000, 3),
+            }
+
+
+def get_pool(alias: str, settings_dict: dict[str, any], connect) -> ConnectionPool:
+    """Возвращает пул соединений для базы alias, создавая его при первом обращении."""
+    pool: ConnectionPool | None = POOLS.get(alias)
+    if pool is not None:
+        return pool
+    with POOLS_LOCK:
+        if alias not in POOLS:
+            options: dict[str, any] = settings_dict.get('POOL', {})
+            POOLS[alias] = ConnectionPool(
+                connect,
+                max_size=options.get('MAX_SIZE', 10),
+                max_idle=options.get('MAX_IDLE', options.get('MAX_SIZE', 10)),
+                timeout=options.get('TIMEOUT', 30),
+                max_lifetime=options.get('MAX_LIFETIME', 3600),
+                check_after=options.get('CHECK_AFTER', 30),
+            )
+        return POOLS[alias]
+
+
+def get_pool_stats() -> dict[str, any]:
+    """Возвращает метрики пулов соединений текущего процесса: ожидание соединения, занятые и свободные."""
+    return {
+        'pid': os.getpid(),
+        'pools': {alias: pool.get_stats() for alias, pool in POOLS.items()},
+    }
+
+
+def reset_pools() -> None:
+    """Забывает пулы родительского процесса после fork: их соединения нельзя использовать в дочернем."""
+    POOLS.clear()
+
+
+os.register_at_fork(after_in_child=reset_pools)
@@ -0,0 +1,87 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from backend.settings import DB_PRIMARY_APPS, DB_PRIMARY_MODELS, DB_REPLICAS
+
+# Состояние текущего запроса: pinned - читать из основной БД, written - в запросе была запись,
+# replica - реплика, выбранная для всех чтений запроса при первом из них.
+# Словарь изменяется на месте, чтобы запись из потока sync_to_async была видна остальной части запроса.
+PRIMARY_STATE: ContextVar[dict | None] = ContextVar('primary_state', default=None)
+
+
+def get_request_state(pinned: bool = False) -> dict:
+    """Новое состояние запроса для PRIMARY_STATE."""
+    return {'pinned': pinned, 'written': False, 'replica': None}
+
+
+def is_primary_pinned() -> bool:
+    """Вне HTTP-запросов (команды, shell) состояния нет, и чтения всегда идут в основную БД."""
+    state: dict | None = PRIMARY_STATE.get()
+    return state is None or state['pinned']
+
+
+def get_request_replica() -> str:
+    """
+    Реплика текущего запроса: выбирается один раз, чтобы все чтения запроса видели одно
+    и то же состояние данных, даже если реплики отстают от основной БД по-разному.
+    """
+    state: dict = PRIMARY_STATE.get()
+    if state['replica'] not in DB_REPLICAS:
+        state['replica'] = random.choice(DB_REPLICAS)
+    return state['replica']
+
+
+def record_write() -> None:
+    """
+    Отмечает запись в текущем запросе: все последующие чтения запроса идут в основную БД.
+    Без реплик отмечать нечего, и cookie закрепления не выставляется.
+    """
+    state: dict | None = PRIMARY_STATE.get()
+    if DB_REPLICAS and state is not None:
+        state['pinned'] = state['written'] = True
+
+
+@contextmanager
+def use_primary():
+    """Выполняет блок с чтением из основной БД, не закрепляя за ней остальной запрос."""
+    state: dict = get_request_state(pinned=True)
+    token = PRIMARY_STATE.set(state)
+    try:
+        yield
+    finally:
+        PRIMARY_STATE.reset(token)
+        if state['written']:
+            record_write()
+
+
+class ReplicaRouter:
+    """
+    Распределяет HTTP-запросы по репликам DB_REPLICAS (все чтения запроса - из одной реплики),
+    а записи отправляет в основную БД. В основную БД также идут чтения моделей DB_PRIMARY_MODELS
+    и приложений DB_PRIMARY_APPS (пользователи и права), чтения внутри транзакции
+    и все чтения запроса после первой записи или с cookie закрепления (см. PrimaryStickinessMiddleware).
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            not DB_REPLICAS
+            or model._meta.label_lower in DB_PRIMARY_MODELS
+            or model._meta.app_label in DB_PRIMARY_APPS
+            or is_primary_pinned()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return get_request_replica()
+
+    def db_for_write(self, model, **hints):
+        record_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -1,3 +1,4 @@
+import json
 import os
 from datetime import timedelta
 from pathlib import Path
@@ -23,17 +24,86 @@ if DEBUG_DB == 'True':
 else:
     DEBUG_DB = False
 
+CATALOG_FAST_SERIALIZATION = os.getenv('CATALOG_FAST_SERIALIZATION')
+if CATALOG_FAST_SERIALIZATION == 'True':
+    CATALOG_FAST_SERIALIZATION = True
+else:
+    CATALOG_FAST_SERIALIZATION = False
+
+# Adds Server-Timing headers (query count, DB, serializer and render time)
+# to every response and logs the same numbers as JSON lines (api.timing).
+SERVER_TIMING = os.getenv('SERVER_TIMING')
+if SERVER_TIMING == 'True':
+    SERVER_TIMING = True
+else:
+    SERVER_TIMING = False
+
+# Set by backend/asgi.py: under an ASGI server the catalog and cart
+# endpoints are served by the async views from api/async_views.py.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS')
+if ASYNC_VIEWS == 'True':
+    ASYNC_VIEWS = True
+else:
+    ASYNC_VIEWS = False
+
+# Authenticates JWT requests without loading the user: the signed claims
+# are trusted for the token lifetime, and is_active and password-change
+# revocation are checked against a per-process cache that expires after
+# JWT_USER_CACHE_TTL seconds (api/authentication.py).
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH')
+if JWT_STATELESS_AUTH == 'True':
+    JWT_STATELESS_AUTH = True
+else:
+    JWT_STATELESS_AUTH = False
+
+# Keeps shopping carts in the 'carts' cache and writes them to the
+# ShoppingCart table in batches: every CART_FLUSH_INTERVAL seconds in the
+# background and by `manage.py flush_carts` (shop/carts.py).
+CART_CACHE_STORAGE = os.getenv('CART_CACHE_STORAGE')
+if CART_CACHE_STORAGE == 'True':
+    CART_CACHE_STORAGE = True
+else:
+    CART_CACHE_STORAGE = False
+
 
 # DJANGO SETTINGS:
 
+# Persistent connections are kept per thread, so DB_CONN_MAX_AGE (off by
+# default) only helps the gunicorn sync workers. Under ASGI every request
+# may run in a new thread and each one would leave an open connection
+# behind, so use DB_POOL=True there: connections are then borrowed from a
+# process-wide pool (backend/db) and CONN_MAX_AGE is forced to 0.
+DB_POOL = os.getenv('DB_POOL')
+if DB_POOL == 'True':
+    DB_POOL = True
+else:
+    DB_POOL = False
+
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS')
+if DB_CONN_HEALTH_CHECKS == 'True':
+    DB_CONN_HEALTH_CHECKS = True
+else:
+    DB_CONN_HEALTH_CHECKS = False
+
 DATABASE_POSTGRES = {
     'default': {
-        'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
+        'ENGINE': 'backend.db' if DB_POOL else os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
         'NAME': os.getenv('POSTGRES_DB', default='postgres'),
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
         'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', default=0)),
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        'POOL': {
+            # Connections in use at once per process; extra requests wait up to TIMEOUT seconds.
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+            'MAX_IDLE': int(os.getenv('DB_POOL_MAX_IDLE', default=5)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+            'MAX_LIFETIME': float(os.getenv('DB_POOL_MAX_LIFETIME', default=60 * 30)),
+            # Idle connections older than this are pinged with SELECT 1 before reuse.
+            'CHECK_AFTER': float(os.getenv('DB_POOL_CHECK_AFTER', default=30)),
+        },
     }
 }
 
@@ -41,11 +111,67 @@ DATABASE_SQLITE = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file, not the default shared-cache in-memory database: there
+        # concurrent writers fail at once with "database table is locked"
+        # instead of waiting for the lock, as they do on a real database.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
 DATABASES = DATABASE_SQLITE if DEBUG_DB else DATABASE_POSTGRES
 
+# Read replicas, comma-separated: PostgreSQL hosts, or SQLite files relative
+# to BASE_DIR when DEBUG_DB=True (see the sync_sqlite_replicas command).
+# Catalog reads are spread across them by backend.db.router.ReplicaRouter,
+# one replica per HTTP request; writes, the models from DB_PRIMARY_MODELS,
+# the apps from DB_PRIMARY_APPS (users, permissions) and everything a client reads
+# within DB_REPLICA_LAG_SECONDS after its write go to the primary.
+DB_REPLICA_LOCATIONS: list[str] = [
+    location.strip() for location in os.getenv('DB_REPLICAS', default='').split(',') if location.strip()
+]
+DATABASES.update({
+    f'replica_{number}': {
+        **DATABASES['default'],
+        **({'NAME': BASE_DIR / location} if DEBUG_DB else {'HOST': location}),
+        'TEST': {'MIRROR': 'default'},
+    }
+    for number, location in enumerate(DB_REPLICA_LOCATIONS, start=1)
+})
+
+DB_REPLICAS: tuple[str, ...] = tuple(alias for alias in DATABASES if alias != 'default')
+DB_PRIMARY_MODELS: tuple[str, ...] = ('sessions.session', 'shop.shoppingcart',)
+DB_PRIMARY_APPS: tuple[str, ...] = ('auth', 'contenttypes',)
+DB_REPLICA_LAG_SECONDS: int = int(os.getenv('DB_REPLICA_LAG_SECONDS', default=5))
+DB_REPLICA_STICKY_COOKIE: str = 'db_primary'
+
+DATABASE_ROUTERS = ['backend.db.router.ReplicaRouter']
+
+CART_CACHE_BACKEND: str = os.getenv('CART_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': os.getenv('CATALOG_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CATALOG_CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache', 'catalog')),
+        'TIMEOUT': int(os.getenv('CATALOG_CACHE_TIMEOUT', default=60 * 60 * 24)),
+    },
+    'idempotency': {
+        'BACKEND': os.getenv('IDEMPOTENCY_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('IDEMPOTENCY_CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache', 'idempotency')),
+    },
+    # Carts not yet written to the database live only here: with several
+    # workers use Redis with maxmemory-policy noeviction.
+    'carts': {
+        'BACKEND': CART_CACHE_BACKEND,
+        'LOCATION': os.getenv('CART_CACHE_LOCATION', default='carts'),
+        'TIMEOUT': None,
+        # LocMemCache culls a third of its keys past MAX_ENTRIES (300 by default).
+        **({'OPTIONS': {'MAX_ENTRIES': 10 ** 6}} if CART_CACHE_BACKEND.endswith('LocMemCache') else {}),
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 INSTALLED_APPS = [
@@ -66,7 +192,10 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.AllowAny',),
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'api.authentication.StatelessJWTAuthentication' if JWT_STATELESS_AUTH
+        else 'rest_framework_simplejwt.authentication.JWTAuthentication',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -78,13 +207,126 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,
     "COMPONENT_SPLIT_REQUEST": True,
     "SCHEMA_PATH_PREFIX": r'/api/',
+    "PREPROCESSING_HOOKS": ['api.schemas.apply_view_schemas'],
 }
 
+# Built by `manage.py spectacular --format openapi-json --file openapi.json`
+# in the Dockerfile and served as is by api.docs.OpenAPISchemaView.
+OPENAPI_SCHEMA_PATH: Path = Path(os.getenv('OPENAPI_SCHEMA_PATH', BASE_DIR / 'openapi.json'))
+
+
+# STARTUP SETTINGS:
+
+IMPORT_TIME_BUDGET_MS: int = int(os.getenv('IMPORT_TIME_BUDGET_MS', 600))
+
+IMPORT_TIME_LAZY_MODULES: tuple[str, ...] = (
+    'PIL.Image',
+    'api.schemas',
+    'drf_spectacular.renderers',
+    'drf_spectacular.views',
+)
+
 ROOT_URLCONF = 'backend.urls'
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
 
+# CACHE SETTINGS:
+
+CATALOG_CACHE_ALIAS: str = 'catalog'
+
+CATALOG_CACHE_KEY_PREFIX: str = 'catalog'
+
+
+# THROTTLE SETTINGS:
+
+# Sliding-window limits of the token and shopping cart write endpoints
+# (api/throttling.py) in DRF rate format '<requests>/<s|m|h|d>', keyed by
+# '<view throttle_scope>_<ip|user|endpoint>'. Override them with a JSON
+# object in THROTTLE_RATES, e.g. '{"token_ip": "60/m", "cart_write_user": null}';
+# null disables a limit.
+THROTTLE_RATES: dict[str, str | None] = {
+    'token_ip': '20/m',
+    'token_user': '10/m',
+    'token_endpoint': '600/m',
+    'token_refresh_ip': '60/m',
+    'token_refresh_endpoint': '3000/m',
+    'cart_write_ip': '600/m',
+    'cart_write_user': '120/m',
+    'cart_write_endpoint': '30000/m',
+    **json.loads(os.getenv('THROTTLE_RATES', default='{}')),
+}
+
+# Counters need a cache with atomic incr(): locmem (per process), Redis or
+# Memcached (shared by all workers), but not the file or database cache.
+THROTTLE_CACHE_ALIAS: str = os.getenv('THROTTLE_CACHE_ALIAS', default='default')
+
+THROTTLE_KEY_PREFIX: str = 'throttle'
+
+# Requests a worker counts locally before adding them to the shared counter:
+# 1 is exact, larger values save cache round trips and may let through up to
+# workers * (batch - 1) extra requests per window.
+THROTTLE_LOCAL_BATCH: int = int(os.getenv('THROTTLE_LOCAL_BATCH', default=1))
+
+# Per-process limit of tracked counters and blocked clients.
+THROTTLE_LOCAL_SIZE: int = 10000
+
+
+# IDEMPOTENCY SETTINGS:
+
+# Responses of requests with an Idempotency-Key header are kept this long
+# and replayed to retries with the same key (api/idempotency.py). The cache
+# must be shared by all workers: a per-process locmem cache would let a
+# retry that lands on another worker run again. The default file cache is
+# shared on one host, but its add() is not atomic across processes, so two
+# simultaneous requests with one key may both run; use Redis or Memcached
+# in production.
+IDEMPOTENCY_CACHE_ALIAS: str = os.getenv('IDEMPOTENCY_CACHE_ALIAS', default='idempotency')
+
+IDEMPOTENCY_KEY_PREFIX: str = 'idempotency'
+
+IDEMPOTENCY_KEY_TTL: int = int(os.getenv('IDEMPOTENCY_KEY_TTL', default=60 * 60 * 24))
+
+IDEMPOTENCY_KEY_MAX_LEN: int = 255
+
+# A key stays claimed this long by a request still in progress: retries
+# get 409 until the first request finishes or its worker is gone.
+IDEMPOTENCY_LOCK_TIMEOUT: int = 30
+
+
+# CART SETTINGS:
+
+CART_CACHE_ALIAS: str = 'carts'
+
+# Worker processes per host, from the variable gunicorn itself reads (one
+# worker without it). With CART_CACHE_STORAGE a per-process cart cache
+# (locmem) is rejected by a system check unless there is a single worker.
+WEB_CONCURRENCY: int = int(os.getenv('WEB_CONCURRENCY', default=1))
+
+CART_CACHE_KEY_PREFIX: str = 'cart'
+
+# Idle carts leave the cache after a week; they are reloaded from the
+# database on the next request.
+CART_CACHE_TIMEOUT: int = int(os.getenv('CART_CACHE_TIMEOUT', default=60 * 60 * 24 * 7))
+
+# A cart lock left by a crashed worker expires after this many seconds.
+CART_LOCK_TIMEOUT: int = 5
+
+# Minimum seconds between background flushes started by cart writes in a
+# worker; 0 leaves flushing to `manage.py flush_carts --interval`.
+CART_FLUSH_INTERVAL: int = int(os.getenv('CART_FLUSH_INTERVAL', default=5))
+
+# Carts written to the database per transaction.
+CART_FLUSH_BATCH_SIZE: int = int(os.getenv('CART_FLUSH_BATCH_SIZE', default=500))
+
+
+# EXPORT AND IMPORT SETTINGS:
+
+EXPORT_CHUNK_SIZE: int = 2000
+
+IMPORT_BATCH_SIZE: int = 5000
+
+
 # INTERNATIONALIZATION SETTINGS:
 
 LANGUAGE_CODE = 'ru-RU'
@@ -100,6 +342,10 @@ USE_TZ = True
 
 ADMIN_PAGINATION = 15
 
+# Admin changelists of larger tables show the PostgreSQL row estimate
+# instead of running COUNT(*) (shop/admin.py).
+ADMIN_EXACT_COUNT_LIMIT: int = 10000
+
 CATEGORY_IMAGE_PATH: str = 'categories/'
 
 NAME_MAX_LEN: int = 30
@@ -113,29 +359,55 @@ SLUG_MAX_LEN: int = 30
 SUBCATEGORY_IMAGE_PATH: str = 'subcategories/'
 
 
+# ContentAddressedStorage keeps only the directory and the extension of these
+# names: the file itself is stored under the SHA-256 of its content.
+
+def get_image_extension(filename) -> str:
+    """Returns lowercased extension of the uploaded file name."""
+    return Path(filename).suffix.lower()
+
+
 def set_category_image_name(instance, filename) -> str:
     """Creates category image name based on slug."""
-    return f'{CATEGORY_IMAGE_PATH}{instance.slug}'
+    return f'{CATEGORY_IMAGE_PATH}{instance.slug}{get_image_extension(filename)}'
 
 
 def set_product_image_name_l(instance, filename) -> str:
     """Creates product image name based on slug (large)."""
-    return f'{PRODUCT_IMAGE_PATH}{instance.slug}_l'
+    return f'{PRODUCT_IMAGE_PATH}{instance.slug}_l{get_image_extension(filename)}'
 
 
 def set_product_image_name_m(instance, filename) -> str:
     """Creates product image name based on slug (medium)."""
-    return f'{PRODUCT_IMAGE_PATH}{instance.slug}_m'
+    return f'{PRODUCT_IMAGE_PATH}{instance.slug}_m{get_image_extension(filename)}'
 
 
 def set_product_image_name_s(instance, filename) -> str:
     """Creates product image name based on slug (small)."""
-    return f'{PRODUCT_IMAGE_PATH}{instance.slug}_s'
+    return f'{PRODUCT_IMAGE_PATH}{instance.slug}_s{get_image_extension(filename)}'
+
+
+def set_product_image_name_source(instance, filename) -> str:
+    """Creates product source image name based on slug."""
+    return f'{PRODUCT_IMAGE_PATH}sources/{instance.slug}{get_image_extension(filename)}'
 
 
 def set_subcategory_image_name(instance, filename) -> str:
     """Creates subcategory image name based on slug."""
-    return f'{SUBCATEGORY_IMAGE_PATH}{instance.slug}'
+    return f'{SUBCATEGORY_IMAGE_PATH}{instance.slug}{get_image_extension(filename)}'
+
+
+# IMAGE PROCESSING SETTINGS:
+
+IMAGE_JPEG_QUALITY: int = 85
+
+IMAGE_WORKERS: int = int(os.getenv('IMAGE_WORKERS', default=os.cpu_count() or 1))
+
+PRODUCT_IMAGE_SIZES: dict[str, tuple[int, int]] = {
+    'large': (1200, 1200),
+    'medium': (600, 600),
+    'small': (200, 200),
+}
 
 
 # SECURITY SETTINGS:
@@ -158,7 +430,9 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 MIDDLEWARE = [
+    'api.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'backend.db.middleware.PrimaryStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -167,6 +441,20 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'loggers': {
+        'api.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 SECRET_KEY = os.getenv('SECRET_KEY')
 
 SIMPLE_JWT = {
@@ -174,6 +462,11 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
+# User status cache of StatelessJWTAuthentication: how long a deactivation
+# or password change may go unnoticed by other processes, and entries per process.
+JWT_USER_CACHE_TTL: int = int(os.getenv('JWT_USER_CACHE_TTL', default=60))
+JWT_USER_CACHE_SIZE: int = int(os.getenv('JWT_USER_CACHE_SIZE', default=10000))
+
 
 # STATICS SETTINGS:
 
@@ -183,6 +476,17 @@ MEDIA_URL = 'media/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 STATIC_URL = 'static/'
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'shop.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+MEDIA_GC_MIN_AGE_HOURS: int = int(os.getenv('MEDIA_GC_MIN_AGE_HOURS', 24))
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -1,7 +1,28 @@
 from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
-from backend.settings import ADMIN_PAGINATION
-from shop.models import Category, Product, ShoppingCart, Subcategory
+from backend.settings import ADMIN_EXACT_COUNT_LIMIT, ADMIN_PAGINATION
+from shop.models import (Category, Product, ShoppingCart, Subcategory,
+                         estimate_count)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списков больших таблиц. В PostgreSQL количество берется из оценки плана запроса,
+    а точный COUNT(*) выполняется, только если оценка меньше ADMIN_EXACT_COUNT_LIMIT.
+    Оценка может быть неточной: последние страницы списка бывают неполными или пустыми.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        if connections[self.object_list.db].vendor == 'postgresql':
+            estimate: int = estimate_count(self.object_list)
+            if estimate >= ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
 
 
 @admin.register(Category)
@@ -19,32 +40,63 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    """Настраивает управление продуктами в панели администратора."""
+    """
+    Настраивает управление продуктами в панели администратора.
+    Подкатегория выбирается автодополнением и не редактируется в списке, а фильтра по ней нет:
+    иначе каждая строка или панель фильтров выводили бы все подкатегории.
+    """
     # Отображение
-    list_display = ('id', 'name', 'slug', 'price', 'subcategory', 'image_large', 'image_medium', 'image_small',)
+    list_display = ('id', 'name', 'slug', 'price', 'subcategory', 'image_source',
+                    'image_large', 'image_medium', 'image_small',)
+    list_select_related = ('subcategory__category',)
     # Редактирование
-    list_editable = ('name', 'slug', 'price', 'subcategory', 'image_large', 'image_medium', 'image_small',)
+    list_editable = ('name', 'slug', 'price', 'image_source',
+                     'image_large', 'image_medium', 'image_small',)
+    autocomplete_fields = ('subcategory',)
     # Поиск
-    search_fields = ('name', 'slug', 'price',)
-    # Фильтрация
-    list_filter = ('subcategory',)
+    search_fields = ('name',)
+    search_help_text = 'Часть названия или точный URL товара.'
     # Пагинация
     list_per_page = ADMIN_PAGINATION
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по индексам: название - как поиск API, URL - по точному совпадению."""
+        term: str = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.search(term) | queryset.filter(slug=term), False
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    """Настраивает управление корзиной в панели администратора."""
+    """
+    Настраивает управление корзиной в панели администратора.
+    Вместо фильтров, которые выводили бы всех пользователей и все товары, корзины ищутся
+    по точному имени пользователя или URL товара.
+    """
     # Отображение
     list_display = ('id', 'user', 'product', 'quantity',)
+    list_select_related = ('user', 'product',)
     # Редактирование
-    list_editable = ('user', 'product', 'quantity',)
+    list_editable = ('quantity',)
+    autocomplete_fields = ('user', 'product',)
     # Поиск
-    search_fields = ('user', 'product',)
-    # Фильтрация
-    list_filter = ('user', 'product')
+    search_fields = ('user__username',)
+    search_help_text = 'Точное имя пользователя или URL товара.'
     # Пагинация
     list_per_page = ADMIN_PAGINATION
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        term: str = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(user__in=User.objects.filter(username=term)) | queryset.filter(
+            product__in=Product.objects.filter(slug=term),
+        ), False
 
 
 @admin.register(Subcategory)
@@ -53,10 +105,15 @@ class SubcategoryAdmin(admin.ModelAdmin):
     # Отображение
     list_display = ('id', 'name', 'slug', 'image', 'category',)
     # Редактирование
-    list_editable = ('name', 'slug', 'image', 'category',)
+    list_editable = ('name', 'slug', 'image',)
+    autocomplete_fields = ('category',)
     # Поиск
     search_fields = ('name', 'slug',)
     # Фильтрация
     list_filter = ('category',)
     # Пагинация
     list_per_page = ADMIN_PAGINATION
+
+    def get_queryset(self, request):
+        """Название подкатегории включает категорию: она загружается сразу и в списке, и в автодополнении."""
+        return super().get_queryset(request).select_related('category')
@@ -5,3 +5,7 @@ class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shop'
     verbose_name = 'Товары'
+
+    def ready(self):
+        import shop.checks  # noqa: F401
+        import shop.signals  # noqa: F401
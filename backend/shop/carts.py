@@ -0,0 +1,484 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection, connections, transaction
+
+from backend.settings import (CART_CACHE_ALIAS, CART_CACHE_KEY_PREFIX,
+                              CART_CACHE_STORAGE, CART_CACHE_TIMEOUT,
+                              CART_FLUSH_BATCH_SIZE, CART_FLUSH_INTERVAL,
+                              CART_LOCK_TIMEOUT)
+from shop.models import Product, ShoppingCart
+
+logger = logging.getLogger(__name__)
+
+# Пауза между попытками взять блокировку корзины. Асинхронное изменение удваивает ее до максимума.
+CART_LOCK_RETRY_DELAY: float = 0.005
+CART_LOCK_RETRY_MAX_DELAY: float = 0.1
+
+# Состав корзины в кэше: пары (id товара, количество) в порядке добавления, как строки ShoppingCart по id.
+CartItems = tuple[tuple[int, int], ...]
+# Изменение корзины: новая корзина по текущей.
+CartBuild = Callable[[CartItems], CartItems]
+
+CART_STATS: Counter = Counter()
+CART_STATS_LOCK = threading.Lock()
+
+# Номер записи журнала -> момент (time.monotonic()), когда сброс впервые не нашел ее в кэше.
+JOURNAL_GAPS: dict[int, float] = {}
+
+# Фоновый сброс в текущем процессе: время последнего запуска, выполняется ли он, приостановлен ли.
+FLUSH_STATE: dict[str, float | bool] = {'started_at': 0.0, 'running': False, 'paused': False}
+FLUSH_STATE_LOCK = threading.Lock()
+
+
+def get_cart_key(user_id: int) -> str:
+    return f'{CART_CACHE_KEY_PREFIX}:cart:{user_id}'
+
+
+def get_lock_key(user_id: int) -> str:
+    return f'{CART_CACHE_KEY_PREFIX}:lock:{user_id}'
+
+
+def get_journal_key(number: int) -> str:
+    return f'{CART_CACHE_KEY_PREFIX}:journal:{number}'
+
+
+JOURNAL_LAST_KEY: str = f'{CART_CACHE_KEY_PREFIX}:journal:last'
+JOURNAL_FLUSHED_KEY: str = f'{CART_CACHE_KEY_PREFIX}:journal:flushed'
+FLUSH_LOCK_KEY: str = f'{CART_CACHE_KEY_PREFIX}:flush'
+# Срок блокировки сброса на один пакет: сброс продлевает ее перед каждым пакетом, а блокировка
+# упавшего процесса истекает не позже чем через это время.
+FLUSH_LOCK_TIMEOUT: int = CART_LOCK_TIMEOUT * 12
+
+
+class CartLockTimeout(TimeoutError):
+    """Корзина пользователя дольше допустимого заблокирована другим изменением."""
+
+
+def count_cart_access(hit: bool) -> None:
+    with CART_STATS_LOCK:
+        CART_STATS['hits' if hit else 'misses'] += 1
+
+
+def build_summary(items: list[ShoppingCart]) -> dict[str, any]:
+    return {
+        'total_products': len(items),
+        'total_price': sum((item.quantity * item.product.price for item in items), Decimal(0)),
+        'products': items,
+    }
+
+
+def merge_items(items: CartItems, changes: dict[int, int]) -> CartItems:
+    """Применяет количества из changes так же, как INSERT ... ON CONFLICT: новые товары - в конец корзины."""
+    merged: dict[int, int] = dict(items)
+    merged.update(changes)
+    return tuple(merged.items())
+
+
+def get_changes(items: list[dict[str, any]]) -> dict[int, int]:
+    return {item['product'].pk: item['quantity'] for item in items}
+
+
+def build_replace(items: list[dict[str, any]]) -> CartBuild:
+    changes: dict[int, int] = get_changes(items)
+    return lambda current: merge_items(tuple(item for item in current if item[0] in changes), changes)
+
+
+def build_upsert(items: list[dict[str, any]]) -> CartBuild:
+    changes: dict[int, int] = get_changes(items)
+    return lambda current: merge_items(current, changes)
+
+
+def build_change(upsert: list[dict[str, any]], remove: Iterable) -> CartBuild:
+    changes: dict[int, int] = get_changes(upsert)
+    removed: set[int] = {int(product) for product in remove}
+    return lambda current: merge_items(tuple(item for item in current if item[0] not in removed), changes)
+
+
+def build_clear() -> CartBuild:
+    return lambda current: ()
+
+
+class CartStorage(ABC):
+    """
+    Хранилище корзин, через которое вьюхи читают и изменяют корзины.
+    items - элементы с ключами product (экземпляр Product) и quantity, как в сериализаторах корзины.
+    Асинхронные методы по умолчанию выполняют синхронные в потоке.
+    """
+
+    @abstractmethod
+    def summary(self, user) -> dict[str, any]:
+        ...
+
+    @abstractmethod
+    def replace_items(self, user, items: list[dict[str, any]]) -> None:
+        ...
+
+    @abstractmethod
+    def upsert_items(self, user, items: list[dict[str, any]]) -> None:
+        ...
+
+    @abstractmethod
+    def remove_items(self, user, products: Iterable) -> None:
+        ...
+
+    @abstractmethod
+    def change_items(self, user, upsert: list[dict[str, any]], remove: Iterable) -> None:
+        """Добавляет/изменяет upsert и удаляет remove одним атомарным изменением корзины."""
+
+    @abstractmethod
+    def clear(self, user) -> None:
+        ...
+
+    async def asummary(self, user) -> dict[str, any]:
+        return await sync_to_async(self.summary)(user)
+
+    async def areplace_items(self, user, items: list[dict[str, any]]) -> None:
+        await sync_to_async(self.replace_items)(user, items)
+
+    async def aupsert_items(self, user, items: list[dict[str, any]]) -> None:
+        await sync_to_async(self.upsert_items)(user, items)
+
+    async def aremove_items(self, user, products: Iterable) -> None:
+        await sync_to_async(self.remove_items)(user, products)
+
+    async def achange_items(self, user, upsert: list[dict[str, any]], remove: Iterable) -> None:
+        await sync_to_async(self.change_items)(user, upsert, remove)
+
+    async def aclear(self, user) -> None:
+        await sync_to_async(self.clear)(user)
+
+
+class DatabaseCartStorage(CartStorage):
+    """Корзины в таблице ShoppingCart: каждое действие - запросы к БД."""
+
+    def summary(self, user) -> dict[str, any]:
+        return ShoppingCart.objects.filter(user=user).summary()
+
+    def replace_items(self, user, items: list[dict[str, any]]) -> None:
+        ShoppingCart.objects.replace_items(user, items)
+
+    def upsert_items(self, user, items: list[dict[str, any]]) -> None:
+        ShoppingCart.objects.upsert_items(user, items)
+
+    def remove_items(self, user, products: Iterable) -> None:
+        ShoppingCart.objects.remove_items(user, products)
+
+    def change_items(self, user, upsert: list[dict[str, any]], remove: Iterable) -> None:
+        ShoppingCart.objects.change_items(user, upsert, list(remove))
+
+    def clear(self, user) -> None:
+        ShoppingCart.objects.filter(user=user).delete()
+
+    async def asummary(self, user) -> dict[str, any]:
+        return await ShoppingCart.objects.filter(user=user).asummary()
+
+    async def aupsert_items(self, user, items: list[dict[str, any]]) -> None:
+        await ShoppingCart.objects.aupsert_items(user, items)
+
+    async def aremove_items(self, user, products: Iterable) -> None:
+        await ShoppingCart.objects.aremove_items(user, products)
+
+    async def achange_items(self, user, upsert: list[dict[str, any]], remove: Iterable) -> None:
+        await ShoppingCart.objects.achange_items(user, upsert, list(remove))
+
+    async def aclear(self, user) -> None:
+        await ShoppingCart.objects.filter(user=user).adelete()
+
+
+class CacheCartStorage(CartStorage):
+    """
+    Корзины в кэше CART_CACHE_ALIAS с отложенной записью в ShoppingCart.
+
+    Корзина хранится одним ключом - кортежем пар (товар, количество); при промахе она загружается из БД.
+    Изменения выполняются под блокировкой пользователя в кэше: номер из счетчика журнала,
+    запись журнала с id пользователя и только затем новая корзина. flush_carts сбрасывает корзины
+    из журнала в БД пакетами в транзакции и только после фиксации сдвигает отметку сброшенного журнала,
+    поэтому после падения сброс просто повторяется: он приводит строки к составу корзин и идемпотентен.
+
+    Кэш должен быть общим для процессов и не вытеснять ключи (Redis с maxmemory-policy noeviction);
+    локальный кэш подходит для одного процесса и тестов. Изменения, внесенные в ShoppingCart
+    в обход хранилища (админка), перезаписываются при следующем сбросе корзины пользователя.
+    """
+
+    @property
+    def cache(self):
+        return caches[CART_CACHE_ALIAS]
+
+    @contextmanager
+    def lock(self, user_id: int, wait: float = CART_LOCK_TIMEOUT * 2) -> Iterator[bool]:
+        """
+        Блокировка корзины пользователя в кэше. Отдает False, если за wait секунд она не освободилась.
+        Блокировка упавшего процесса истекает через CART_LOCK_TIMEOUT.
+        """
+        key: str = get_lock_key(user_id)
+        token: str = uuid.uuid4().hex
+        deadline: float = time.monotonic() + wait
+        while not (acquired := self.cache.add(key, token, CART_LOCK_TIMEOUT)) and time.monotonic() < deadline:
+            time.sleep(CART_LOCK_RETRY_DELAY)
+        try:
+            yield acquired
+        finally:
+            if acquired and self.cache.get(key) == token:
+                self.cache.delete(key)
+
+    def get_items(self, user_id: int) -> CartItems:
+        cache = self.cache
+        items: CartItems | None = cache.get(get_cart_key(user_id))
+        count_cart_access(hit=items is not None)
+        if items is None:
+            items = tuple(ShoppingCart.objects.filter(user_id=user_id).values_list('product_id', 'quantity'))
+            # add, а не set: корзину, которую уже изменил другой запрос, нельзя заменить прочитанной из БД.
+            if not cache.add(get_cart_key(user_id), items, CART_CACHE_TIMEOUT):
+                items = cache.get(get_cart_key(user_id), items)
+        return items
+
+    def change(self, user_id: int, build: CartBuild, wait: float = CART_LOCK_TIMEOUT * 2) -> None:
+        """Заменяет корзину на build(текущая корзина) и ставит ее в журнал на запись в БД."""
+        with self.lock(user_id, wait) as acquired:
+            if not acquired:
+                raise CartLockTimeout(f'Корзина пользователя {user_id} заблокирована дольше {wait} с.')
+            items: CartItems = build(self.get_items(user_id))
+            cache = self.cache
+            cache.add(JOURNAL_LAST_KEY, 0, timeout=None)
+            number: int = cache.incr(JOURNAL_LAST_KEY)
+            cache.set(get_journal_key(number), user_id, timeout=None)
+            cache.set(get_cart_key(user_id), items, CART_CACHE_TIMEOUT)
+        schedule_flush()
+
+    async def achange(self, user_id: int, build: CartBuild) -> None:
+        """
+        Асинхронная версия change. Поток берет блокировку без ожидания, а пока она занята,
+        ждет цикл событий (asyncio.sleep): ожидание не занимает поток пула.
+        """
+        wait: float = CART_LOCK_TIMEOUT * 2
+        deadline: float = time.monotonic() + wait
+        delay: float = CART_LOCK_RETRY_DELAY
+        while True:
+            try:
+                return await sync_to_async(self.change)(user_id, build, wait=0)
+            except CartLockTimeout:
+                if time.monotonic() >= deadline:
+                    raise CartLockTimeout(f'Корзина пользователя {user_id} заблокирована дольше {wait} с.') from None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, CART_LOCK_RETRY_MAX_DELAY)
+
+    def summary(self, user) -> dict[str, any]:
+        items: CartItems = self.get_items(user.pk)
+        products: dict[int, Product] = Product.objects.in_bulk([product_id for product_id, _ in items])
+        # Удаленные товары пропускаются: в БД их строки корзин удалены каскадом.
+        return build_summary([
+            ShoppingCart(user_id=user.pk, product=products[product_id], quantity=quantity)
+            for product_id, quantity in items
+            if product_id in products
+        ])
+
+    def replace_items(self, user, items: list[dict[str, any]]) -> None:
+        self.change(user.pk, build_replace(items))
+
+    def upsert_items(self, user, items: list[dict[str, any]]) -> None:
+        self.change(user.pk, build_upsert(items))
+
+    def remove_items(self, user, products: Iterable) -> None:
+        self.change(user.pk, build_change([], products))
+
+    def change_items(self, user, upsert: list[dict[str, any]], remove: Iterable) -> None:
+        self.change(user.pk, build_change(upsert, remove))
+
+    def clear(self, user) -> None:
+        self.change(user.pk, build_clear())
+
+    async def areplace_items(self, user, items: list[dict[str, any]]) -> None:
+        await self.achange(user.pk, build_replace(items))
+
+    async def aupsert_items(self, user, items: list[dict[str, any]]) -> None:
+        await self.achange(user.pk, build_upsert(items))
+
+    async def aremove_items(self, user, products: Iterable) -> None:
+        await self.achange(user.pk, build_change([], products))
+
+    async def achange_items(self, user, upsert: list[dict[str, any]], remove: Iterable) -> None:
+        await self.achange(user.pk, build_change(upsert, remove))
+
+    async def aclear(self, user) -> None:
+        await self.achange(user.pk, build_clear())
+
+    def flush_journal(self, batch_size: int = CART_FLUSH_BATCH_SIZE) -> int:
+        """
+        Сбрасывает в БД корзины из журнала и возвращает число записанных корзин.
+        Одновременно работает один сброс; остальные сразу возвращают 0.
+        """
+        cache = self.cache
+        token: str = uuid.uuid4().hex
+        if not cache.add(FLUSH_LOCK_KEY, token, FLUSH_LOCK_TIMEOUT):
+            return 0
+        flushed: int = 0
+        try:
+            while True:
+                if cache.get(FLUSH_LOCK_KEY) != token:
+                    # Пакет писался дольше срока блокировки, и ее уже взял другой сброс.
+                    logger.warning('Блокировка сброса корзин истекла до конца сброса.')
+                    break
+                cache.touch(FLUSH_LOCK_KEY, FLUSH_LOCK_TIMEOUT)
+                start: int = cache.get(JOURNAL_FLUSHED_KEY, 0)
+                last: int = min(cache.get(JOURNAL_LAST_KEY, 0), start + batch_size)
+                if last <= start:
+                    break
+                done, carts = self.read_journal(start, last)
+                write_carts(carts)
+                cache.set(JOURNAL_FLUSHED_KEY, done, timeout=None)
+                cache.delete_many([get_journal_key(number) for number in range(start + 1, done + 1)])
+                flushed += len(carts)
+                if done < last:
+                    # Запись журнала еще пишется: остаток сбросит следующий запуск.
+                    break
+        finally:
+            if cache.get(FLUSH_LOCK_KEY) == token:
+                cache.delete(FLUSH_LOCK_KEY)
+        return flushed
+
+    def read_journal(self, start: int, last: int) -> tuple[int, dict[int, CartItems]]:
+        """
+        Читает записи журнала start+1..last и корзины их пользователей. Возвращает номер, до которого
+        журнал можно отметить сброшенным, и корзины. Запись, которой еще нет в кэше, и корзина
+        под блокировкой относятся к изменению, которое еще выполняется: отметка останавливается перед ними.
+        """
+        cache = self.cache
+        numbers = range(start + 1, last + 1)
+        entries: dict[str, int] = cache.get_many([get_journal_key(number) for number in numbers])
+        done: int = last
+        first_numbers: dict[int, int] = {}
+        for number in numbers:
+            user_id: int | None = entries.get(get_journal_key(number))
+            if user_id is None:
+                # Процесс, упавший между номером и записью журнала, оставляет пропуск: он пропускается по таймауту.
+                first_seen: float = JOURNAL_GAPS.setdefault(number, time.monotonic())
+                if time.monotonic() - first_seen < CART_LOCK_TIMEOUT:
+                    done = min(done, number - 1)
+                continue
+            first_numbers.setdefault(user_id, number)
+        carts: dict[int, CartItems] = {}
+        for user_id, number in first_numbers.items():
+            with self.lock(user_id, wait=0) as acquired:
+                items: CartItems | None = cache.get(get_cart_key(user_id)) if acquired else None
+            if not acquired:
+                done = min(done, number - 1)
+            elif items is None:
+                logger.warning('Корзина пользователя %s вытеснена из кэша до записи в БД.', user_id)
+            else:
+                carts[user_id] = items
+        for number in [number for number in JOURNAL_GAPS if number <= done]:
+            del JOURNAL_GAPS[number]
+        return done, carts
+
+
+def write_carts(carts: dict[int, CartItems]) -> None:
+    """
+    Приводит строки ShoppingCart к составу корзин в одной транзакции: как replace_items, изменяет
+    только отличающиеся строки через upsert_items и remove_items. Повторная запись ничего не меняет.
+    """
+    if not carts:
+        return
+    with transaction.atomic():
+        locked = User.objects.filter(pk__in=carts).order_by('pk').only('pk')
+        if connection.features.has_select_for_update:
+            # Параллельный сброс с истекшей блокировкой пишет тех же пользователей по очереди.
+            locked = locked.select_for_update()
+        users: dict[int, User] = {user.pk: user for user in locked}
+        products: dict[int, Product] = Product.objects.order_by().only('pk').in_bulk(
+            {product_id for items in carts.values() for product_id, _ in items},
+        )
+        saved: dict[int, dict[int, int]] = {user_id: {} for user_id in users}
+        for user_id, product_id, quantity in ShoppingCart.objects.filter(user_id__in=users).values_list(
+            'user_id', 'product_id', 'quantity',
+        ):
+            saved[user_id][product_id] = quantity
+        for user_id, user in users.items():
+            # Удаленные товары пропускаются: их строки корзин удалены каскадом.
+            items: dict[int, int] = {
+                product_id: quantity for product_id, quantity in carts[user_id] if product_id in products
+            }
+            upsert: list[dict[str, any]] = [
+                {'product': products[product_id], 'quantity': quantity}
+                for product_id, quantity in items.items() if saved[user_id].get(product_id) != quantity
+            ]
+            remove: list[int] = [product_id for product_id in saved[user_id] if product_id not in items]
+            if upsert:
+                ShoppingCart.objects.upsert_items(user, upsert)
+            if remove:
+                ShoppingCart.objects.remove_items(user, remove)
+
+
+def get_cart_stats() -> dict[str, any]:
+    """Возвращает попадания в кэш корзин текущего процесса и число записей журнала, ожидающих сброса в БД."""
+    if not CART_CACHE_STORAGE:
+        return {'storage': 'database'}
+    with CART_STATS_LOCK:
+        hits, misses = CART_STATS['hits'], CART_STATS['misses']
+    total = hits + misses
+    cache = caches[CART_CACHE_ALIAS]
+    return {
+        'storage': 'cache',
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+        'pending': cache.get(JOURNAL_LAST_KEY, 0) - cache.get(JOURNAL_FLUSHED_KEY, 0),
+    }
+
+
+def flush_carts(batch_size: int = CART_FLUSH_BATCH_SIZE) -> int:
+    """Сбрасывает в БД корзины, измененные в кэше; без CART_CACHE_STORAGE сбрасывать нечего."""
+    if not isinstance(cart_storage, CacheCartStorage):
+        return 0
+    return cart_storage.flush_journal(batch_size)
+
+
+def run_background_flush() -> None:
+    try:
+        flush_carts()
+    except Exception:
+        logger.exception('Не удалось сбросить корзины в БД')
+    finally:
+        # Соединения этого потока больше не понадобятся.
+        connections.close_all()
+        with FLUSH_STATE_LOCK:
+            FLUSH_STATE['running'] = False
+
+
+def schedule_flush() -> None:
+    """Запускает сброс в фоновом потоке не чаще раза в CART_FLUSH_INTERVAL секунд; 0 отключает фоновый сброс."""
+    if not CART_FLUSH_INTERVAL:
+        return
+    now: float = time.monotonic()
+    with FLUSH_STATE_LOCK:
+        if FLUSH_STATE['running'] or FLUSH_STATE['paused'] or now - FLUSH_STATE['started_at'] < CART_FLUSH_INTERVAL:
+            return
+        FLUSH_STATE['running'], FLUSH_STATE['started_at'] = True, now
+    threading.Thread(target=run_background_flush, name='cart-flush', daemon=True).start()
+
+
+@contextmanager
+def paused_background_flush():
+    """Отключает фоновый сброс, например пока проверки API пишут корзины в подмененный кэш."""
+    with FLUSH_STATE_LOCK:
+        paused: bool = FLUSH_STATE['paused']
+        FLUSH_STATE['paused'] = True
+    try:
+        yield
+    finally:
+        with FLUSH_STATE_LOCK:
+            FLUSH_STATE['paused'] = paused
+
+
+cart_storage: CartStorage = CacheCartStorage() if CART_CACHE_STORAGE else DatabaseCartStorage()
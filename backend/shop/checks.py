@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from backend.settings import (CART_CACHE_ALIAS, CART_CACHE_STORAGE,
+                              WEB_CONCURRENCY)
+
+# Кэши, содержимое которых видно только своему процессу.
+PER_PROCESS_CACHE_BACKENDS: tuple[str, ...] = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_cart_cache(app_configs, **kwargs) -> list[Error]:
+    """
+    Корзины CART_CACHE_STORAGE в кэше процесса не видны другим воркерам: запросы одного пользователя
+    к разным воркерам читают и сбрасывают в БД разные корзины, и изменения теряются.
+    """
+    if not CART_CACHE_STORAGE or WEB_CONCURRENCY <= 1:
+        return []
+    backend: str = settings.CACHES[CART_CACHE_ALIAS]['BACKEND']
+    if backend not in PER_PROCESS_CACHE_BACKENDS:
+        return []
+    return [Error(
+        f'Корзины хранятся в кэше {backend}, который не общий для {WEB_CONCURRENCY} воркеров.',
+        hint='Укажите в CART_CACHE_BACKEND общий кэш (Redis) или запустите один воркер (WEB_CONCURRENCY=1).',
+        id='shop.E001',
+    )]
@@ -0,0 +1,132 @@
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.db import connections
+from PIL import Image, ImageOps
+
+from backend.settings import (IMAGE_JPEG_QUALITY, IMAGE_WORKERS,
+                              PRODUCT_IMAGE_SIZES)
+from shop.models import Product
+from shop.versions import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_IMAGE_FIELDS: dict[str, str] = {
+    'large': 'image_large',
+    'medium': 'image_medium',
+    'small': 'image_small',
+}
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Возвращает общий для процесса пул обработки изображений, создавая его при первом обращении."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return _executor
+
+
+def get_content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def render_derivatives(source: bytes) -> dict[str, bytes]:
+    """
+    Создает из исходного изображения большое, среднее и малое в формате JPEG.
+    Выполняется в дочернем процессе, поэтому работает только с байтами и не обращается к БД.
+    """
+    with Image.open(io.BytesIO(source)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        derivatives: dict[str, bytes] = {}
+        for size_name, size in PRODUCT_IMAGE_SIZES.items():
+            thumbnail = image.copy()
+            thumbnail.thumbnail(size, Image.Resampling.LANCZOS)
+            jpeg = io.BytesIO()
+            thumbnail.save(jpeg, format='JPEG', quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+            derivatives[size_name] = jpeg.getvalue()
+    return derivatives
+
+
+def read_source(name: str) -> bytes:
+    with Product._meta.get_field('image_source').storage.open(name, 'rb') as file:
+        return file.read()
+
+
+def prepare_derivatives(source_name: str, known_hash: str | None) -> tuple[str, dict[str, bytes]] | None:
+    """
+    Задача пула процессов: читает исходное изображение, считает его SHA-256 и создает производные.
+    Возвращает None, если хэш совпал с known_hash: изображение не изменилось с прошлой обработки.
+    """
+    source: bytes = read_source(source_name)
+    source_hash: str = get_content_hash(source)
+    if source_hash == known_hash:
+        return None
+    return source_hash, render_derivatives(source)
+
+
+def submit_render(product: Product, force: bool = False) -> Future:
+    """
+    Ставит обработку исходного изображения товара в пул процессов: чтение файла, хэш и создание производных
+    не занимают поток, который ставит задачу. С force изображения создаются даже без изменений.
+    """
+    return get_executor().submit(
+        prepare_derivatives,
+        product.image_source.name,
+        None if force else product.image_source_hash,
+    )
+
+
+def save_derivatives(
+    product: Product,
+    source_name: str,
+    source_hash: str,
+    derivatives: dict[str, bytes],
+) -> bool:
+    """
+    Сохраняет производные изображения товара под именами из хэша содержимого.
+    Ссылки обновляются, только если исходное изображение товара все еще source_name: результат обработки
+    замененного за это время изображения не записывается, а его файлы удалит gc_media. Возвращает, записан ли он.
+    """
+    names: dict[str, str] = {}
+    for size_name, field_name in PRODUCT_IMAGE_FIELDS.items():
+        field = Product._meta.get_field(field_name)
+        name: str = field.generate_filename(product, f'{size_name}.jpg')
+        names[field_name] = field.storage.save(name, ContentFile(derivatives[size_name]))
+    updated: int = Product.objects.filter(pk=product.pk, image_source=source_name).update(
+        image_source_hash=source_hash,
+        **names,
+    )
+    if not updated:
+        logger.info('Исходное изображение товара %s заменено во время обработки, результат пропущен.', product.pk)
+        return False
+    bump_catalog_version('product')
+    return True
+
+
+def schedule_product_image(product: Product) -> Future:
+    """
+    Ставит обработку изображения товара в пул процессов, не блокируя запрос.
+    Результат сохраняется в потоке пула, когда дочерний процесс закончит работу.
+    """
+    source_name: str = product.image_source.name
+    future: Future = submit_render(product)
+
+    def on_done(done: Future) -> None:
+        try:
+            prepared: tuple[str, dict[str, bytes]] | None = done.result()
+            if prepared is not None:
+                save_derivatives(product, source_name, *prepared)
+        except Exception:
+            logger.exception('Не удалось обработать изображение товара %s', product.pk)
+        finally:
+            connections.close_all()
+    future.add_done_callback(on_done)
+    return future
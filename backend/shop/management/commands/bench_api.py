@@ -0,0 +1,340 @@
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import resolve
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from api.audit import get_api_url_names
+from api.loadgen import LoadResult, run_load
+from backend.settings import ASYNC_VIEWS, THROTTLE_RATES
+from shop.models import Category, Product, ShoppingCart, Subcategory
+from shop.seed import seed_carts, seed_catalog, seed_users
+
+
+SERVER_START_TIMEOUT: float = 30
+
+# Маршруты, которые не нагружаются: метрики только для персонала и заглушка 405.
+BENCH_EXCLUDED_URL_NAMES: frozenset[str] = frozenset(('stats', 'shopping_cart-detail',))
+
+
+class BenchEndpoint:
+    """Запрос, которым бенчмарк нагружает эндпоинт API; auth - с токеном пользователя соединения."""
+
+    def __init__(
+        self,
+        name: str,
+        method: str,
+        path: str,
+        body: dict | None = None,
+        accept: str = 'application/json',
+        auth: bool = True,
+    ):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.accept = accept
+        self.auth = auth
+
+    def __str__(self):
+        return f'{self.method} {self.path}'
+
+    @property
+    def url_name(self) -> str | None:
+        return resolve(self.path.partition('?')[0]).url_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Воспроизводимый бенчмарк всех эндпоинтов api/urls.py: заполняет каталог и пользователей '
+        'детерминированно (--seed), нагружает каждый эндпоинт параллельными соединениями '
+        'и выводит запросы в секунду и задержки p50/p95/p99. Результат сохраняется в JSON (--output) '
+        'и сравнивается с прошлым прогоном (--compare). Без --url запускает runserver на свободном порту; '
+        'для замеров рабочего сервера запустите его сами (gunicorn, uvicorn) и передайте --url. '
+        'Бенчмарк измеряет стоимость эндпоинтов, поэтому в своем runserver отключает ограничения частоты; '
+        'запущенному вручную серверу передайте THROTTLE_RATES со значениями null. '
+        'Работает с той БД, что задана в настройках (SQLite или PostgreSQL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Адрес запущенного сервера, например http://127.0.0.1:8000.')
+        parser.add_argument('--seed', action='store_true', help='Заполнить пустой каталог перед замером.')
+        parser.add_argument('--categories', type=int, default=10, help='Число категорий при --seed.')
+        parser.add_argument('--subcategories', type=int, default=10, help='Подкатегорий на категорию при --seed.')
+        parser.add_argument('--products', type=int, default=100, help='Товаров на подкатегорию при --seed.')
+        parser.add_argument('--users', type=int, default=64, help='Число пользователей бенчмарка.')
+        parser.add_argument('--cart-items', type=int, default=10, help='Среднее число товаров в корзине пользователя.')
+        parser.add_argument('--random-seed', type=int, default=1, help='Зерно генератора данных.')
+        parser.add_argument('--user-prefix', default='bench', help='Префикс имен пользователей бенчмарка.')
+        parser.add_argument('--password', default='bench-password', help='Пароль пользователей бенчмарка.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Число параллельных соединений.')
+        parser.add_argument('--duration', type=float, default=10, help='Длительность нагрузки на эндпоинт, с.')
+        parser.add_argument('--warmup', type=float, default=2, help='Прогрев перед замером, с.')
+        parser.add_argument(
+            '--endpoint', action='append', dest='endpoints', metavar='NAME',
+            help='Нагрузить только этот эндпоинт. Можно указать несколько раз.',
+        )
+        parser.add_argument('--output', help='Файл для сохранения результатов в JSON.')
+        parser.add_argument('--compare', help='JSON прошлого прогона для сравнения.')
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='Допустимое ухудшение при --compare, %%: падение запросов в секунду или рост p95.',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            if Product.objects.exists():
+                raise CommandError('Каталог уже заполнен: --seed применяется к пустой базе.')
+            seed_catalog(
+                options['random_seed'],
+                options['categories'],
+                options['subcategories'],
+                options['products'],
+            )
+        elif not Product.objects.exists():
+            raise CommandError('Каталог пуст: запустите команду с --seed.')
+        user_ids: list[int] = self.prepare_users(options)
+        users: list[User] = list(User.objects.filter(id__in=user_ids[:options['concurrency']]).order_by('id'))
+        compare: dict[str, any] | None = self.load_results(options['compare']) if options['compare'] else None
+        server = None
+        base_url: str | None = options['url']
+        if base_url is None:
+            server, base_url = self.start_server()
+        try:
+            endpoints: list[BenchEndpoint] = self.get_endpoints(base_url.rstrip('/'), users[0], options)
+            results: dict[str, dict[str, any]] = {}
+            for endpoint in endpoints:
+                results[endpoint.name] = self.bench(base_url.rstrip('/'), endpoint, users, options)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        report: dict[str, any] = {
+            'meta': self.get_meta(base_url if options['url'] else 'runserver', options),
+            'endpoints': results,
+        }
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+            self.stdout.write(f'Результаты сохранены в {options["output"]}.')
+        if compare is not None:
+            self.compare(compare, report, options['max_regression'])
+
+    def prepare_users(self, options: dict[str, any]) -> list[int]:
+        """Создает пользователей бенчмарка и заново заполняет их корзины, чтобы каждый прогон начинался одинаково."""
+        user_ids: list[int] = seed_users(options['users'], options['password'], options['user_prefix'])
+        ShoppingCart.objects.filter(user_id__in=user_ids).delete()
+        seed_carts(options['random_seed'], user_ids, cart_items=options['cart_items'])
+        return user_ids
+
+    def start_server(self) -> tuple[subprocess.Popen, str]:
+        """
+        Запускает runserver без автоперезагрузки, логов запросов и ограничений частоты
+        и ждет, пока он начнет принимать соединения.
+        """
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port: int = sock.getsockname()[1]
+        server = subprocess.Popen(
+            (sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runserver', f'127.0.0.1:{port}', '--noreload',),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env={**os.environ, 'THROTTLE_RATES': json.dumps(dict.fromkeys(THROTTLE_RATES))},
+        )
+        deadline: float = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'runserver завершился с кодом {server.returncode}.')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server, f'http://127.0.0.1:{port}'
+            except OSError:
+                time.sleep(0.1)
+        server.terminate()
+        raise CommandError(f'runserver не начал принимать соединения за {SERVER_START_TIMEOUT} с.')
+
+    def get_endpoints(self, base_url: str, user: User, options: dict[str, any]) -> list[BenchEndpoint]:
+        """Возвращает запросы ко всем эндпоинтам api/urls.py, кроме BENCH_EXCLUDED_URL_NAMES."""
+        product: Product = Product.objects.select_related('subcategory__category').order_by('id').first()
+        subcategory: Subcategory = product.subcategory
+        category: Category = subcategory.category
+        word: str = product.name.split()[0]
+        endpoints: list[BenchEndpoint] = [
+            BenchEndpoint('api-root', 'GET', '/api/'),
+            BenchEndpoint('categories-list', 'GET', '/api/categories/'),
+            BenchEndpoint('categories-detail', 'GET', f'/api/categories/{category.id}/'),
+            BenchEndpoint('subcategories-list', 'GET', '/api/subcategories/'),
+            BenchEndpoint('subcategories-detail', 'GET', f'/api/subcategories/{subcategory.id}/'),
+            BenchEndpoint('products-list', 'GET', '/api/products/'),
+            BenchEndpoint('products-next-page', 'GET', self.get_next_page(base_url, user)),
+            BenchEndpoint('products-detail', 'GET', f'/api/products/{product.id}/'),
+            BenchEndpoint('products-category', 'GET', f'/api/products/?category={category.slug}'),
+            BenchEndpoint('products-subcategory', 'GET', f'/api/products/?subcategory={subcategory.slug}'),
+            BenchEndpoint('products-price', 'GET', f'/api/products/?min_price={product.price}&max_price=1000'),
+            BenchEndpoint('products-search', 'GET', f'/api/products/?search={word}'),
+            BenchEndpoint('products-count', 'GET', '/api/products/?count=exact'),
+            BenchEndpoint(
+                'products-export', 'GET', f'/api/products/export/?format=ndjson&subcategory={subcategory.slug}',
+                accept='*/*',
+            ),
+            BenchEndpoint('shopping_cart-list', 'GET', '/api/shopping_cart/'),
+            BenchEndpoint('shopping_cart-item', 'PUT', f'/api/shopping_cart/items/{product.id}/', {'quantity': 2}),
+            BenchEndpoint(
+                'shopping_cart-items', 'POST', '/api/shopping_cart/items/',
+                {'upsert': [{'product': product.id, 'quantity': 3}], 'remove': []},
+            ),
+            BenchEndpoint('shopping_cart-item-delete', 'DELETE', f'/api/shopping_cart/items/{product.id}/'),
+            BenchEndpoint(
+                'shopping_cart-create', 'POST', '/api/shopping_cart/',
+                {'products': [{'product': product.id, 'quantity': 1}]},
+            ),
+            BenchEndpoint('shopping_cart-clear-shopping-cart', 'POST', '/api/shopping_cart/clear_shopping_cart/'),
+            BenchEndpoint(
+                'token_obtain_pair', 'POST', '/api/auth/token/create/',
+                {'username': user.username, 'password': options['password']}, auth=False,
+            ),
+            BenchEndpoint(
+                'token_refresh', 'POST', '/api/auth/token/refresh/',
+                {'refresh': str(RefreshToken.for_user(user))}, auth=False,
+            ),
+            BenchEndpoint('schema', 'GET', '/api/docs/', accept='*/*', auth=False),
+            BenchEndpoint('swagger-ui', 'GET', '/api/docs/swagger/', accept='text/html', auth=False),
+            BenchEndpoint('redoc', 'GET', '/api/docs/redoc/', accept='text/html', auth=False),
+        ]
+        # Асинхронные вьюхи перекрывают маршруты роутера без имен, поэтому полнота проверяется по синхронным.
+        uncovered: set[str] = set() if ASYNC_VIEWS else get_api_url_names() - BENCH_EXCLUDED_URL_NAMES - {
+            endpoint.url_name for endpoint in endpoints
+        }
+        if uncovered:
+            raise CommandError(f'Нет запросов бенчмарка для маршрутов: {", ".join(sorted(uncovered))}.')
+        if options['endpoints']:
+            unknown: set[str] = set(options['endpoints']) - {endpoint.name for endpoint in endpoints}
+            if unknown:
+                raise CommandError(f'Неизвестные эндпоинты: {", ".join(sorted(unknown))}.')
+            endpoints = [endpoint for endpoint in endpoints if endpoint.name in options['endpoints']]
+        return endpoints
+
+    def get_next_page(self, base_url: str, user: User) -> str:
+        """Курсор второй страницы списка товаров, полученный у того же сервера."""
+        request = urllib.request.Request(
+            f'{base_url}/api/products/',
+            headers={'Accept': 'application/json', 'Authorization': f'Bearer {AccessToken.for_user(user)}'},
+        )
+        with urllib.request.urlopen(request, timeout=30) as response:
+            next_page: str | None = json.load(response).get('next')
+        if next_page is None:
+            raise CommandError('В каталоге одна страница товаров: увеличьте --products.')
+        parts = urlsplit(next_page)
+        return f'{parts.path}?{parts.query}'
+
+    def bench(
+        self,
+        base_url: str,
+        endpoint: BenchEndpoint,
+        users: list[User],
+        options: dict[str, any],
+    ) -> dict[str, any]:
+        """Нагружает эндпоинт; соединение i работает от имени users[i % len(users)]."""
+        body: bytes = json.dumps(endpoint.body).encode() if endpoint.body is not None else b''
+        headers: list[dict[str, str]] = [
+            {
+                'Accept': endpoint.accept,
+                **({'Content-Type': 'application/json'} if body else {}),
+                **({'Authorization': f'Bearer {AccessToken.for_user(user)}'} if endpoint.auth else {}),
+            }
+            for user in (users if endpoint.auth else users[:1])
+        ]
+        url: str = f'{base_url}{endpoint.path}'
+        if options['warmup']:
+            asyncio.run(run_load(url, options['concurrency'], options['warmup'], headers, endpoint.method, body))
+        result: LoadResult = asyncio.run(
+            run_load(url, options['concurrency'], options['duration'], headers, endpoint.method, body)
+        )
+        stats: dict[str, any] = {'method': endpoint.method, 'path': endpoint.path, **result.as_dict()}
+        stats.pop('url')
+        failed: int = sum(count for status, count in result.statuses.items() if status >= 400)
+        self.stdout.write(
+            f'{endpoint.name:<34} {stats["rps"]:>9.1f} запр/с  p50 {stats["p50_ms"]:>8.2f}  '
+            f'p95 {stats["p95_ms"]:>8.2f}  p99 {stats["p99_ms"]:>8.2f} мс  '
+            + (self.style.ERROR(f'ошибок {failed + result.errors}  статусы {result.statuses}')
+               if failed or result.errors else self.style.SUCCESS('OK'))
+        )
+        return stats
+
+    def get_meta(self, server: str, options: dict[str, any]) -> dict[str, any]:
+        return {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': self.get_commit(),
+            'server': server,
+            'async_views': ASYNC_VIEWS,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'warmup': options['warmup'],
+            'random_seed': options['random_seed'],
+            'dataset': {
+                'categories': Category.objects.count(),
+                'subcategories': Subcategory.objects.count(),
+                'products': Product.objects.count(),
+                'users': options['users'],
+                'cart_items': options['cart_items'],
+            },
+        }
+
+    def get_commit(self) -> str | None:
+        try:
+            commit: str = subprocess.run(
+                ('git', 'rev-parse', 'HEAD',), cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+            dirty: str = subprocess.run(
+                ('git', 'status', '--porcelain', '--untracked-files=no',), cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return f'{commit}-dirty' if dirty else commit
+
+    def load_results(self, path: str) -> dict[str, any]:
+        try:
+            return json.loads(Path(path).read_text())
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+
+    def compare(self, previous: dict[str, any], current: dict[str, any], max_regression: float | None) -> None:
+        """Выводит изменение запросов в секунду и p95 относительно прошлого прогона."""
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Сравнение с {previous["meta"].get("commit")} ({previous["meta"].get("created_at")})'
+        ))
+        regressions: list[str] = []
+        for name, stats in current['endpoints'].items():
+            before: dict[str, any] | None = previous['endpoints'].get(name)
+            if not before or not before['rps'] or not before['p95_ms']:
+                continue
+            rps_change: float = (stats['rps'] - before['rps']) / before['rps'] * 100
+            p95_change: float = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+            regressed: bool = max_regression is not None and (
+                -rps_change > max_regression or p95_change > max_regression
+            )
+            line: str = f'{name:<34} запр/с {rps_change:>+7.1f}%  p95 {p95_change:>+7.1f}%'
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+            if regressed:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f'Производительность ухудшилась больше чем на {max_regression}%: {", ".join(regressions)}.')
@@ -0,0 +1,66 @@
+import asyncio
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.loadgen import LoadResult, run_load
+
+DEFAULT_PATHS: tuple[str, ...] = (
+    '/api/categories/',
+    '/api/subcategories/',
+    '/api/products/',
+    '/api/shopping_cart/',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запущенные серверы приложения (например, gunicorn с backend.wsgi '
+        'и gunicorn с UvicornWorker и backend.asgi) по запросам в секунду и задержкам p50/p99.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True, metavar='NAME=URL',
+            help='Сервер для сравнения, например wsgi=http://127.0.0.1:8000. Можно указать несколько раз.',
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths', metavar='PATH',
+            help='Путь для нагрузки. По умолчанию каталог и корзина.',
+        )
+        parser.add_argument('--concurrency', type=int, default=256, help='Число параллельных соединений.')
+        parser.add_argument('--duration', type=float, default=20, help='Длительность нагрузки на путь, с.')
+        parser.add_argument('--warmup', type=float, default=2, help='Прогрев перед замером, с.')
+        parser.add_argument('--username', help='Пользователь, от имени которого запрашивается корзина.')
+
+    def handle(self, *args, **options):
+        targets: dict[str, str] = dict(self.parse_target(target) for target in options['target'])
+        headers: dict[str, str] = {'Accept': 'application/json'}
+        if options['username']:
+            try:
+                user: User = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {options["username"]} не найден.')
+            headers['Authorization'] = f'Bearer {AccessToken.for_user(user)}'
+        for path in options['paths'] or DEFAULT_PATHS:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{path} ({options["concurrency"]} соединений)'))
+            for name, base_url in targets.items():
+                url: str = f'{base_url}{path}'
+                if options['warmup']:
+                    asyncio.run(run_load(url, options['concurrency'], options['warmup'], headers))
+                result: LoadResult = asyncio.run(run_load(url, options['concurrency'], options['duration'], headers))
+                self.write_result(name, result)
+
+    def parse_target(self, target: str) -> tuple[str, str]:
+        name, separator, url = target.partition('=')
+        if not separator or not url.startswith(('http://', 'https://')):
+            raise CommandError(f'Неверный --target {target!r}, ожидается NAME=http://host:port.')
+        return name, url.rstrip('/')
+
+    def write_result(self, name: str, result: LoadResult) -> None:
+        stats: dict[str, any] = result.as_dict()
+        self.stdout.write(
+            f'  {name:<8} {stats["rps"]:>9.1f} запр/с  p50 {stats["p50_ms"]:>8.2f} мс  '
+            f'p99 {stats["p99_ms"]:>8.2f} мс  ошибок {stats["errors"]}  статусы {stats["statuses"]}'
+        )
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.settings import IMPORT_TIME_BUDGET_MS, IMPORT_TIME_LAZY_MODULES
+
+STARTUP_SCRIPT: str = (
+    'import time; started_at = time.perf_counter(); '
+    'import django; django.setup(); '
+    'import {urlconf}; '
+    'print((time.perf_counter() - started_at) * 1000)'
+)
+
+
+def parse_import_time(output: str) -> dict[str, tuple[int, int, int]]:
+    """Разбирает вывод python -X importtime: модуль -> (собственное время, накопленное время в мкс, уровень)."""
+    modules: dict[str, tuple[int, int, int]] = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        level: int = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_time), int(cumulative), level)
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет время запуска воркера: django.setup() и импорт ROOT_URLCONF в отдельном процессе. '
+        'Завершается с ошибкой, если время больше бюджета или при запуске импортируются модули, '
+        'которые должны загружаться лениво (IMPORT_TIME_LAZY_MODULES).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=IMPORT_TIME_BUDGET_MS, help='Бюджет времени запуска, мс.')
+        parser.add_argument('--repeat', type=int, default=5, help='Сколько раз запустить; берется лучший результат.')
+        parser.add_argument('--top', type=int, default=15, help='Сколько самых долгих импортов вывести.')
+
+    def handle(self, *args, **options):
+        best: tuple[float, dict[str, tuple[int, int, int]]] | None = None
+        for _ in range(options['repeat']):
+            elapsed, modules = self.measure()
+            if best is None or elapsed < best[0]:
+                best = (elapsed, modules)
+        elapsed, modules = best
+        self.stdout.write(f'Самые долгие импорты верхнего уровня (лучший из {options["repeat"]} запусков):')
+        top_level = sorted(
+            ((cumulative, name) for name, (_, cumulative, level) in modules.items() if level == 0),
+            reverse=True,
+        )
+        for cumulative, name in top_level[:options['top']]:
+            self.stdout.write(f'  {cumulative / 1000:>8.1f} мс  {name}')
+        eager: list[str] = [name for name in IMPORT_TIME_LAZY_MODULES if name in modules]
+        if eager:
+            raise CommandError(f'При запуске импортированы модули, которые должны загружаться лениво: {", ".join(eager)}.')
+        if elapsed > options['budget_ms']:
+            raise CommandError(f'Запуск занял {elapsed:.1f} мс при бюджете {options["budget_ms"]:.0f} мс.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Запуск занял {elapsed:.1f} мс при бюджете {options["budget_ms"]:.0f} мс, импортировано {len(modules)} модулей.'
+        ))
+
+    def measure(self) -> tuple[float, dict[str, tuple[int, int, int]]]:
+        """Запускает чистый интерпретатор, чтобы не учитывать уже импортированные модули."""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT.format(urlconf=settings.ROOT_URLCONF)],
+            capture_output=True,
+            text=True,
+            env=os.environ.copy(),
+            cwd=settings.BASE_DIR,
+        )
+        if result.returncode:
+            raise CommandError(f'Не удалось запустить Django:\n{result.stderr[-2000:]}')
+        return float(result.stdout.strip().splitlines()[-1]), parse_import_time(result.stderr)
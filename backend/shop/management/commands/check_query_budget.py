@@ -0,0 +1,50 @@
+from django.core.management.base import CommandError
+from django.db import transaction
+
+from api.audit import (AuditCommand, get_api_url_names, get_audit_requests,
+                       replay)
+from api.tests.utils import get_audit_client, isolated_caches
+
+
+class Command(AuditCommand):
+    help = (
+        'Выполняет запросы ко всем эндпоинтам api/urls.py и сверяет число запросов к БД с бюджетом '
+        'из api/audit.py. Завершается с ошибкой при любом расхождении (например, N+1 в сериализаторе) '
+        'и если у маршрута нет ни одного проверочного запроса. Изменения корзины откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--show-sql', action='store_true', help='Вывести SQL запросов, превысивших бюджет.')
+
+    def handle(self, *args, **options):
+        product, user = self.get_audit_objects(options['username'])
+        client = get_audit_client(user)
+        failures: list[str] = []
+        covered: set[str] = set()
+        with isolated_caches(), transaction.atomic():
+            for audit_request in get_audit_requests(client, product, user):
+                response, queries = replay(client, audit_request)
+                covered.add(audit_request.url_name)
+                expected_status: bool = (
+                    response.status_code == audit_request.status
+                    if audit_request.status is not None else response.status_code < 400
+                )
+                if not expected_status:
+                    failures.append(f'{audit_request}: ответ {response.status_code}')
+                ok: bool = len(queries) == audit_request.queries
+                self.stdout.write(
+                    f'{str(audit_request):<77} запросов {len(queries):>2} из {audit_request.queries:>2}  '
+                    + (self.style.SUCCESS('OK') if ok else self.style.ERROR('НЕ СОВПАДАЕТ'))
+                )
+                if not ok:
+                    failures.append(f'{audit_request}: {len(queries)} запросов вместо {audit_request.queries}')
+                    if options['show_sql']:
+                        failures.extend(f'    {sql}' for _, sql, _ in queries)
+            transaction.set_rollback(True)
+        uncovered: set[str] = get_api_url_names() - covered
+        if uncovered:
+            failures.append(f'Нет проверочных запросов для маршрутов: {", ".join(sorted(uncovered))}.')
+        if failures:
+            raise CommandError('Бюджет запросов нарушен:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('Число запросов всех эндпоинтов совпадает с бюджетом.'))
@@ -0,0 +1,49 @@
+from django.core.management.base import CommandError
+from django.db import transaction
+
+from api.audit import AuditCommand, AuditRequest, get_audit_requests, replay
+from api.plans import PlanAudit, is_select
+from api.tests.utils import get_audit_client, isolated_caches
+
+
+class Command(AuditCommand):
+    help = (
+        'Выполняет запросы ко всем эндпоинтам API, собирает SQL, который они порождают, '
+        'и проверяет планы через EXPLAIN. Завершается с ошибкой, если в плане есть последовательное '
+        'сканирование или сортировка большой таблицы (не меньше --min-rows строк). '
+        'Запускается на заполненной базе; изменения корзины откатываются. '
+        'Те же проверки на сгенерированном каталоге выполняет shop/tests/test_query_plans.py.'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--min-rows', type=int, default=1000, help='С какого числа строк таблица считается большой.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Вывести SQL и план каждого запроса.')
+
+    def handle(self, *args, **options):
+        self.plan_audit = PlanAudit(options['min_rows'], self.stdout.write if options['verbose_plans'] else None)
+        product, user = self.get_audit_objects(options['username'])
+        client = get_audit_client(user)
+        issues: list[str] = []
+        with isolated_caches(), transaction.atomic():
+            for audit_request in get_audit_requests(client, product, user):
+                issues += self.audit(client, audit_request)
+            transaction.set_rollback(True)
+        if issues:
+            raise CommandError('Найдены неэффективные планы:\n' + '\n'.join(issues))
+        self.stdout.write(self.style.SUCCESS('Последовательных сканирований и сортировок больших таблиц нет.'))
+
+    def audit(self, client, audit_request: AuditRequest) -> list[str]:
+        response, queries = replay(client, audit_request)
+        if response.status_code >= 400 and response.status_code != audit_request.status:
+            raise CommandError(f'{audit_request} вернул {response.status_code}: {response.content[:500]!r}')
+        try:
+            issues: list[str] = self.plan_audit.get_issues(audit_request, queries)
+        except ValueError as error:
+            raise CommandError(error)
+        selects: int = sum(is_select(sql) for _, sql, _ in queries)
+        self.stdout.write(
+            f'{str(audit_request):<77} запросов {selects:>2}  '
+            + (self.style.ERROR(f'проблем {len(issues)}') if issues else self.style.SUCCESS('OK'))
+        )
+        return issues
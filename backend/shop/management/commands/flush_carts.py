@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from backend.settings import CART_CACHE_STORAGE, CART_FLUSH_BATCH_SIZE
+from shop.carts import flush_carts
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает в таблицу ShoppingCart корзины, измененные в кэше (CART_CACHE_STORAGE=True). '
+        'С --interval работает постоянно и повторяет сброс каждые interval секунд; '
+        'после падения процесса или сбоя БД следующий запуск дописывает несброшенные корзины.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Повторять сброс каждые interval секунд.')
+        parser.add_argument(
+            '--batch-size', type=int, default=CART_FLUSH_BATCH_SIZE,
+            help='Число корзин, записываемых в БД одной транзакцией.',
+        )
+
+    def handle(self, *args, **options):
+        if not CART_CACHE_STORAGE:
+            raise CommandError('Корзины хранятся в БД: сбрасывать нечего (CART_CACHE_STORAGE не включен).')
+        while True:
+            flushed: int = flush_carts(options['batch_size'])
+            if flushed or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(f'Записано корзин: {flushed}.'))
+            if not options['interval']:
+                return
+            connections.close_all()
+            time.sleep(options['interval'])
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+from backend.settings import (CATEGORY_IMAGE_PATH, MEDIA_GC_MIN_AGE_HOURS,
+                              PRODUCT_IMAGE_PATH, SUBCATEGORY_IMAGE_PATH)
+from shop.models import Category, Product, Subcategory
+from shop.versions import bump_catalog_version
+
+MEDIA_MODELS: tuple[type[models.Model], ...] = (Category, Subcategory, Product)
+
+MEDIA_DIRECTORIES: tuple[str, ...] = (CATEGORY_IMAGE_PATH, SUBCATEGORY_IMAGE_PATH, PRODUCT_IMAGE_PATH)
+
+
+def get_file_fields(model: type[models.Model]) -> list[models.FileField]:
+    return [field for field in model._meta.get_fields() if isinstance(field, models.FileField)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет медиафайлы, на которые не ссылается ни одна запись. '
+        'С --rehash сначала переносит файлы со старыми именами по slug в хранилище по хэшу содержимого.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только вывести файлы, которые будут удалены.')
+        parser.add_argument('--rehash', action='store_true', help='Переименовать старые файлы по хэшу содержимого.')
+        parser.add_argument(
+            '--min-age', type=int, default=MEDIA_GC_MIN_AGE_HOURS,
+            help='Не удалять файлы моложе этого количества часов: их могут сохранять незавершенные транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        if options['rehash']:
+            self.rehash(dry_run=options['dry_run'])
+        referenced: set[str] = self.get_referenced_names()
+        threshold = timezone.now() - timedelta(hours=options['min_age'])
+        removed: int = 0
+        freed: int = 0
+        for directory in MEDIA_DIRECTORIES:
+            for name in self.walk(directory):
+                if name in referenced or default_storage.get_modified_time(name) > threshold:
+                    continue
+                removed += 1
+                freed += default_storage.size(name)
+                self.stdout.write(f'Удаление {name}')
+                if not options['dry_run']:
+                    default_storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Найдено" if options["dry_run"] else "Удалено"} {removed} файлов, {freed / 2 ** 20:.1f} МБ.'
+        ))
+
+    def walk(self, directory: str):
+        """Рекурсивно перечисляет файлы каталога хранилища."""
+        if not default_storage.exists(directory):
+            return
+        directories, files = default_storage.listdir(directory)
+        for name in files:
+            yield f'{directory.rstrip("/")}/{name}'
+        for name in directories:
+            yield from self.walk(f'{directory.rstrip("/")}/{name}')
+
+    def get_referenced_names(self) -> set[str]:
+        """Собирает имена файлов, на которые ссылаются записи."""
+        names_in_use: set[str] = set()
+        for model in MEDIA_MODELS:
+            for field in get_file_fields(model):
+                names = model.objects.exclude(**{field.name: ''}).exclude(**{field.name: None})
+                names_in_use.update(names.values_list(field.name, flat=True).iterator())
+        return names_in_use
+
+    def rehash(self, dry_run: bool) -> None:
+        """Сохраняет файлы со старыми именами под хэшем содержимого и обновляет ссылки на них."""
+        renamed: int = 0
+        for model in MEDIA_MODELS:
+            model_renamed: int = 0
+            for field in get_file_fields(model):
+                rows = model.objects.exclude(**{field.name: ''}).exclude(**{field.name: None})
+                for pk, name in rows.values_list('pk', field.name).iterator():
+                    if field.storage.is_content_name(name):
+                        continue
+                    if not field.storage.exists(name):
+                        self.stderr.write(f'{model._meta.model_name} {pk}: файл {name} не найден.')
+                        continue
+                    self.stdout.write(f'Переименование {name}')
+                    model_renamed += 1
+                    if dry_run:
+                        continue
+                    with field.storage.open(name, 'rb') as file:
+                        model.objects.filter(pk=pk).update(**{field.name: field.storage.save(name, file)})
+            if model_renamed and not dry_run:
+                bump_catalog_version(model._meta.model_name)
+            renamed += model_renamed
+        self.stdout.write(f'{"Найдено" if dry_run else "Переименовано"} {renamed} файлов со старыми именами.')
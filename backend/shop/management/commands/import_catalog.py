@@ -0,0 +1,212 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DataError, IntegrityError, transaction
+
+from backend.settings import IMPORT_BATCH_SIZE
+from shop.models import Category, Product, Subcategory
+from shop.versions import bump_catalog_version
+
+REQUIRED_COLUMNS: tuple[str, ...] = (
+    'category_slug', 'category_name',
+    'subcategory_slug', 'subcategory_name',
+    'slug', 'name', 'price',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует каталог из CSV или JSON Lines (формат выгрузки /api/products/export/). '
+        'Категории, подкатегории и товары создаются или обновляются по slug пакетами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path, help='Путь к файлу .csv, .ndjson или .jsonl.')
+        parser.add_argument(
+            '--format', choices=('csv', 'ndjson'), default=None,
+            help='Формат файла. По умолчанию определяется по расширению.',
+        )
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Строк в одной транзакции.')
+        parser.add_argument('--dry-run', action='store_true', help='Проверить файл, откатив каждую транзакцию.')
+        parser.add_argument('--resume', action='store_true', help='Продолжить с последней сохраненной позиции.')
+        parser.add_argument(
+            '--checkpoint', type=Path, default=None,
+            help='Файл с номером последней импортированной строки. По умолчанию <path>.checkpoint.',
+        )
+
+    def handle(self, *args, **options):
+        path: Path = options['path']
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден.')
+        checkpoint: Path = options['checkpoint'] or path.with_name(f'{path.name}.checkpoint')
+        start: int = self.read_checkpoint(checkpoint) if options['resume'] else 0
+        self.category_ids: dict[str, int] = dict(Category.objects.values_list('slug', 'id'))
+        self.subcategory_ids: dict[str, int] = dict(Subcategory.objects.values_list('slug', 'id'))
+        self.imported_categories: set[str] = set()
+        self.imported_subcategories: set[str] = set()
+        imported: int = 0
+        started_at: float = time.monotonic()
+        with path.open(encoding='utf-8', newline='') as file:
+            rows = islice(enumerate(self.read_rows(file, options['format'] or self.detect_format(path)), 1), start, None)
+            while batch := list(islice(rows, options['batch_size'])):
+                self.import_batch(batch, dry_run=options['dry_run'])
+                imported += len(batch)
+                if not options['dry_run']:
+                    checkpoint.write_text(str(batch[-1][0]))
+                elapsed: float = time.monotonic() - started_at
+                self.stdout.write(
+                    f'Строка {batch[-1][0]}: импортировано {imported}, {imported / elapsed:.0f} строк/с'
+                )
+        if not options['dry_run']:
+            checkpoint.unlink(missing_ok=True)
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Проверено" if options["dry_run"] else "Импортировано"} {imported} строк '
+            f'за {elapsed:.1f} с ({imported / elapsed if elapsed else 0:.0f} строк/с).'
+        ))
+
+    def detect_format(self, path: Path) -> str:
+        if path.suffix.lower() == '.csv':
+            return 'csv'
+        if path.suffix.lower() in ('.jsonl', '.ndjson'):
+            return 'ndjson'
+        if path.suffix.lower() == '.json':
+            # Обычный JSON - один массив или объект, а импорт читает файл построчно.
+            raise CommandError('Импорт читает JSON Lines (объект на строку): переименуйте файл в .ndjson или укажите --format.')
+        raise CommandError('Не удалось определить формат файла, укажите --format.')
+
+    def read_checkpoint(self, checkpoint: Path) -> int:
+        if not checkpoint.exists():
+            return 0
+        return int(checkpoint.read_text().strip() or 0)
+
+    def read_rows(self, file, file_format: str):
+        """Читает файл построчно, не загружая его в память целиком. Ошибки разбора указывают строку файла."""
+        if file_format == 'csv':
+            reader = csv.DictReader(file)
+            try:
+                yield from reader
+            except csv.Error as error:
+                raise CommandError(f'Строка файла {reader.reader.line_num}: некорректный CSV: {error}.')
+            return
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise CommandError(f'Строка файла {number}: некорректный JSON: {error.msg}.')
+            if not isinstance(row, dict):
+                raise CommandError(f'Строка файла {number}: ожидается JSON-объект, получен {type(row).__name__}.')
+            yield row
+
+    def parse_row(self, line: int, row: dict[str, any]) -> dict[str, any]:
+        missing: list[str] = [column for column in REQUIRED_COLUMNS if not row.get(column)]
+        if missing:
+            raise CommandError(f'Строка {line}: не заполнены поля {", ".join(missing)}.')
+        try:
+            price = Decimal(str(row['price']))
+        except InvalidOperation:
+            raise CommandError(f'Строка {line}: некорректная цена {row["price"]!r}.')
+        # Decimal принимает NaN и Infinity, а отрицательные и слишком длинные цены отклоняют валидаторы поля.
+        if not price.is_finite():
+            raise CommandError(f'Строка {line}: некорректная цена {row["price"]!r}.')
+        try:
+            Product._meta.get_field('price').run_validators(price)
+        except ValidationError as error:
+            raise CommandError(f'Строка {line}: некорректная цена {row["price"]!r}: {" ".join(error.messages)}')
+        return {**row, 'price': price}
+
+    def import_batch(self, batch: list[tuple[int, dict[str, any]]], dry_run: bool) -> None:
+        """
+        Импортирует пакет строк в одной транзакции. Версии каталога обновляются после каждой
+        сохраненной транзакции: если следующий пакет упадет, уже сохраненные строки не останутся
+        скрытыми за кэшем ответов каталога.
+        """
+        rows: list[dict[str, any]] = list({
+            row['slug']: row for row in (self.parse_row(line, row) for line, row in batch)
+        }.values())
+        state: tuple = (
+            self.category_ids.copy(), self.subcategory_ids.copy(),
+            self.imported_categories.copy(), self.imported_subcategories.copy(),
+        )
+        try:
+            with transaction.atomic():
+                self.upsert_categories(rows)
+                self.upsert_subcategories(rows)
+                Product.objects.bulk_create(
+                    [
+                        Product(
+                            name=row['name'],
+                            slug=row['slug'],
+                            price=row['price'],
+                            subcategory_id=self.subcategory_ids[row['subcategory_slug']],
+                        )
+                        for row in rows
+                    ],
+                    update_conflicts=True,
+                    unique_fields=('slug',),
+                    update_fields=('name', 'price', 'subcategory', 'updated_at',),
+                )
+                if dry_run:
+                    transaction.set_rollback(True)
+                else:
+                    transaction.on_commit(lambda: bump_catalog_version('category', 'subcategory', 'product'))
+        except (IntegrityError, DataError) as error:
+            raise CommandError(f'Строки {batch[0][0]}-{batch[-1][0]}: {error}')
+        if dry_run:
+            (
+                self.category_ids, self.subcategory_ids,
+                self.imported_categories, self.imported_subcategories,
+            ) = state
+
+    def upsert_categories(self, rows: list[dict[str, any]]) -> None:
+        """Создает или обновляет впервые встреченные категории и дополняет словарь slug -> id."""
+        categories: dict[str, str] = {
+            row['category_slug']: row['category_name']
+            for row in rows if row['category_slug'] not in self.imported_categories
+        }
+        if not categories:
+            return
+        self.imported_categories.update(categories)
+        Category.objects.bulk_create(
+            [Category(slug=slug, name=name) for slug, name in categories.items()],
+            update_conflicts=True,
+            unique_fields=('slug',),
+            update_fields=('name', 'updated_at',),
+        )
+        new_slugs: list[str] = [slug for slug in categories if slug not in self.category_ids]
+        if new_slugs:
+            self.category_ids.update(Category.objects.filter(slug__in=new_slugs).values_list('slug', 'id'))
+
+    def upsert_subcategories(self, rows: list[dict[str, any]]) -> None:
+        """Создает или обновляет впервые встреченные подкатегории и дополняет словарь slug -> id."""
+        subcategories: dict[str, dict[str, any]] = {
+            row['subcategory_slug']: row
+            for row in rows if row['subcategory_slug'] not in self.imported_subcategories
+        }
+        if not subcategories:
+            return
+        self.imported_subcategories.update(subcategories)
+        Subcategory.objects.bulk_create(
+            [
+                Subcategory(
+                    slug=slug,
+                    name=row['subcategory_name'],
+                    category_id=self.category_ids[row['category_slug']],
+                )
+                for slug, row in subcategories.items()
+            ],
+            update_conflicts=True,
+            unique_fields=('slug',),
+            update_fields=('name', 'category', 'updated_at',),
+        )
+        new_slugs: list[str] = [slug for slug in subcategories if slug not in self.subcategory_ids]
+        if new_slugs:
+            self.subcategory_ids.update(Subcategory.objects.filter(slug__in=new_slugs).values_list('slug', 'id'))
@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from django.core.management.base import BaseCommand
+
+from backend.settings import IMAGE_WORKERS
+from shop.images import save_derivatives, submit_render
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересоздает большое, среднее и малое изображения (JPEG) всех товаров в пуле процессов. '
+        'Товары, исходное изображение которых не изменилось, пропускаются по SHA-256.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Пересоздать изображения даже без изменений.')
+        parser.add_argument(
+            '--max-pending', type=int, default=IMAGE_WORKERS * 4,
+            help='Сколько изображений одновременно держать в очереди пула.',
+        )
+
+    def handle(self, *args, **options):
+        self.pending: dict[Future, Product] = {}
+        self.processed = self.skipped = self.failed = 0
+        started_at: float = time.monotonic()
+        products = Product.objects.exclude(image_source='').exclude(image_source=None).order_by('id')
+        for product in products.iterator(chunk_size=500):
+            self.pending[submit_render(product, force=options['force'])] = product
+            if len(self.pending) >= options['max_pending']:
+                self.save_completed()
+        while self.pending:
+            self.save_completed()
+        elapsed: float = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано {self.processed}, пропущено {self.skipped}, ошибок {self.failed} за {elapsed:.1f} с '
+            f'({self.processed / elapsed if elapsed else 0:.1f} изображений/с).'
+        ))
+
+    def save_completed(self) -> None:
+        """Дожидается хотя бы одного готового изображения и сохраняет все готовые."""
+        done, _ = wait(self.pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            product: Product = self.pending.pop(future)
+            try:
+                prepared: tuple[str, dict[str, dict[str, bytes]]] | None = future.result()
+                saved: bool = prepared is not None and save_derivatives(product, product.image_source.name, *prepared)
+            except Exception as error:
+                self.failed += 1
+                self.stderr.write(f'Товар {product.slug}: {error}')
+                continue
+            if saved:
+                self.processed += 1
+            else:
+                self.skipped += 1
@@ -0,0 +1,145 @@
+import argparse
+import os
+import time
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Max
+
+from shop.models import Category, Product, ShoppingCart, Subcategory
+from shop.seed import (SEED_BATCH_SIZE, get_chunks, get_ids, reset_sequences,
+                       seed_carts_chunk, seed_categories, seed_products_chunk,
+                       seed_users_chunk)
+from shop.versions import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет пустую базу синтетическим каталогом, пользователями и корзинами для воспроизведения '
+        'проблем масштаба: сотни категорий, тысячи подкатегорий, миллионы товаров и строк корзин. '
+        'Данные детерминированы зерном --random-seed и не зависят от числа процессов. '
+        'На PostgreSQL строки вставляются через COPY в нескольких процессах, на SQLite - bulk_create в одном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=100, help='Число категорий.')
+        parser.add_argument('--subcategories', type=int, default=20, help='Подкатегорий на категорию.')
+        parser.add_argument('--products', type=int, default=500, help='Товаров на подкатегорию.')
+        parser.add_argument('--users', type=int, default=100_000, help='Число пользователей.')
+        parser.add_argument('--cart-users', type=float, default=0.5, help='Доля пользователей с непустой корзиной.')
+        parser.add_argument('--cart-items', type=float, default=8, help='Среднее число товаров в корзине.')
+        parser.add_argument('--max-cart-items', type=int, default=100, help='Наибольшее число товаров в корзине.')
+        parser.add_argument(
+            '--product-skew', type=float, default=2,
+            help='Перекос популярности товаров в корзинах: 1 - равномерно, 2 - на 1%% товаров приходится 10%% строк.',
+        )
+        parser.add_argument('--random-seed', type=int, default=1, help='Зерно генератора данных.')
+        parser.add_argument('--user-prefix', default='user', help='Префикс имен пользователей.')
+        parser.add_argument('--password', default='password', help='Пароль всех пользователей.')
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE, help='Размер пакета bulk_create.')
+        parser.add_argument(
+            '--workers', type=int,
+            help='Число процессов вставки. По умолчанию число ядер на PostgreSQL и 1 на SQLite.',
+        )
+        parser.add_argument(
+            '--copy', action=argparse.BooleanOptionalAction, default=None,
+            help='Вставлять через COPY. По умолчанию включено на PostgreSQL.',
+        )
+
+    def handle(self, *args, **options):
+        self.check_empty(options['user_prefix'])
+        postgresql: bool = connection.vendor == 'postgresql'
+        use_copy: bool = postgresql if options['copy'] is None else options['copy']
+        if use_copy and not postgresql:
+            raise CommandError('COPY доступен только на PostgreSQL.')
+        workers: int = options['workers'] or ((os.cpu_count() or 1) if postgresql else 1)
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stderr.write('SQLite не поддерживает параллельную запись: вставка идет в одном процессе.')
+            workers = 1
+        self.workers = workers
+        insert: dict[str, any] = {'batch_size': options['batch_size'], 'use_copy': use_copy}
+        started_at: float = time.monotonic()
+
+        self.step('Категории и подкатегории', lambda: seed_categories(options['categories'], options['subcategories']))
+        subcategory_ids: Sequence[int] = get_ids(Subcategory.objects.all())
+        total_products: int = len(subcategory_ids) * options['products']
+        self.step('Товары', lambda: self.run_chunks(
+            partial(seed_products_chunk, options['random_seed'], **insert),
+            get_chunks(total_products),
+            subcategory_ids=subcategory_ids,
+            products=options['products'],
+        ))
+        password_hash: str = make_password(options['password'])
+        # Пользователи получают id после уже существующих (например, администратора).
+        first_user_id: int = (User.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        user_ids: range = range(first_user_id, first_user_id + options['users'])
+        self.step('Пользователи', lambda: self.run_chunks(
+            partial(seed_users_chunk, **insert),
+            get_chunks(len(user_ids)),
+            user_ids=user_ids,
+            prefix=options['user_prefix'],
+            password_hash=password_hash,
+        ))
+        reset_sequences(Product, User)
+        self.step('Корзины', lambda: self.run_chunks(
+            partial(seed_carts_chunk, options['random_seed'], **insert),
+            get_chunks(len(user_ids)),
+            user_ids=user_ids,
+            product_ids=range(1, total_products + 1),
+            cart_users=options['cart_users'],
+            cart_items=options['cart_items'],
+            max_cart_items=options['max_cart_items'],
+            skew=options['product_skew'],
+        ))
+        if postgresql:
+            # После массовой вставки статистика планировщика устарела: без нее оценки строк (и проверка
+            # check_query_plans) опираются на пустые таблицы.
+            self.step('ANALYZE', self.analyze)
+        bump_catalog_version('category', 'subcategory', 'product')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started_at:.1f} с: категорий {Category.objects.count()}, '
+            f'подкатегорий {len(subcategory_ids)}, товаров {total_products}, пользователей {len(user_ids)}, '
+            f'строк корзин {ShoppingCart.objects.count()}.'
+        ))
+
+    def check_empty(self, prefix: str) -> None:
+        for model in (Category, Subcategory, Product, ShoppingCart):
+            if model.objects.exists():
+                raise CommandError(f'Таблица {model._meta.db_table} не пуста: команда заполняет пустую базу.')
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Пользователи с префиксом {prefix!r} уже есть: укажите другой --user-prefix.')
+
+    def step(self, name: str, action: Callable[[], int | None]) -> None:
+        started_at: float = time.monotonic()
+        rows: int | None = action()
+        elapsed: float = time.monotonic() - started_at
+        self.stdout.write(
+            f'{name:<26} {elapsed:>8.1f} с'
+            + (f'  строк {rows}  ({rows / elapsed:,.0f} строк/с)' if rows and elapsed else '')
+        )
+
+    def run_chunks(self, seed_chunk: Callable[..., int], chunks: Iterable[int], **kwargs) -> int:
+        """Заполняет блоки в пуле процессов или, при одном процессе, в текущем."""
+        task = partial(seed_chunk, **kwargs)
+        if self.workers == 1:
+            return sum(task(chunk=chunk) for chunk in chunks)
+        # Соединения не должны переходить в дочерние процессы: каждый процесс открывает свое.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup) as executor:
+            return sum(executor.map(run_chunk, [(task, chunk) for chunk in chunks]))
+
+    def analyze(self) -> None:
+        with connection.cursor() as cursor:
+            for model in (Category, Subcategory, Product, User, ShoppingCart):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def run_chunk(job: tuple[Callable[..., int], int]) -> int:
+    task, chunk = job
+    return task(chunk=chunk)
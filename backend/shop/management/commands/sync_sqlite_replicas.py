@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from backend.settings import DB_REPLICAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует локальную SQLite базу в файлы реплик из DB_REPLICAS. '
+        'Заменяет репликацию при локальной проверке чтения с реплик; повторный запуск '
+        'догоняет реплики до текущего состояния основной базы.'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite (DEBUG_DB=True).')
+        if not DB_REPLICAS:
+            raise CommandError('Реплики не настроены: укажите файлы в DB_REPLICAS.')
+        # Копия снимается через соединение Django, поэтому работает и с тестовой базой в памяти.
+        primary.ensure_connection()
+        for alias in DB_REPLICAS:
+            name = connections[alias].settings_dict['NAME']
+            connections[alias].close()
+            target = sqlite3.connect(name)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: {name}')
+        self.stdout.write(self.style.SUCCESS(f'Скопировано реплик: {len(DB_REPLICAS)}.'))
@@ -0,0 +1,88 @@
+# Generated by Django 5.0.7 on 2026-10-18 14:05
+
+import backend.settings
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True, verbose_name='Названиe')),
+                ('slug', models.SlugField(max_length=30, unique=True, verbose_name='URL')),
+                ('image', models.ImageField(blank=True, null=True, upload_to=backend.settings.set_category_image_name, verbose_name='Изображение')),
+            ],
+            options={
+                'verbose_name': 'Категория товаров',
+                'verbose_name_plural': 'Категории товаров',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True, verbose_name='Названиe')),
+                ('slug', models.SlugField(max_length=30, unique=True, verbose_name='URL')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Цена')),
+                ('image_large', models.ImageField(blank=True, null=True, upload_to=backend.settings.set_product_image_name_l, verbose_name='Изображение')),
+                ('image_medium', models.ImageField(blank=True, null=True, upload_to=backend.settings.set_product_image_name_m, verbose_name='Изображение')),
+                ('image_small', models.ImageField(blank=True, null=True, upload_to=backend.settings.set_product_image_name_s, verbose_name='Изображение')),
+            ],
+            options={
+                'verbose_name': 'Товар',
+                'verbose_name_plural': 'Товары',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ShoppingCart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(limit_value=1, message='В корзину не были добавлены товары!')], verbose_name='Количество')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart', to='shop.product', verbose_name='Товар')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Товар в корзине',
+                'verbose_name_plural': 'Товары в корзинах',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Subcategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True, verbose_name='Названиe')),
+                ('slug', models.SlugField(max_length=30, unique=True, verbose_name='URL')),
+                ('image', models.ImageField(blank=True, null=True, upload_to=backend.settings.set_subcategory_image_name, verbose_name='Изображение')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='subcategories', to='shop.category', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Подкатегория товаров',
+                'verbose_name_plural': 'Подкатегории товаров',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='subcategory',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='products', to='shop.subcategory', verbose_name='Подкатегория'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='unique_user_product'),
+        ),
+    ]
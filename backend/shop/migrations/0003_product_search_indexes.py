@@ -0,0 +1,66 @@
+from django.db import migrations, models
+
+POSTGRES_SEARCH_SQL: tuple[str, ...] = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+    'CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON shop_product USING gin (UPPER(name) gin_trgm_ops);',
+)
+
+POSTGRES_SEARCH_REVERSE_SQL: tuple[str, ...] = (
+    'DROP INDEX IF EXISTS product_name_trgm_idx;',
+)
+
+SQLITE_SEARCH_SQL: tuple[str, ...] = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS shop_product_fts USING fts5(name, content='shop_product', content_rowid='id');",
+    '''CREATE TRIGGER IF NOT EXISTS shop_product_fts_ai AFTER INSERT ON shop_product BEGIN
+        INSERT INTO shop_product_fts(rowid, name) VALUES (new.id, new.name);
+    END;''',
+    '''CREATE TRIGGER IF NOT EXISTS shop_product_fts_ad AFTER DELETE ON shop_product BEGIN
+        INSERT INTO shop_product_fts(shop_product_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END;''',
+    '''CREATE TRIGGER IF NOT EXISTS shop_product_fts_au AFTER UPDATE OF name ON shop_product BEGIN
+        INSERT INTO shop_product_fts(shop_product_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO shop_product_fts(rowid, name) VALUES (new.id, new.name);
+    END;''',
+    "INSERT INTO shop_product_fts(shop_product_fts) VALUES ('rebuild');",
+)
+
+SQLITE_SEARCH_REVERSE_SQL: tuple[str, ...] = (
+    'DROP TRIGGER IF EXISTS shop_product_fts_ai;',
+    'DROP TRIGGER IF EXISTS shop_product_fts_ad;',
+    'DROP TRIGGER IF EXISTS shop_product_fts_au;',
+    'DROP TABLE IF EXISTS shop_product_fts;',
+)
+
+
+def execute_for_vendor(postgres_sql: tuple[str, ...], sqlite_sql: tuple[str, ...]):
+    """Выполняет SQL, предназначенный для СУБД текущего подключения."""
+    def operation(apps, schema_editor):
+        statements: dict[str, tuple[str, ...]] = {
+            'postgresql': postgres_sql,
+            'sqlite': sqlite_sql,
+        }
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subcategory', 'name'], name='product_subcategory_name_idx'),
+        ),
+        migrations.RunPython(
+            execute_for_vendor(POSTGRES_SEARCH_SQL, SQLITE_SEARCH_SQL),
+            execute_for_vendor(POSTGRES_SEARCH_REVERSE_SQL, SQLITE_SEARCH_REVERSE_SQL),
+        ),
+    ]
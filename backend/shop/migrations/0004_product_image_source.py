@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-18 14:13
+
+import backend.settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0003_product_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_source',
+            field=models.ImageField(blank=True, help_text='Из него автоматически создаются большое, среднее и малое изображения.', null=True, upload_to=backend.settings.set_product_image_name_source, verbose_name='Исходное изображение'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_source_hash',
+            field=models.CharField(editable=False, max_length=64, null=True, verbose_name='SHA-256 исходного изображения'),
+        ),
+    ]
@@ -1,14 +1,47 @@
+import json
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connection, connections, models, transaction
+from django.db.models import (Count, DecimalField, ExpressionWrapper, F, Sum,
+                              Window)
+from django.db.models.expressions import RawSQL
 
 from backend.settings import (NAME_MAX_LEN, SHOPPING_CART_MIN_QUANTITY,
                               SLUG_MAX_LEN, set_category_image_name,
                               set_product_image_name_l,
                               set_product_image_name_m,
                               set_product_image_name_s,
+                              set_product_image_name_source,
                               set_subcategory_image_name)
 
+SQLITE_FTS_SQL: str = 'SELECT rowid FROM shop_product_fts WHERE shop_product_fts MATCH %s'
+
+
+def get_fts_query(term: str) -> str:
+    """Превращает поисковую строку в префиксный запрос FTS5 по каждому слову."""
+    words: list[str] = term.replace('"', ' ').split()
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def estimate_count(queryset) -> int:
+    """
+    Возвращает оценку количества строк в выборке по плану запроса PostgreSQL.
+    Для остальных СУБД выполняет обычный COUNT(*).
+    """
+    database = connections[queryset.db]
+    if database.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.query.sql_with_params()
+    with database.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
 
 class Category(models.Model):
     """Модель категории товаров."""
@@ -24,6 +57,9 @@ class Category(models.Model):
                               # TODO: REMOVE ON RELEASE
                               blank=True,
                               null=True,)
+    # Без индекса: выборки по дате изменения есть только у товаров (выгрузка с ?since).
+    updated_at = models.DateTimeField(verbose_name='Дата изменения',
+                                      auto_now=True,)
 
     class Meta:
         ordering = ('name',)
@@ -52,6 +88,9 @@ class Subcategory(models.Model):
                                  to=Category,
                                  related_name='subcategories',
                                  on_delete=models.PROTECT,)
+    # Без индекса: выборки по дате изменения есть только у товаров (выгрузка с ?since).
+    updated_at = models.DateTimeField(verbose_name='Дата изменения',
+                                      auto_now=True,)
 
     class Meta:
         ordering = ('name',)
@@ -62,6 +101,22 @@ class Subcategory(models.Model):
         return f'{self.name} ({self.category.name})'
 
 
+class ProductQuerySet(models.QuerySet):
+    """Запросы к товарам."""
+
+    def search(self, term: str):
+        """
+        Ищет товары по названию. PostgreSQL ищет по триграммному GIN-индексу на UPPER(name),
+        SQLite - по теневой таблице FTS5 shop_product_fts.
+        """
+        if connections[self.db].vendor == 'sqlite':
+            fts_query: str = get_fts_query(term)
+            if not fts_query:
+                return self
+            return self.filter(id__in=RawSQL(SQLITE_FTS_SQL, (fts_query,)))
+        return self.filter(name__icontains=term)
+
+
 class Product(models.Model):
     """Модель продукта."""
 
@@ -94,15 +149,158 @@ class Product(models.Model):
                                     # TODO: REMOVE ON RELEASE
                                     blank=True,
                                     null=True,)
+    image_source = models.ImageField(verbose_name='Исходное изображение',
+                                     help_text='Из него автоматически создаются большое, среднее и малое изображения.',
+                                     upload_to=set_product_image_name_source,
+                                     blank=True,
+                                     null=True,)
+    image_source_hash = models.CharField(verbose_name='SHA-256 исходного изображения',
+                                         max_length=64,
+                                         editable=False,
+                                         null=True,)
+    updated_at = models.DateTimeField(verbose_name='Дата изменения',
+                                      auto_now=True,
+                                      db_index=True,)
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
+        indexes = [
+            models.Index(fields=('price',), name='product_price_idx'),
+            # Порядок каталога (name, id): список, курсорная пагинация и фильтр по подкатегории без сортировки.
+            models.Index(fields=('name', 'id',), name='product_name_id_idx'),
+            models.Index(fields=('subcategory', 'name', 'id',), name='product_subcat_name_id_idx'),
+        ]
         ordering = ('name',)
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
 
+    # Имя исходного изображения, загруженное из БД или последнее сохраненное: по нему сигнал
+    # build_product_images узнает, что изображение заменено.
+    loaded_image_source: str | None = None
+
     def __str__(self):
         return f'{self.name} ({self.price})'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Если поле отложено (only/defer), имя неизвестно, и сохранение с изображением ставит обработку в очередь.
+        instance.loaded_image_source = instance.__dict__.get('image_source') or None
+        return instance
+
+
+class ShoppingCartQuerySet(models.QuerySet):
+    """Запросы к товарам в корзине."""
+
+    def with_summary(self):
+        """Добавляет к каждой строке стоимость позиции и итоги по всей выборке через оконные функции."""
+        line_total = ExpressionWrapper(
+            F('quantity') * F('product__price'),
+            output_field=DecimalField(max_digits=20, decimal_places=2),
+        )
+        return self.select_related('product').annotate(
+            line_total=line_total,
+            total_products=Window(Count('id')),
+            total_price=Window(Sum(line_total)),
+        )
+
+    def upsert_items(self, user, items: list[dict[str, any]]) -> list['ShoppingCart']:
+        """
+        Добавляет товары в корзину или обновляет их количество одним INSERT ... ON CONFLICT.
+        Каждый элемент items содержит ключи product и quantity.
+        """
+        return self.bulk_create(
+            [
+                self.model(user=user, product=item['product'], quantity=item['quantity'])
+                for item in items
+            ],
+            update_conflicts=True,
+            unique_fields=('user', 'product',),
+            update_fields=('quantity',),
+        )
+
+    def remove_items(self, user, products: list) -> int:
+        """Удаляет из корзины только перечисленные товары."""
+        deleted, _ = self.filter(user=user, product__in=products).delete()
+        return deleted
+
+    def lock_cart(self, user) -> None:
+        """
+        Блокирует строку пользователя до конца транзакции (SELECT ... FOR UPDATE), чтобы изменения
+        корзины одного пользователя выполнялись по очереди.
+        """
+        if connection.features.has_select_for_update:
+            list(User.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+        else:
+            # SQLite блокирует запись во всю базу. Пустое обновление берет эту блокировку в начале транзакции,
+            # и параллельные транзакции ждут ее, а не падают с database is locked при переходе от чтения к записи.
+            User.objects.filter(pk=user.pk).update(id=F('id'))
+
+    def replace_items(self, user, items: list[dict[str, any]]) -> list['ShoppingCart']:
+        """
+        Приводит корзину к переданному составу, изменяя только отличающиеся строки.
+        Выполняется в транзакции под блокировкой пользователя: параллельные замены
+        не перемешивают составы и не упираются в unique_user_product или взаимную блокировку.
+        """
+        with transaction.atomic():
+            self.lock_cart(user)
+            objects: list[ShoppingCart] = self.upsert_items(user, items)
+            self.filter(user=user).exclude(product__in=[item['product'] for item in items]).delete()
+        return objects
+
+    def change_items(self, user, upsert: list[dict[str, any]], remove: list) -> None:
+        """
+        Применяет пакет изменений корзины в одной транзакции под блокировкой пользователя:
+        параллельный запрос видит корзину либо до пакета, либо после него.
+        """
+        with transaction.atomic():
+            self.lock_cart(user)
+            if upsert:
+                self.upsert_items(user, upsert)
+            if remove:
+                self.remove_items(user, remove)
+
+    def summary(self) -> dict[str, any]:
+        """Возвращает позиции корзины и итоги, полученные одним запросом."""
+        return self.build_summary(list(self.with_summary()))
+
+    def build_summary(self, items: list['ShoppingCart']) -> dict[str, any]:
+        return {
+            'total_products': items[0].total_products if items else 0,
+            'total_price': items[0].total_price if items else Decimal(0),
+            'products': items,
+        }
+
+    async def aupsert_items(self, user, items: list[dict[str, any]]) -> list['ShoppingCart']:
+        """Асинхронная версия upsert_items."""
+        return await self.abulk_create(
+            [
+                self.model(user=user, product=item['product'], quantity=item['quantity'])
+                for item in items
+            ],
+            update_conflicts=True,
+            unique_fields=('user', 'product',),
+            update_fields=('quantity',),
+        )
+
+    async def aremove_items(self, user, products: list) -> int:
+        """Асинхронная версия remove_items."""
+        deleted, _ = await self.filter(user=user, product__in=products).adelete()
+        return deleted
+
+    async def areplace_items(self, user, items: list[dict[str, any]]) -> list['ShoppingCart']:
+        """Асинхронная версия replace_items: транзакции в async ORM нет, поэтому замена идет в потоке."""
+        return await sync_to_async(self.replace_items)(user, items)
+
+    async def achange_items(self, user, upsert: list[dict[str, any]], remove: list) -> None:
+        """Асинхронная версия change_items, по той же причине выполняется в потоке."""
+        await sync_to_async(self.change_items)(user, upsert, remove)
+
+    async def asummary(self) -> dict[str, any]:
+        """Асинхронная версия summary."""
+        return self.build_summary([item async for item in self.with_summary()])
+
 
 class ShoppingCart(models.Model):
     """Модель товара в корзине. Связывает товары с пользователями."""
@@ -121,6 +319,8 @@ class ShoppingCart(models.Model):
                                                message='В корзину не были добавлены товары!',
                                            )],)
 
+    objects = ShoppingCartQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -128,6 +328,10 @@ class ShoppingCart(models.Model):
                 name='unique_user_product',
             ),
         ]
+        indexes = [
+            # Корзина пользователя читается в порядке ordering без сортировки.
+            models.Index(fields=('user', 'id',), name='shoppingcart_user_id_idx'),
+        ]
         ordering = ('id',)
         verbose_name = 'Товар в корзине'
         verbose_name_plural = 'Товары в корзинах'
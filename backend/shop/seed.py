@@ -0,0 +1,324 @@
+import io
+import math
+import random
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from shop.models import Category, Product, ShoppingCart, Subcategory
+from shop.versions import bump_catalog_version
+
+SEED_BATCH_SIZE: int = 1000
+# Данные генерируются блоками фиксированного размера, у каждого блока свой генератор случайных чисел:
+# результат зависит от зерна и размеров, но не от числа процессов и размера пакета вставки.
+SEED_CHUNK_SIZE: int = 10_000
+SEED_MAX_QUANTITY: int = 20
+
+SEED_ADJECTIVES: tuple[str, ...] = (
+    'Свежий', 'Спелый', 'Домашний', 'Фермерский', 'Отборный', 'Сладкий', 'Хрустящий', 'Мягкий',
+    'Зеленый', 'Красный', 'Молодой', 'Копченый', 'Сушеный', 'Печеный', 'Острый', 'Нежный',
+)
+SEED_NOUNS: tuple[str, ...] = (
+    'сыр', 'хлеб', 'йогурт', 'перец', 'огурец', 'томат', 'чай', 'кофе',
+    'мед', 'орех', 'лук', 'картофель', 'виноград', 'лимон', 'банан', 'творог',
+)
+COPY_ESCAPES: dict[int, str] = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def get_chunk_rng(seed: int, kind: str, chunk: int) -> random.Random:
+    return random.Random(f'{seed}:{kind}:{chunk}')
+
+
+def get_chunks(total: int) -> range:
+    return range(math.ceil(total / SEED_CHUNK_SIZE))
+
+
+def get_chunk_bounds(chunk: int, total: int) -> tuple[int, int]:
+    return chunk * SEED_CHUNK_SIZE, min((chunk + 1) * SEED_CHUNK_SIZE, total)
+
+
+def get_ids(queryset) -> Sequence[int]:
+    """
+    Возвращает id выборки по возрастанию. Строки, вставленные в пустую таблицу, обычно идут подряд,
+    и тогда вместо списка из миллионов чисел возвращается range, который дешево передать в другой процесс.
+    """
+    bounds: dict[str, int | None] = queryset.aggregate(first=Min('id'), last=Max('id'), count=Count('id'))
+    if not bounds['count']:
+        return range(0)
+    if bounds['last'] - bounds['first'] + 1 == bounds['count']:
+        return range(bounds['first'], bounds['last'] + 1)
+    return list(queryset.order_by('id').values_list('id', flat=True))
+
+
+def to_copy_value(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).translate(COPY_ESCAPES)
+
+
+def copy_rows(table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> None:
+    """Вставляет строки одной командой COPY ... FROM STDIN (только PostgreSQL)."""
+    # Модуль импортирует драйвер PostgreSQL, которого может не быть при работе с SQLite.
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(map(to_copy_value, row)) + '\n')
+    buffer.seek(0)
+    quote_name = connection.ops.quote_name
+    sql: str = f'COPY {quote_name(table)} ({", ".join(map(quote_name, columns))}) FROM STDIN'
+    with connection.cursor() as cursor:
+        if is_psycopg3:
+            with cursor.cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            cursor.cursor.copy_expert(sql, buffer)
+
+
+def insert_rows(
+    model,
+    columns: tuple[str, ...],
+    rows: Iterable[tuple],
+    batch_size: int = SEED_BATCH_SIZE,
+    use_copy: bool = False,
+) -> None:
+    """
+    Вставляет готовые значения столбцов в одной транзакции: COPY на PostgreSQL или пакетами executemany.
+    В отличие от bulk_create, значения не проходят через pre_save и подготовку каждого поля модели,
+    которые на миллионах строк занимают больше времени, чем сама вставка.
+    """
+    with transaction.atomic():
+        if use_copy:
+            copy_rows(model._meta.db_table, columns, rows)
+            return
+        quote_name = connection.ops.quote_name
+        sql: str = (
+            f'INSERT INTO {quote_name(model._meta.db_table)} ({", ".join(map(quote_name, columns))}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))})'
+        )
+        with connection.cursor() as cursor:
+            iterator: Iterator[tuple] = iter(rows)
+            while batch := list(islice(iterator, batch_size)):
+                cursor.executemany(sql, batch)
+
+
+def seed_categories(categories: int, subcategories: int) -> None:
+    """Создает categories категорий по subcategories подкатегорий в каждой."""
+    Category.objects.bulk_create(
+        (Category(name=f'Категория {number}', slug=f'category-{number}') for number in range(1, categories + 1)),
+        batch_size=SEED_BATCH_SIZE,
+    )
+    category_ids: Sequence[int] = get_ids(Category.objects.all())
+    Subcategory.objects.bulk_create(
+        (
+            Subcategory(
+                name=f'Подкатегория {number}',
+                slug=f'subcategory-{number}',
+                category_id=category_ids[(number - 1) // subcategories],
+            )
+            for number in range(1, len(category_ids) * subcategories + 1)
+        ),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+
+PRODUCT_COLUMNS: tuple[str, ...] = ('id', 'name', 'slug', 'price', 'subcategory_id', 'updated_at',)
+USER_COLUMNS: tuple[str, ...] = (
+    'id', 'username', 'password', 'first_name', 'last_name', 'email',
+    'is_superuser', 'is_staff', 'is_active', 'date_joined',
+)
+CART_COLUMNS: tuple[str, ...] = ('user_id', 'product_id', 'quantity',)
+
+
+def get_now():
+    """Текущее время в виде, в котором его принимает СУБД соединения."""
+    return connection.ops.adapt_datetimefield_value(timezone.now())
+
+
+def build_products(
+    rng: random.Random,
+    start: int,
+    stop: int,
+    subcategory_ids: Sequence[int],
+    products: int,
+) -> Iterator[tuple]:
+    """
+    Строки PRODUCT_COLUMNS товаров с номерами start+1..stop, по products на подкатегорию;
+    цены распределены логарифмически. id товара равен номеру: при вставке в нескольких процессах
+    id не зависят от очередности процессов.
+    """
+    now = get_now()
+    for number in range(start + 1, stop + 1):
+        yield (
+            number,
+            f'{rng.choice(SEED_ADJECTIVES)} {rng.choice(SEED_NOUNS)} {number}',
+            f'product-{number}',
+            f'{10 ** rng.uniform(1, 5):.2f}',
+            subcategory_ids[(number - 1) // products],
+            now,
+        )
+
+
+def seed_products_chunk(
+    seed: int,
+    chunk: int,
+    subcategory_ids: Sequence[int],
+    products: int,
+    batch_size: int = SEED_BATCH_SIZE,
+    use_copy: bool = False,
+) -> int:
+    start, stop = get_chunk_bounds(chunk, len(subcategory_ids) * products)
+    insert_rows(
+        Product,
+        PRODUCT_COLUMNS,
+        build_products(get_chunk_rng(seed, 'product', chunk), start, stop, subcategory_ids, products),
+        batch_size,
+        use_copy,
+    )
+    return stop - start
+
+
+def build_users(start: int, stop: int, first_id: int, prefix: str, password_hash: str) -> Iterator[tuple]:
+    """Строки USER_COLUMNS пользователей prefix{start+1}..prefix{stop} с id first_id + номер - 1."""
+    now = get_now()
+    for number in range(start + 1, stop + 1):
+        yield first_id + number - 1, f'{prefix}{number}', password_hash, '', '', '', False, False, True, now
+
+
+def seed_users_chunk(
+    chunk: int,
+    user_ids: range,
+    prefix: str,
+    password_hash: str,
+    batch_size: int = SEED_BATCH_SIZE,
+    use_copy: bool = False,
+) -> int:
+    start, stop = get_chunk_bounds(chunk, len(user_ids))
+    insert_rows(
+        User,
+        USER_COLUMNS,
+        build_users(start, stop, user_ids.start, prefix, password_hash),
+        batch_size,
+        use_copy,
+    )
+    return stop - start
+
+
+def get_popular_index(rng: random.Random, total: int, skew: float, stride: int) -> int:
+    """
+    Выбирает товар с перекосом популярности: при skew > 1 малые ранги выпадают чаще
+    (при skew=2 на 1% самых популярных товаров приходится 10% выборов, при skew=3 - 21%).
+    Ранг переводится в индекс умножением на взаимно простой с total шаг, чтобы популярные
+    товары были разбросаны по каталогу, а не собраны в первой подкатегории.
+    """
+    rank: int = min(total - 1, int(total * rng.random() ** skew))
+    return rank * stride % total
+
+
+def get_stride(total: int) -> int:
+    stride: int = 1_000_003
+    while math.gcd(stride, total) != 1:
+        stride += 2
+    return stride
+
+
+def build_cart_items(
+    rng: random.Random,
+    user_ids: Sequence[int],
+    product_ids: Sequence[int],
+    cart_users: float = 1.0,
+    cart_items: float = 5,
+    max_cart_items: int = 50,
+    skew: float = 1.0,
+) -> Iterator[tuple]:
+    """
+    Строки CART_COLUMNS корзин доли cart_users пользователей. Размер корзины распределен экспоненциально
+    со средним cart_items (немного больших корзин и много маленьких), товары выбираются с перекосом skew.
+    """
+    if not product_ids:
+        return
+    stride: int = get_stride(len(product_ids))
+    limit: int = min(max_cart_items, len(product_ids))
+    for user_id in user_ids:
+        if rng.random() >= cart_users:
+            continue
+        size: int = min(limit, 1 + int(rng.expovariate(1 / (cart_items - 1)))) if cart_items > 1 else 1
+        chosen: set[int] = set()
+        for _ in range(size * 10):
+            if len(chosen) == size:
+                break
+            index: int = get_popular_index(rng, len(product_ids), skew, stride)
+            if index not in chosen:
+                chosen.add(index)
+                yield user_id, product_ids[index], min(SEED_MAX_QUANTITY, 1 + int(rng.expovariate(1)))
+
+
+def seed_carts_chunk(
+    seed: int,
+    chunk: int,
+    user_ids: Sequence[int],
+    product_ids: Sequence[int],
+    batch_size: int = SEED_BATCH_SIZE,
+    use_copy: bool = False,
+    **distribution,
+) -> int:
+    """Наполняет корзины пользователей с индексами из блока chunk и возвращает число строк."""
+    start, stop = get_chunk_bounds(chunk, len(user_ids))
+    rows: list[tuple] = list(build_cart_items(
+        get_chunk_rng(seed, 'cart', chunk), user_ids[start:stop], product_ids, **distribution,
+    ))
+    insert_rows(ShoppingCart, CART_COLUMNS, rows, batch_size, use_copy)
+    return len(rows)
+
+
+def reset_sequences(*models) -> None:
+    """После вставки строк с явными id переводит последовательности PostgreSQL за наибольший id."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def seed_catalog(seed: int, categories: int, subcategories: int, products: int) -> None:
+    """
+    Заполняет пустой каталог в текущем процессе. bulk_create не вызывает сигналы,
+    поэтому версии кэша каталога обновляются в конце явно.
+    """
+    seed_categories(categories, subcategories)
+    subcategory_ids: Sequence[int] = get_ids(Subcategory.objects.all())
+    for chunk in get_chunks(len(subcategory_ids) * products):
+        seed_products_chunk(seed, chunk, subcategory_ids, products)
+    reset_sequences(Product)
+    bump_catalog_version('category', 'subcategory', 'product')
+
+
+def seed_users(users: int, password: str, prefix: str = 'user') -> list[int]:
+    """
+    Создает пользователей prefix1..prefixN с одним паролем и возвращает их id по порядку.
+    Хэш пароля вычисляется один раз; уже существующие пользователи не изменяются.
+    """
+    password_hash: str = make_password(password)
+    usernames: list[str] = [f'{prefix}{number}' for number in range(1, users + 1)]
+    User.objects.bulk_create(
+        (User(username=username, password=password_hash) for username in usernames),
+        batch_size=SEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    ids: dict[str, int] = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+    return [ids[username] for username in usernames]
+
+
+def seed_carts(seed: int, user_ids: Sequence[int], **distribution) -> None:
+    """Наполняет корзины пользователей в текущем процессе; параметры распределения - как у build_cart_items."""
+    product_ids: Sequence[int] = get_ids(Product.objects.all())
+    for chunk in get_chunks(len(user_ids)):
+        seed_carts_chunk(seed, chunk, user_ids, product_ids, **distribution)
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from shop.models import Category, Product, Subcategory
+from shop.versions import bump_catalog_version
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Сбрасывает кэш каталога по тегу измененной модели."""
+    bump_catalog_version(sender._meta.model_name)
+
+
+@receiver(post_save, sender=Product)
+def build_product_images(sender, instance, **kwargs):
+    """
+    После коммита ставит в очередь создание изображений товара, если исходное изображение заменено.
+    Имя файла в хранилище - хэш содержимого, поэтому другое имя означает другое изображение.
+    """
+    source_name: str | None = instance.image_source.name or None
+    if source_name is not None and source_name != instance.loaded_image_source:
+        # Pillow и пул процессов импортируются только при замене изображения, а не при запуске воркера.
+        from shop.images import schedule_product_image
+        transaction.on_commit(lambda: schedule_product_image(instance))
+    instance.loaded_image_source = source_name
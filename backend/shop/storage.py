@@ -0,0 +1,81 @@
+import hashlib
+import re
+from pathlib import PurePosixPath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from PIL import Image, UnidentifiedImageError
+
+IMAGE_EXTENSIONS: dict[str, str] = {
+    'GIF': '.gif',
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'WEBP': '.webp',
+}
+
+CONTENT_NAME_PATTERN = re.compile(r'(?:^|/)(?P<prefix>[0-9a-f]{2})/(?P=prefix)[0-9a-f]{62}\.\w+$')
+
+
+def get_file_digest(content: File) -> str:
+    """Считает SHA-256 содержимого файла, не загружая его в память целиком."""
+    content.seek(0)
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def get_content_extension(name: str, content: File) -> str:
+    """
+    Определяет расширение по содержимому изображения,
+    а если это не изображение - берет его из имени файла.
+    """
+    content.seek(0)
+    try:
+        with Image.open(content) as image:
+            extension: str | None = IMAGE_EXTENSIONS.get(image.format)
+    except (UnidentifiedImageError, OSError):
+        extension = None
+    content.seek(0)
+    return extension or PurePosixPath(name).suffix.lower()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище медиафайлов, в котором имя файла - это SHA-256 его содержимого:
+    <каталог>/<первые 2 символа хэша>/<хэш><расширение>.
+    Каталог берется из upload_to поля. Замена изображения всегда дает новый URL,
+    поэтому файлы можно кэшировать навсегда. Одинаковые файлы хранятся один раз,
+    а неиспользуемые удаляет команда gc_media.
+    """
+
+    def get_content_name(self, name: str, digest: str, extension: str) -> str:
+        directory = PurePosixPath(name).parent
+        return str(directory / digest[:2] / f'{digest}{extension}')
+
+    def is_content_name(self, name: str) -> bool:
+        """Проверяет, что файл уже сохранен под именем из хэша."""
+        return CONTENT_NAME_PATTERN.search(name) is not None
+
+    def generate_content_name(self, name: str, content: File) -> str:
+        """Возвращает имя, под которым файл будет сохранен."""
+        return self.get_content_name(
+            name,
+            get_file_digest(content),
+            get_content_extension(name, content),
+        )
+
+    def save(self, name, content, max_length=None):
+        """
+        Сохраняет файл под именем из хэша содержимого.
+        Если такой файл уже есть, повторно он не записывается.
+        """
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.generate_content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
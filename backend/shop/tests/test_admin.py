@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+
+from shop.models import Product, ShoppingCart
+from shop.seed import seed_carts, seed_catalog, seed_users
+from shop.tests.utils import LocalCacheTestCase
+
+
+class AdminQueryTests(LocalCacheTestCase):
+    """
+    Страницы панели администратора на заполненном каталоге выполняют постоянное число запросов:
+    сессия и пользователь, количество строк и страница списка. Связанные объекты загружаются
+    вместе со строками, а фильтры и поля выбора не выводят целые таблицы.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(seed=1, categories=3, subcategories=4, products=10)
+        seed_carts(1, seed_users(20, 'password'))
+        cls.admin = User.objects.create_superuser('admin')
+        cls.product = Product.objects.order_by('id').first()
+        cls.cart = ShoppingCart.objects.select_related('user').order_by('id').first()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def assert_page_queries(self, url: str, queries: int):
+        with self.subTest(url), self.assertNumQueries(queries):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_changelists(self):
+        # Категорий и подкатегорий мало: для них считается и полное количество строк.
+        pages: tuple[tuple[str, int], ...] = (
+            ('/admin/shop/product/', 4),
+            ('/admin/shop/shoppingcart/', 4),
+            ('/admin/shop/category/', 5),
+            # Фильтр по категории загружает категории одним запросом.
+            ('/admin/shop/subcategory/', 6),
+        )
+        for url, queries in pages:
+            self.assert_page_queries(url, queries)
+
+    def test_search(self):
+        word: str = self.product.name.split()[0]
+        pages: tuple[tuple[str, int], ...] = (
+            (f'/admin/shop/product/?q={word}', 4),
+            (f'/admin/shop/product/?q={self.product.slug}', 4),
+            (f'/admin/shop/shoppingcart/?q={self.cart.user.username}', 4),
+            (f'/admin/shop/shoppingcart/?q={self.product.slug}', 4),
+        )
+        for url, queries in pages:
+            self.assert_page_queries(url, queries)
+        response = self.client.get(f'/admin/shop/product/?q={word}')
+        self.assertIn(self.product, response.context['cl'].result_list)
+
+    def test_change_forms(self):
+        # Подкатегория, пользователь и товар выбираются автодополнением, а не списком всех строк.
+        self.assert_page_queries(f'/admin/shop/product/{self.product.pk}/change/', 8)
+        self.assert_page_queries(f'/admin/shop/shoppingcart/{self.cart.pk}/change/', 10)
@@ -0,0 +1,250 @@
+import asyncio
+import math
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from shop import carts
+from shop.carts import (FLUSH_LOCK_KEY, FLUSH_LOCK_TIMEOUT,
+                        JOURNAL_FLUSHED_KEY, JOURNAL_LAST_KEY,
+                        CacheCartStorage, CartLockTimeout, CartStorage,
+                        DatabaseCartStorage, get_journal_key, get_lock_key,
+                        paused_background_flush, write_carts)
+from shop.checks import check_cart_cache
+from shop.models import ShoppingCart, ShoppingCartQuerySet
+from shop.tests.utils import LOCAL_CACHES, LocalCacheTestCase, create_catalog
+
+
+class CartDiffTests(LocalCacheTestCase):
+    """Пакет изменений корзины применяется целиком или не применяется вовсе."""
+
+    def setUp(self):
+        super().setUp()
+        _, _, self.products = create_catalog()
+        self.user = User.objects.create_user('buyer')
+        ShoppingCart.objects.create(user=self.user, product=self.products[0], quantity=1)
+
+    def change(self, storage) -> None:
+        storage.change_items(self.user, [{'product': self.products[1], 'quantity': 2}], [self.products[0].pk])
+
+    def test_database_storage_applies_diff(self):
+        self.change(DatabaseCartStorage())
+        self.assertEqual(
+            list(ShoppingCart.objects.filter(user=self.user).values_list('product', 'quantity')),
+            [(self.products[1].pk, 2)],
+        )
+
+    def test_database_storage_rolls_back_upsert_when_remove_fails(self):
+        with mock.patch.object(ShoppingCartQuerySet, 'remove_items', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.change(DatabaseCartStorage())
+        self.assertEqual(
+            list(ShoppingCart.objects.filter(user=self.user).values_list('product', 'quantity')),
+            [(self.products[0].pk, 1)],
+        )
+
+    def test_cache_storage_applies_diff_as_one_change(self):
+        storage = CacheCartStorage()
+        with paused_background_flush():
+            self.change(storage)
+        self.assertEqual(storage.get_items(self.user.pk), ((self.products[1].pk, 2),))
+        self.assertEqual(storage.cache.get(JOURNAL_LAST_KEY), 1)
+
+
+class CartStorageTests(LocalCacheTestCase):
+    """Хранилище обязано реализовать все операции с корзиной, а кэш процесса не годится для нескольких воркеров."""
+
+    def test_storage_must_implement_every_operation(self):
+        with self.assertRaises(TypeError):
+            CartStorage()
+
+        class PartialStorage(CartStorage):
+            summary = replace_items = upsert_items = remove_items = clear = DatabaseCartStorage.clear
+
+        with self.assertRaisesMessage(TypeError, 'change_items'):
+            PartialStorage()
+
+    def test_per_process_cart_cache_needs_single_worker(self):
+        redis_caches = {**LOCAL_CACHES, 'carts': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        cases = (
+            (False, 4, LOCAL_CACHES, []),
+            (True, 1, LOCAL_CACHES, []),
+            (True, 4, LOCAL_CACHES, ['shop.E001']),
+            (True, 4, redis_caches, []),
+        )
+        for storage, workers, caches, errors in cases:
+            with (
+                self.subTest(storage=storage, workers=workers, backend=caches['carts']['BACKEND']),
+                mock.patch('shop.checks.CART_CACHE_STORAGE', storage),
+                mock.patch('shop.checks.WEB_CONCURRENCY', workers),
+                override_settings(CACHES=caches),
+            ):
+                self.assertEqual([error.id for error in check_cart_cache(None)], errors)
+
+
+class CartFlushTests(LocalCacheTestCase):
+    """Сброс корзин из кэша в ShoppingCart, в том числе после падения процесса посреди сброса."""
+
+    def setUp(self):
+        super().setUp()
+        _, _, self.products = create_catalog()
+        self.users: list[User] = [User.objects.create_user(f'buyer{number}') for number in range(3)]
+        self.storage = CacheCartStorage()
+        paused = paused_background_flush()
+        paused.__enter__()
+        self.addCleanup(paused.__exit__, None, None, None)
+        carts.JOURNAL_GAPS.clear()
+        self.addCleanup(carts.JOURNAL_GAPS.clear)
+
+    def fill_carts(self) -> dict[int, list[tuple[int, int]]]:
+        """Меняет корзины всех пользователей в кэше и возвращает ожидаемое содержимое ShoppingCart."""
+        expected: dict[int, list[tuple[int, int]]] = {}
+        for number, user in enumerate(self.users):
+            self.storage.replace_items(user, [{'product': self.products[number], 'quantity': number + 1}])
+            self.storage.upsert_items(user, [{'product': self.products[-1], 'quantity': 5}])
+            # У последнего пользователя upsert меняет количество того же товара.
+            expected[user.pk] = sorted({self.products[number].pk: number + 1, self.products[-1].pk: 5}.items())
+        return expected
+
+    def get_saved_carts(self) -> dict[int, list[tuple[int, int]]]:
+        return {
+            user.pk: sorted(ShoppingCart.objects.filter(user=user).values_list('product_id', 'quantity'))
+            for user in self.users
+        }
+
+    def assert_saved(self, expected: dict[int, list[tuple[int, int]]]) -> None:
+        self.assertEqual(self.get_saved_carts(), {user_id: sorted(items) for user_id, items in expected.items()})
+
+    def test_flush_journal_writes_changed_carts_once(self):
+        expected = self.fill_carts()
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertEqual(self.storage.flush_journal(), len(self.users))
+        self.assert_saved(expected)
+        self.assertEqual(self.storage.cache.get(JOURNAL_FLUSHED_KEY), self.storage.cache.get(JOURNAL_LAST_KEY))
+        self.assertIsNone(self.storage.cache.get(get_journal_key(1)))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.storage.flush_journal(), 0)
+
+    def test_flush_writes_only_changed_rows(self):
+        expected = self.fill_carts()
+        self.storage.flush_journal()
+        rows: dict[tuple[int, int], int] = {
+            (user_id, product_id): pk
+            for pk, user_id, product_id in ShoppingCart.objects.values_list('pk', 'user_id', 'product_id')
+        }
+        user = self.users[0]
+        self.storage.upsert_items(user, [{'product': self.products[-1], 'quantity': 6}])
+        self.storage.remove_items(user, [self.products[0].pk])
+        expected[user.pk] = [(self.products[-1].pk, 6)]
+        # Точка сохранения, пользователь, товары и строки корзин, затем один upsert и одно удаление.
+        with self.assertNumQueries(7):
+            self.assertEqual(self.storage.flush_journal(), 1)
+        self.assert_saved(expected)
+        self.assertEqual(
+            {
+                (user_id, product_id): pk
+                for pk, user_id, product_id in ShoppingCart.objects.values_list('pk', 'user_id', 'product_id')
+            },
+            {key: pk for key, pk in rows.items() if key != (user.pk, self.products[0].pk)},
+        )
+
+    def test_flush_refreshes_its_lock_per_batch(self):
+        self.fill_carts()
+        cache = self.storage.cache
+        with mock.patch.object(cache, 'touch', wraps=cache.touch) as touch:
+            self.assertEqual(self.storage.flush_journal(batch_size=2), len(self.users))
+        batches: int = math.ceil(cache.get(JOURNAL_LAST_KEY) / 2)
+        self.assertEqual(touch.call_args_list, [mock.call(FLUSH_LOCK_KEY, FLUSH_LOCK_TIMEOUT)] * (batches + 1))
+
+    def test_flush_stops_when_its_lock_is_taken_over(self):
+        self.fill_carts()
+        cache = self.storage.cache
+
+        def write_slowly(carts):
+            # Пакет пишется дольше FLUSH_LOCK_TIMEOUT: блокировка истекла, и ее взял другой сброс.
+            cache.set(FLUSH_LOCK_KEY, 'other')
+            write_carts(carts)
+
+        with mock.patch('shop.carts.write_carts', side_effect=write_slowly), self.assertLogs('shop.carts', 'WARNING'):
+            flushed: int = self.storage.flush_journal(batch_size=2)
+        self.assertLess(flushed, len(self.users))
+        self.assertEqual(cache.get(FLUSH_LOCK_KEY), 'other')
+        self.assertEqual(cache.get(JOURNAL_FLUSHED_KEY), 2)
+
+    def test_crash_during_flush_leaves_carts_for_next_flush(self):
+        expected = self.fill_carts()
+        # Запись в БД падает: транзакция откатывается, отметка сброса не сдвигается.
+        with mock.patch('shop.carts.write_carts', side_effect=SystemExit), self.assertRaises(SystemExit):
+            self.storage.flush_journal()
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertIsNone(self.storage.cache.get(JOURNAL_FLUSHED_KEY))
+        # Процесс, убитый посреди сброса, не снимает блокировку: до ее истечения другой сброс не начинается.
+        self.storage.cache.add(FLUSH_LOCK_KEY, 'crashed', FLUSH_LOCK_TIMEOUT)
+        self.assertEqual(CacheCartStorage().flush_journal(), 0)
+        self.storage.cache.delete(FLUSH_LOCK_KEY)
+        self.assertEqual(CacheCartStorage().flush_journal(), len(self.users))
+        self.assert_saved(expected)
+
+    def test_crash_between_journal_number_and_entry(self):
+        expected = self.fill_carts()
+        # Упавший процесс успел взять номер журнала, но не записал ни запись журнала, ни корзину.
+        gap: int = self.storage.cache.incr(JOURNAL_LAST_KEY)
+        self.storage.upsert_items(self.users[0], [{'product': self.products[1], 'quantity': 7}])
+        expected[self.users[0].pk].append((self.products[1].pk, 7))
+        with mock.patch('shop.carts.time.monotonic', return_value=1000.0):
+            self.assertEqual(self.storage.flush_journal(), len(self.users))
+        self.assertEqual(self.storage.cache.get(JOURNAL_FLUSHED_KEY), gap - 1)
+        with mock.patch('shop.carts.time.monotonic', return_value=1000.0 + carts.CART_LOCK_TIMEOUT):
+            self.assertEqual(self.storage.flush_journal(), 1)
+        self.assertEqual(self.storage.cache.get(JOURNAL_FLUSHED_KEY), gap + 1)
+        self.assert_saved(expected)
+
+
+class AsyncCartLockTests(LocalCacheTestCase):
+    """Асинхронное изменение ждет занятую блокировку корзины в цикле событий, не занимая поток ORM."""
+
+    def setUp(self):
+        super().setUp()
+        _, _, self.products = create_catalog()
+        self.user = User.objects.create_user('buyer')
+        self.storage = CacheCartStorage()
+        self.items: list[dict[str, any]] = [{'product': self.products[0], 'quantity': 2}]
+        paused = paused_background_flush()
+        paused.__enter__()
+        self.addCleanup(paused.__exit__, None, None, None)
+        # Блокировка другого запроса.
+        self.storage.cache.add(get_lock_key(self.user.pk), 'other', carts.CART_LOCK_TIMEOUT)
+
+    @async_to_sync
+    async def run_while_locked(self, release_after: float | None = None) -> float:
+        """
+        Изменяет корзину, пока блокировка занята, и возвращает, сколько секунд ждал вызов sync_to_async
+        в потоке ORM, начатый во время ожидания. С release_after блокировка освобождается через столько секунд.
+        """
+        async def other_request() -> float:
+            await asyncio.sleep(0.02)
+            started_at: float = time.monotonic()
+            await sync_to_async(lambda: None)()
+            waited: float = time.monotonic() - started_at
+            if release_after is not None:
+                await asyncio.sleep(release_after)
+                await sync_to_async(self.storage.cache.delete)(get_lock_key(self.user.pk))
+            return waited
+
+        change = asyncio.ensure_future(self.storage.aupsert_items(self.user, self.items))
+        waited: float = await other_request()
+        await change
+        return waited
+
+    def test_waits_without_holding_orm_thread(self):
+        waited: float = self.run_while_locked(release_after=0.1)
+        self.assertLess(waited, 0.05)
+        self.assertEqual(self.storage.get_items(self.user.pk), ((self.products[0].pk, 2),))
+
+    def test_gives_up_after_lock_timeout(self):
+        with mock.patch('shop.carts.CART_LOCK_TIMEOUT', 0.1), self.assertRaises(CartLockTimeout):
+            self.run_while_locked()
+        self.assertIsNone(self.storage.cache.get(JOURNAL_LAST_KEY))
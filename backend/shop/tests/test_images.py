@@ -0,0 +1,89 @@
+import hashlib
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+
+from shop.images import prepare_derivatives, save_derivatives
+from shop.models import Product
+from shop.tests.utils import LocalCacheTestCase, create_catalog
+
+
+def create_png() -> bytes:
+    content = io.BytesIO()
+    Image.new('RGB', (64, 48), 'red').save(content, format='PNG')
+    return content.getvalue()
+
+
+class ProductImageTests(LocalCacheTestCase):
+    """Обработка изображения ставится только при его замене, а устаревший результат не записывается."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        _, self.subcategory, _ = create_catalog(products=0)
+        self.source: bytes = create_png()
+        self.source_name: str = default_storage.save('products/sources/apple.png', ContentFile(self.source))
+
+    def create_product(self, **fields) -> Product:
+        return Product.objects.create(name='Яблоко', slug='apple', price=1, subcategory=self.subcategory, **fields)
+
+    def test_schedules_only_when_source_changes(self):
+        with mock.patch('shop.images.schedule_product_image') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                product: Product = self.create_product(image_source=self.source_name)
+            self.assertEqual(schedule.call_count, 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                product.save()
+                loaded: Product = Product.objects.get(pk=product.pk)
+                loaded.name = 'Красное яблоко'
+                loaded.save()
+            self.assertEqual(schedule.call_count, 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                loaded.image_source = default_storage.save('products/sources/pear.png', ContentFile(b'other'))
+                loaded.save()
+            self.assertEqual(schedule.call_count, 2)
+            self.assertEqual(schedule.call_args.args[0].image_source.name, loaded.image_source.name)
+
+    def test_prepare_reads_and_hashes_source(self):
+        source_hash, derivatives = prepare_derivatives(self.source_name, None)
+        self.assertEqual(source_hash, hashlib.sha256(self.source).hexdigest())
+        self.assertEqual(set(derivatives), {'large', 'medium', 'small'})
+        with Image.open(io.BytesIO(derivatives['small'])) as image:
+            self.assertEqual(image.format, 'JPEG')
+        self.assertIsNone(prepare_derivatives(self.source_name, source_hash))
+
+    def test_save_skips_result_of_replaced_source(self):
+        product: Product = self.create_product(image_source=self.source_name)
+        derivatives = {size: b'jpg-' + size.encode() for size in ('large', 'medium', 'small')}
+        self.assertFalse(save_derivatives(product, 'products/sources/old.png', 'old-hash', derivatives))
+        product.refresh_from_db()
+        self.assertFalse(product.image_large)
+        self.assertIsNone(product.image_source_hash)
+        self.assertTrue(save_derivatives(product, self.source_name, 'new-hash', derivatives))
+        product.refresh_from_db()
+        self.assertEqual(product.image_source_hash, 'new-hash')
+        self.assertEqual(default_storage.open(product.image_large.name).read(), b'jpg-large')
+        self.assertTrue(product.image_large.name.endswith(f'{hashlib.sha256(b"jpg-large").hexdigest()}.jpg'))
+
+    def test_gc_media_removes_unreferenced_webp_next_to_jpeg(self):
+        product: Product = self.create_product(image_source=self.source_name)
+        save_derivatives(product, self.source_name, 'hash', {size: size.encode() for size in ('large', 'medium', 'small')})
+        product.refresh_from_db()
+        # WebP, который прежние версии сохраняли рядом с JPEG под тем же хэшем.
+        webp: str = product.image_large.name.replace('.jpg', '.webp')
+        Path(default_storage.path(webp)).write_bytes(b'webp')
+        call_command('gc_media', min_age=0, stdout=io.StringIO())
+        self.assertFalse(default_storage.exists(webp))
+        self.assertTrue(default_storage.exists(product.image_large.name))
+        self.assertTrue(default_storage.exists(self.source_name))
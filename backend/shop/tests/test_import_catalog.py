@@ -0,0 +1,100 @@
+import csv
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DataError
+
+from shop.models import Product
+from shop.tests.utils import LocalCacheTestCase
+from shop.versions import get_catalog_versions
+
+CATALOG_TAGS: tuple[str, ...] = ('category', 'subcategory', 'product')
+
+ROW: dict[str, str] = {
+    'category_slug': 'fruits', 'category_name': 'Фрукты',
+    'subcategory_slug': 'apples', 'subcategory_name': 'Яблоки',
+    'slug': 'apple', 'name': 'Яблоко', 'price': '1.50',
+}
+
+
+class ImportCatalogTests(LocalCacheTestCase):
+    """Определение формата файла, ошибки разбора и проверки с номером строки, сброс кэша каталога."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write(self, name: str, content: str) -> Path:
+        path: Path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        return path
+
+    def import_catalog(self, path: Path, **options) -> None:
+        call_command('import_catalog', path, stdout=StringIO(), **options)
+
+    def test_imports_ndjson(self):
+        rows: list[str] = [json.dumps(ROW), '', json.dumps({**ROW, 'slug': 'pear', 'name': 'Груша'})]
+        self.import_catalog(self.write('catalog.ndjson', '\n'.join(rows)))
+        self.assertEqual(sorted(Product.objects.values_list('slug', flat=True)), ['apple', 'pear'])
+
+    def test_rejects_json_extension(self):
+        path: Path = self.write('catalog.json', json.dumps([ROW]))
+        with self.assertRaisesMessage(CommandError, '--format'):
+            self.import_catalog(path)
+        with self.assertRaisesMessage(CommandError, 'Строка файла 1: ожидается JSON-объект, получен list.'):
+            self.import_catalog(path, format='ndjson')
+        self.assertFalse(Product.objects.exists())
+
+    def test_reports_json_error_line(self):
+        path: Path = self.write('catalog.ndjson', f'{json.dumps(ROW)}\n\n{{"slug": \n')
+        with self.assertRaisesMessage(CommandError, 'Строка файла 3: некорректный JSON'):
+            self.import_catalog(path)
+
+    def test_reports_csv_error_line(self):
+        content = StringIO()
+        writer = csv.DictWriter(content, fieldnames=list(ROW))
+        writer.writeheader()
+        writer.writerow(ROW)
+        writer.writerow({**ROW, 'name': 'x' * (csv.field_size_limit() + 1)})
+        with self.assertRaisesMessage(CommandError, 'Строка файла 3: некорректный CSV'):
+            self.import_catalog(self.write('catalog.csv', content.getvalue()))
+
+    def test_rejects_invalid_prices(self):
+        for price in ('-1', 'NaN', 'Infinity', '-Infinity', '123456789012.00', '1.005'):
+            path: Path = self.write('catalog.ndjson', f'{json.dumps(ROW)}\n{json.dumps({**ROW, "price": price})}\n')
+            with self.subTest(price=price), self.assertRaisesMessage(CommandError, 'Строка 2: некорректная цена'):
+                self.import_catalog(path)
+
+    def test_reports_data_error_with_lines(self):
+        path: Path = self.write('catalog.ndjson', json.dumps(ROW))
+        with (
+            mock.patch.object(Product.objects, 'bulk_create', side_effect=DataError('numeric field overflow')),
+            self.assertRaisesMessage(CommandError, 'Строки 1-1: numeric field overflow'),
+        ):
+            self.import_catalog(path)
+
+    def test_committed_batches_bump_catalog_version(self):
+        versions: dict[str, int] = get_catalog_versions(CATALOG_TAGS)
+        # Второй пакет нарушает уникальность названия и откатывается, первый уже сохранен.
+        rows: list[str] = [json.dumps(ROW), json.dumps({**ROW, 'slug': 'apple-2'})]
+        path: Path = self.write('catalog.ndjson', '\n'.join(rows))
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaisesMessage(CommandError, 'Строки 2-2'):
+            self.import_catalog(path, batch_size=1)
+        self.assertEqual(list(Product.objects.values_list('slug', flat=True)), ['apple'])
+        bumped: dict[str, int] = get_catalog_versions(CATALOG_TAGS)
+        for tag in CATALOG_TAGS:
+            self.assertGreater(bumped[tag], versions[tag], tag)
+
+    def test_dry_run_keeps_catalog_version(self):
+        versions: dict[str, int] = get_catalog_versions(CATALOG_TAGS)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.import_catalog(self.write('catalog.ndjson', json.dumps(ROW)), dry_run=True)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(get_catalog_versions(CATALOG_TAGS), versions)
@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.db import connections
+
+from api.audit import AuditRequest, get_audit_requests, replay
+from api.plans import PlanAudit
+from api.tests.utils import get_audit_client, isolated_caches
+from shop.models import Product, ShoppingCart
+from shop.seed import seed_catalog
+from shop.tests.utils import LocalCacheTestCase
+
+# Товаров в сгенерированном каталоге больше порога, категорий и подкатегорий - меньше:
+# последовательное чтение маленьких справочников допустимо, чтение shop_product - нет.
+PLAN_MIN_ROWS: int = 1000
+
+
+class QueryPlanTests(LocalCacheTestCase):
+    """Планы запросов всех эндпоинтов API обходятся без сканирования и сортировки shop_product целиком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(seed=1, categories=4, subcategories=5, products=100)
+        cls.product = Product.objects.select_related('subcategory__category').order_by('id').first()
+        cls.user = User.objects.create_user('buyer')
+        ShoppingCart.objects.create(user=cls.user, product=cls.product, quantity=1)
+        # Планировщику нужна статистика, как на рабочей базе после autovacuum.
+        with connections['default'].cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_catalog_is_large_enough(self):
+        self.assertGreater(Product.objects.count(), PLAN_MIN_ROWS)
+
+    def test_endpoints_avoid_full_scans_and_sorts(self):
+        client = get_audit_client(self.user)
+        plan_audit = PlanAudit(PLAN_MIN_ROWS)
+        with isolated_caches():
+            for audit_request in get_audit_requests(client, self.product, self.user):
+                with self.subTest(str(audit_request)):
+                    response, queries = replay(client, audit_request)
+                    if audit_request.status is None:
+                        self.assertLess(response.status_code, 400)
+                    else:
+                        self.assertEqual(response.status_code, audit_request.status)
+                    self.assertEqual(plan_audit.get_issues(audit_request, queries), [])
+
+    def test_full_product_scan_is_reported(self):
+        audit_request = AuditRequest('get', '/api/products/', 0)
+        queries = [('default', 'SELECT * FROM "shop_product" WHERE "price" * 2 > %s', (1,))]
+        issues: list[str] = PlanAudit(PLAN_MIN_ROWS).get_issues(audit_request, queries)
+        self.assertEqual(len(issues), 1)
+        self.assertIn('последовательное сканирование shop_product', issues[0])
+        audit_request.full_pass = True
+        self.assertEqual(PlanAudit(PLAN_MIN_ROWS).get_issues(audit_request, queries), [])
@@ -0,0 +1,56 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from shop.models import Category, Product, Subcategory
+
+# Все кэши в тестах локальные и свои: файловый кэш каталога разработчика не затрагивается.
+LOCAL_CACHES: dict[str, dict[str, str]] = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'tests-{alias}',
+    }
+    for alias in settings.CACHES
+}
+
+
+def clear_caches() -> None:
+    for alias in LOCAL_CACHES:
+        caches[alias].clear()
+
+
+def create_catalog(products: int = 3) -> tuple[Category, Subcategory, list[Product]]:
+    """Создает категорию, подкатегорию и products товаров с названиями P0, P1, ..."""
+    category = Category.objects.create(name='Фрукты', slug='fruits')
+    subcategory = Subcategory.objects.create(name='Яблоки', slug='apples', category=category)
+    return category, subcategory, [
+        Product.objects.create(
+            name=f'P{number}',
+            slug=f'p{number}',
+            price=Decimal('1.25') * (number + 1),
+            subcategory=subcategory,
+        )
+        for number in range(products)
+    ]
+
+
+def get_client(user: User | None = None) -> APIClient:
+    """APIClient с токеном доступа пользователя user."""
+    client = APIClient()
+    if user is not None:
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class LocalCacheTestCase(TestCase):
+    """TestCase с пустыми локальными кэшами в начале каждого теста."""
+
+    def setUp(self):
+        super().setUp()
+        clear_caches()
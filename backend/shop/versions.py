@@ -0,0 +1,45 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+
+from backend.settings import CATALOG_CACHE_ALIAS, CATALOG_CACHE_KEY_PREFIX
+
+
+def get_version_key(tag: str) -> str:
+    """Возвращает ключ кэша, под которым хранится версия тега каталога."""
+    return f'{CATALOG_CACHE_KEY_PREFIX}:version:{tag}'
+
+
+def get_catalog_versions(tags: tuple[str, ...]) -> dict[str, int]:
+    """
+    Возвращает текущие версии тегов каталога.
+    Версия - отметка времени последнего изменения в наносекундах.
+    Отсутствующие в кэше версии создаются заново, что равносильно сбросу тега.
+    """
+    cache = caches[CATALOG_CACHE_ALIAS]
+    keys: dict[str, str] = {get_version_key(tag): tag for tag in tags}
+    stored: dict[str, int] = cache.get_many(keys)
+    versions: dict[str, int] = {}
+    for key, tag in keys.items():
+        version = stored.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), timeout=None)
+            version = cache.get(key)
+        versions[tag] = version
+    return versions
+
+
+async def aget_catalog_versions(tags: tuple[str, ...]) -> dict[str, int]:
+    """Асинхронная версия get_catalog_versions: кэш может быть файловым или сетевым, поэтому чтение идет в потоке."""
+    return await sync_to_async(get_catalog_versions)(tags)
+
+
+def bump_catalog_version(*tags: str) -> None:
+    """Обновляет версии тегов, делая недействительными зависящие от них записи кэша."""
+    cache = caches[CATALOG_CACHE_ALIAS]
+    version: int = time.time_ns()
+    cache.set_many(
+        {get_version_key(tag): version for tag in tags},
+        timeout=None,
+    )